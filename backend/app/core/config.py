@@ -1,4 +1,6 @@
 from pydantic_settings import BaseSettings
+from typing import Optional
+import os
 
 class Settings(BaseSettings):
     mongo_uri: str
@@ -10,6 +12,99 @@ class Settings(BaseSettings):
     chat_encryption_key: str
     whatsapp_token: str
     jwt_secret: str
+    openai_api_key: Optional[str] = None
+    # "gemini" uses gemini_embed_model, "hashing" is a local offline embedder
+    embedding_backend: str = "gemini"
+    # Smaller vectors make retrieval faster (only for models that support it, e.g. text-embedding-004)
+    embedding_dimensions: Optional[int] = None
+    retrieval_top_k: int = 10
+    # Max concurrent Gemini generation calls per worker, and per-call timeout
+    gemini_max_concurrency: int = 16
+    gemini_timeout_seconds: float = 60.0
+    # Ingestion pipeline
+    exa_num_results: int = 10
+    ingest_extraction_concurrency: int = 5
+    # WhatsApp delivery queue
+    whatsapp_workers: int = 4
+    whatsapp_rate_per_second: float = 20.0
+    whatsapp_burst: int = 20
+    whatsapp_max_attempts: int = 5
+    whatsapp_retry_base_seconds: float = 5.0
+    whatsapp_lock_timeout_seconds: float = 120.0
+    whatsapp_poll_interval_seconds: float = 2.0
+    # Sent and failed messages are removed by a TTL index this long after completing
+    whatsapp_retention_days: int = 7
+    # One message per user listing all new schemes instead of one per scheme
+    whatsapp_digest_mode: bool = True
+    # Generate scheme explanations during ingest instead of on first access
+    precompute_explanations: bool = False
+    # Translate name/description/eligibility/benefits into hi and mr during ingest
+    precompute_translations: bool = True
+    # Stored schemes without a current translation translated per ingest run
+    translation_backfill_batch: int = 50
+    # Length of each precomputed /schemes/recommended list (per role and language)
+    recommendation_list_size: int = 50
+    # Answer cache for the public chatbot
+    answer_cache_max_entries: int = 1000
+    answer_cache_ttl_minutes: int = 60
+    answer_cache_max_bytes: int = 8 * 1024 * 1024
+    # Conversation memory for /ai/chat: recent turns kept verbatim, older ones
+    # folded into a rolling summary; both fit in chat_context_token_budget
+    chat_history_max_turns: int = 6
+    chat_summary_max_tokens: int = 300
+    chat_summary_batch_turns: int = 4
+    chat_context_token_budget: int = 1500
+    # LLM routing: provider preference order (used until latency data exists),
+    # hedging after a provider's p95 latency, and circuit breaking
+    llm_providers: str = "gemini,groq,openai"
+    llm_hedge_enabled: bool = True
+    llm_hedge_default_delay_seconds: float = 3.0
+    llm_hedge_min_delay_seconds: float = 0.5
+    llm_latency_window: int = 100
+    llm_latency_min_samples: int = 10
+    llm_max_error_rate: float = 0.5
+    llm_breaker_failure_threshold: int = 5
+    llm_breaker_cooldown_seconds: float = 30.0
+    # Prompt token budgets per call type; lower-priority context is cut to fit
+    prompt_budget_extract: int = 6000
+    prompt_budget_explain: int = 1500
+    prompt_budget_chat: int = 6000
+    prompt_budget_translate: int = 4000
+    # Pages whose deterministic extraction reaches this confidence skip the LLM
+    heuristic_extraction_enabled: bool = True
+    heuristic_extraction_min_confidence: float = 0.8
+    # Batched extraction: up to extract_batch_size pages per LLM call, with the
+    # whole prompt within prompt_budget_extract_batch (1 disables batching)
+    extract_batch_size: int = 8
+    prompt_budget_extract_batch: int = 24000
+    # Chat history write-behind buffer
+    chat_history_batch_size: int = 100
+    chat_history_flush_interval_seconds: float = 1.0
+    chat_history_buffer_max: int = 5000
+    chat_history_flush_retries: int = 3
+    # Authenticated user cache
+    principal_cache_ttl_seconds: float = 60.0
+    principal_cache_max_entries: int = 10000
+    # Resolve name/role/language from signed token claims on a cache miss,
+    # skipping the DB (profile changes then apply when a new token is issued)
+    token_claims_enabled: bool = False
+    # Password hashing: bcrypt work factor (stored hashes are upgraded on login
+    # when it changes) and the size of the thread pool hashes run on
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = min(4, os.cpu_count() or 1)
+    # Logging level for the app's loggers (DEBUG shows per-scheme ingest progress)
+    log_level: str = "INFO"
+    # Time every MongoDB command per collection for /metrics
+    mongo_command_metrics: bool = True
+    # Shared outbound HTTP connection pools (one per external service)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 30.0
+    http2_enabled: bool = False
+    http_default_timeout_seconds: float = 30.0
+    groq_timeout_seconds: float = 30.0
+    openai_timeout_seconds: float = 30.0
+    whatsapp_timeout_seconds: float = 10.0
 
     class Config:
         env_file = ".env"
@@ -1,9 +1,11 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
+from app.core.metrics import MongoCommandMetrics
 
 client = AsyncIOMotorClient(
     settings.mongo_uri,
-    tlsAllowInvalidCertificates=True
+    tlsAllowInvalidCertificates=True,
+    event_listeners=[MongoCommandMetrics()] if settings.mongo_command_metrics else []
 )
 database = client.sahayak_ai
 
@@ -11,4 +13,6 @@ database = client.sahayak_ai
 users_collection = database.users
 schemes_collection = database.schemes
 notifications_collection = database.notifications
-chat_history_collection = database.chat_history
\ No newline at end of file
+chat_history_collection = database.chat_history
+chat_summaries_collection = database.chat_summaries
+whatsapp_queue_collection = database.whatsapp_queue
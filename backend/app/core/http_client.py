@@ -0,0 +1,103 @@
+"""
+Process-wide pooled HTTP clients for outbound API calls.
+One httpx.AsyncClient per external service (Groq, OpenAI, WhatsApp) is opened
+at startup and reused, so calls share keep-alive connections instead of
+paying a new TCP+TLS handshake every time.
+"""
+
+from typing import Dict
+import logging
+import httpx
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _service_timeouts() -> Dict[str, float]:
+    return {
+        "groq": settings.groq_timeout_seconds,
+        "openai": settings.openai_timeout_seconds,
+        "whatsapp": settings.whatsapp_timeout_seconds,
+    }
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HTTPClientRegistry:
+    def __init__(self):
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+        self.request_counts: Dict[str, int] = {}
+        self.http2 = False
+
+    def _create_client(self, service: str) -> httpx.AsyncClient:
+        timeout = _service_timeouts().get(service, settings.http_default_timeout_seconds)
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds
+        )
+
+        async def count_request(request):
+            self.request_counts[service] = self.request_counts.get(service, 0) + 1
+
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 10.0)),
+            limits=limits,
+            http2=self.http2,
+            event_hooks={"request": [count_request]}
+        )
+
+    async def start(self):
+        """Open one client per known service (called from the startup event)"""
+        self.http2 = settings.http2_enabled and _http2_available()
+        if settings.http2_enabled and not self.http2:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+        for service in _service_timeouts():
+            self.get(service)
+
+    def get(self, service: str) -> httpx.AsyncClient:
+        """Get the shared client for a service, creating it if needed"""
+        client = self.clients.get(service)
+        if client is None or client.is_closed:
+            client = self._create_client(service)
+            self.clients[service] = client
+        return client
+
+    async def close(self):
+        """Close all clients (called from the shutdown event)"""
+        for client in self.clients.values():
+            await client.aclose()
+        self.clients = {}
+
+    def get_stats(self) -> Dict:
+        """Get connection pool statistics per service"""
+        stats = {}
+        for service, client in self.clients.items():
+            pool = getattr(client._transport, "_pool", None)
+            connections = list(getattr(pool, "connections", []))
+            stats[service] = {
+                "requests": self.request_counts.get(service, 0),
+                "connections": len(connections),
+                "idle_connections": sum(1 for c in connections if c.is_idle()),
+                "http2": self.http2,
+                "timeout_seconds": _service_timeouts().get(service, settings.http_default_timeout_seconds)
+            }
+        return {
+            "max_connections": settings.http_max_connections,
+            "max_keepalive_connections": settings.http_max_keepalive_connections,
+            "services": stats
+        }
+
+
+# Global client registry
+http_clients = HTTPClientRegistry()
+
+
+def get_http_client(service: str) -> httpx.AsyncClient:
+    return http_clients.get(service)
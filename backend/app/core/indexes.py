@@ -0,0 +1,165 @@
+"""
+Index management for all collections.
+Required indexes are declared here and created idempotently at startup.
+Check mode runs explain() on every registered query shape and flags
+any that would still scan a whole collection:
+
+    python -m app.core.indexes --check
+"""
+
+from typing import Dict, List, Optional, NamedTuple
+from datetime import datetime
+import logging
+import asyncio
+import sys
+from bson import ObjectId
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from app.core.config import settings
+from app.core.database import (
+    database,
+    users_collection,
+    schemes_collection,
+    notifications_collection,
+    chat_history_collection,
+    chat_summaries_collection,
+    whatsapp_queue_collection
+)
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+    ],
+    "schemes": [
+        IndexModel([("source_url", ASCENDING)], unique=True, name="source_url_unique"),
+        IndexModel([("alternate_urls", ASCENDING)], name="alternate_urls"),
+        IndexModel([("content_hash", ASCENDING)], name="content_hash"),
+        # Filtered /schemes listings paginate on _id
+        IndexModel([("category", ASCENDING), ("_id", DESCENDING)], name="category_id"),
+        IndexModel([("eligibleRoles", ASCENDING), ("_id", DESCENDING)], name="roles_id"),
+    ],
+    "notifications": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_id_created_at"),
+    ],
+    "chat_history": [
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING)], name="user_id_timestamp"),
+    ],
+    "chat_summaries": [
+        IndexModel([("user_id", ASCENDING)], unique=True, name="user_id_unique"),
+    ],
+    "whatsapp_queue": [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+        IndexModel([("status", ASCENDING), ("locked_at", ASCENDING)], name="status_locked_at"),
+        # Only sent and failed messages have completed_at, so pending ones never expire
+        IndexModel(
+            [("completed_at", ASCENDING)],
+            expireAfterSeconds=settings.whatsapp_retention_days * 86400,
+            name="completed_at_ttl"
+        ),
+    ],
+}
+
+
+class QueryShape(NamedTuple):
+    """A hot query, described well enough to ask the planner how it would run"""
+    name: str
+    collection: object
+    filter: Dict
+    sort: Optional[List] = None
+
+
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape("login / register by email", users_collection, {"email": "user@example.com"}),
+    QueryShape("ingest dedupe by URL or content hash", schemes_collection, {"$or": [
+        {"source_url": {"$in": ["https://example.com"]}},
+        {"alternate_urls": {"$in": ["https://example.com"]}},
+        {"content_hash": {"$in": ["0" * 64]}}
+    ]}),
+    QueryShape("schemes page by category", schemes_collection, {"category": "agriculture", "_id": {"$lt": ObjectId()}}, [("_id", DESCENDING)]),
+    QueryShape("schemes page by role", schemes_collection, {"eligibleRoles": "farmer", "_id": {"$lt": ObjectId()}}, [("_id", DESCENDING)]),
+    QueryShape("notifications for a user", notifications_collection, {"user_id": str(ObjectId())}),
+    QueryShape("chat history for a user", chat_history_collection, {"user_id": str(ObjectId())}, [("timestamp", DESCENDING)]),
+    QueryShape("recent chat turns after the summary", chat_history_collection, {"user_id": str(ObjectId()), "timestamp": {"$gt": datetime(2000, 1, 1)}}, [("timestamp", DESCENDING)]),
+    QueryShape("conversation summary for a user", chat_summaries_collection, {"user_id": str(ObjectId())}),
+    QueryShape("claim due WhatsApp message", whatsapp_queue_collection, {"$or": [
+        {"status": "pending", "next_attempt_at": {"$lte": datetime(2000, 1, 1)}},
+        {"status": "sending", "locked_at": {"$lte": datetime(2000, 1, 1)}}
+    ]}, [("next_attempt_at", ASCENDING)]),
+]
+
+
+def register_indexes(collection_name: str, models: List[IndexModel]):
+    """Declare additional indexes (e.g. from a feature module)"""
+    INDEXES.setdefault(collection_name, []).extend(models)
+
+
+def register_query_shape(shape: QueryShape):
+    """Declare an additional query shape for check mode"""
+    QUERY_SHAPES.append(shape)
+
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """
+    Create all declared indexes. Creating an index that already exists is a no-op,
+    so this is safe to run on every startup. A failure on one collection (e.g. a
+    unique index over existing duplicates) is reported and does not stop the rest.
+    """
+    created = {}
+    for collection_name, models in INDEXES.items():
+        try:
+            created[collection_name] = await database[collection_name].create_indexes(models)
+        except Exception as e:
+            logger.error("Error creating indexes on %s: %s", collection_name, e)
+            created[collection_name] = []
+    return created
+
+
+def _plan_stages(plan) -> List[str]:
+    """Collect every stage name in an explain() plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+async def check_query_plans() -> List[Dict]:
+    """Explain every registered query shape and flag collection scans"""
+    report = []
+    for shape in QUERY_SHAPES:
+        cursor = shape.collection.find(shape.filter)
+        if shape.sort:
+            cursor = cursor.sort(shape.sort)
+        explain = await cursor.explain()
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        report.append({
+            "query": shape.name,
+            "collection": shape.collection.name,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages
+        })
+    return report
+
+
+async def _main(check: bool) -> int:
+    created = await ensure_indexes()
+    for collection_name, names in created.items():
+        print(f"{collection_name}: {', '.join(names) or 'no indexes created'}")
+    if not check:
+        return 0
+
+    report = await check_query_plans()
+    for row in report:
+        status = "COLLSCAN" if row["collscan"] else "ok"
+        print(f"[{status}] {row['collection']}: {row['query']} ({' -> '.join(row['stages'])})")
+    return 1 if any(row["collscan"] for row in report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main("--check" in sys.argv)))
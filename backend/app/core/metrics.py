@@ -0,0 +1,185 @@
+"""
+In-process metrics exported in the Prometheus text format at /metrics.
+Histograms are updated on the hot path with a lock and a few additions.
+Values the services already count themselves (cache hits, provider
+failovers, queue totals) are read by collectors at scrape time, so they cost
+nothing per request.
+Observations may come from driver threads (Mongo command events), so
+updates are guarded by a threading lock rather than an asyncio one.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from contextlib import contextmanager
+import bisect
+import threading
+import time
+from pymongo import monitoring
+
+# Seconds; spans a cached Mongo read (sub-ms) to a slow LLM call or ingest stage
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# (labels, value) pairs yielded by a collector for one metric
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block; labels["outcome"] is set to "error" if it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            if "outcome" in self.labelnames:
+                labels["outcome"] = "error"
+            raise
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        lines = []
+        for key, counts, total, count in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics plus scrape-time collectors, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics: List = []
+        # name -> (type, help, collect function returning samples)
+        self.collectors: Dict[str, Tuple[str, str, Callable[[], Iterable[Sample]]]] = {}
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def register_collector(self, name: str, kind: str, help: str, collect: Callable[[], Iterable[Sample]]):
+        """Export a value the application already tracks; `collect` runs on every scrape"""
+        self.collectors[name] = (kind, help, collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for name, (kind, help, collect) in self.collectors.items():
+            try:
+                samples = list(collect())
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the application's metrics
+metrics = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+MONGO_COMMAND_SECONDS = metrics.histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency by collection", ("collection", "command", "outcome")
+)
+LLM_CALL_SECONDS = metrics.histogram(
+    "llm_call_duration_seconds", "LLM call latency (time to first chunk for streams)", ("provider", "operation", "outcome")
+)
+INGEST_STAGE_SECONDS = metrics.histogram(
+    "ingest_stage_duration_seconds", "Scheme ingestion pipeline stage duration", ("stage",)
+)
+WHATSAPP_SEND_SECONDS = metrics.histogram(
+    "whatsapp_send_duration_seconds", "Outbound WhatsApp API call latency", ("outcome",)
+)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Times every MongoDB command the driver sends, labelled with its collection.
+    The collection name is only on the started event, so it is kept by request id
+    until the command finishes. Commands without a collection (hello, ping, ...)
+    are not recorded.
+    """
+
+    def __init__(self):
+        self._pending: Dict[int, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        if isinstance(target, str):
+            with self._lock:
+                self._pending[event.request_id] = (target, event.command_name)
+
+    def _finish(self, event, outcome: str):
+        with self._lock:
+            pending = self._pending.pop(event.request_id, None)
+        if pending is not None:
+            collection, command = pending
+            MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, collection=collection, command=command, outcome=outcome)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+def route_template(request) -> Optional[str]:
+    """The matched route's path template (e.g. /schemes/{scheme_id}), so labels stay bounded"""
+    route = request.scope.get("route")
+    return getattr(route, "path", None)
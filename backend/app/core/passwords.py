@@ -0,0 +1,17 @@
+"""
+bcrypt hashing primitives. Kept free of application settings so tools such as
+benchmark_password_hashing.py can import them without the service's env vars;
+security.py applies the configured work factor and runs them off the event loop.
+"""
+
+import bcrypt
+
+def verify_password(plain_password, hashed_password):
+    try:
+        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    except ValueError:
+        return False
+
+def hash_password(password, rounds: int):
+    salt = bcrypt.gensalt(rounds)
+    return bcrypt.hashpw(password[:72].encode('utf-8'), salt).decode('utf-8')
@@ -1,17 +1,40 @@
-import bcrypt
 import jwt
 from jwt import PyJWTError
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import asyncio
 from app.core.config import settings
+from app.core.passwords import verify_password, hash_password
 
-def verify_password(plain_password, hashed_password):
+def get_password_hash(password, rounds: int = None):
+    return hash_password(password, rounds or settings.bcrypt_rounds)
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was made with a different work factor than configured"""
     try:
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
-    except ValueError:
+        return int(hashed_password.split("$")[2]) != settings.bcrypt_rounds
+    except (IndexError, ValueError):
         return False
 
-def get_password_hash(password):
-    return bcrypt.hashpw(password[:72].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+# bcrypt releases the GIL while hashing, so a thread pool runs hashes in
+# parallel across cores without blocking the event loop. The pool size caps
+# how many hashes run at once; further requests wait in its queue.
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers,
+    thread_name_prefix="password-hash"
+)
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, get_password_hash, password)
+
+def shutdown_password_executor():
+    """Stop the hashing pool (called from the shutdown event)"""
+    _password_executor.shutdown(wait=False, cancel_futures=True)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -1,8 +1,25 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.routes import auth_routes, scheme_routes, ai_routes, notification_routes
 from app.utils.scheduler import start_scheduler
+from app.core.config import settings
 from app.core.database import client
+from app.core.metrics import metrics, HTTP_REQUEST_SECONDS, route_template
+from app.core.http_client import http_clients
+from app.core.indexes import ensure_indexes
+from app.core.security import shutdown_password_executor
+from app.services.notification_queue import delivery_queue
+from app.services.chat_history_buffer import chat_history_buffer
+from app.services.cache_service import scheme_cache, answer_cache, principal_cache
+from app.services.llm_router import llm_router
+import logging
+import time
+
+logging.basicConfig(
+    level=settings.log_level.upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
 
 app = FastAPI(title="Sahayak AI Backend", version="1.0.0")
 
@@ -12,8 +29,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Route templates, not raw paths, so ids do not create new label sets
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=route_template(request) or "unmatched",
+        status=response.status_code
+    )
+    return response
+
+# Counters the services already keep, read when /metrics is scraped
+metrics.register_collector("cache_requests_total", "counter", "Cache lookups by cache and result", lambda: [
+    ({"cache": "scheme", "result": "hit"}, scheme_cache.hits),
+    ({"cache": "scheme", "result": "stale_hit"}, scheme_cache.stale_hits),
+    ({"cache": "scheme", "result": "miss"}, scheme_cache.misses),
+    ({"cache": "answer", "result": "hit"}, answer_cache.hits),
+    ({"cache": "answer", "result": "miss"}, answer_cache.misses),
+    ({"cache": "principal", "result": "hit"}, principal_cache.hits),
+    ({"cache": "principal", "result": "miss"}, principal_cache.misses),
+])
+metrics.register_collector("llm_hedged_calls_total", "counter", "LLM calls duplicated to a second provider", lambda: [
+    ({}, llm_router.hedges)
+])
+metrics.register_collector("llm_failovers_total", "counter", "LLM calls retried on another provider", lambda: [
+    ({}, llm_router.failovers)
+])
+metrics.register_collector("llm_circuit_open", "gauge", "1 while a provider's circuit breaker is open", lambda: [
+    ({"provider": name}, int(health.state() != "closed")) for name, health in llm_router.health.items()
+])
+metrics.register_collector("whatsapp_messages_total", "counter", "WhatsApp deliveries by result", lambda: [
+    ({"result": "sent"}, delivery_queue.sent),
+    ({"result": "retried"}, delivery_queue.retried),
+    ({"result": "failed"}, delivery_queue.failed),
+])
+metrics.register_collector("chat_history_buffered", "gauge", "Chat turns waiting to be written", lambda: [
+    ({}, chat_history_buffer.get_stats()["buffered"])
+])
+
 app.include_router(auth_routes.router, prefix="/auth", tags=["auth"])
 app.include_router(scheme_routes.router, prefix="", tags=["schemes"])
 app.include_router(ai_routes.router, prefix="/ai", tags=["ai"])
@@ -21,12 +80,31 @@ app.include_router(notification_routes.router, prefix="", tags=["notifications"]
 
 @app.on_event("startup")
 async def startup_event():
+    await ensure_indexes()
+    await http_clients.start()
+    delivery_queue.start()
+    chat_history_buffer.start()
     start_scheduler()
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await delivery_queue.stop()
+    # Write out buffered chat history before the database client closes
+    await chat_history_buffer.stop()
+    await http_clients.close()
+    shutdown_password_executor()
     client.close()
 
 @app.get("/")
 async def root():
-    return {"message": "Sahayak AI Backend"}
\ No newline at end of file
+    return {"message": "Sahayak AI Backend"}
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/http/stats")
+async def get_http_stats():
+    """Get outbound HTTP connection pool statistics"""
+    return http_clients.get_stats()
\ No newline at end of file
@@ -20,10 +20,26 @@ class Scheme(BaseModel):
     applicationProcess: Optional[str] = None
     officialWebsite: Optional[str] = None
     source_url: Optional[str] = None
+    # Other URLs that served the same content
+    alternate_urls: List[str] = []
+    # Normalized hash of raw_data.description; re-extraction happens only when it changes
+    content_hash: Optional[str] = None
+    version: int = 1
     # Store raw scraped data for reference
     raw_data: Optional[Dict[str, Any]] = None
     # Store the processed JSON from Groq
     processed_data: Optional[Dict[str, Any]] = None
+    # {"method": "heuristic" | "llm", "confidence": float | None}
+    extraction: Optional[Dict[str, Any]] = None
+    # Parsed from ageRange/incomeLimit/eligibleRoles at ingest:
+    # {"age_min", "age_max", "income_max", "role_mask", "states"}
+    eligibility_bounds: Optional[Dict[str, Any]] = None
+    # {"hi": {"name", "shortDescription", "eligibility", "benefits", "source_hash", "translated_at"}, "mr": ...}
+    # made at ingest; ignored once source_hash no longer equals content_hash
+    translations: Optional[Dict[str, Dict[str, Any]]] = None
+    # Last translation attempt; the ingest backfill retries the oldest failures first
+    translation_attempted_at: Optional[datetime] = None
     is_new: bool = True
     created_at: datetime = datetime.utcnow()
-    processed_at: Optional[datetime] = None
\ No newline at end of file
+    processed_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
\ No newline at end of file
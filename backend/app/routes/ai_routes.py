@@ -1,55 +1,144 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.services.gemini_service import get_scheme_explanation_gemini as get_scheme_explanation, answer_user_query_gemini as answer_user_query
-from app.core.database import schemes_collection, chat_history_collection
+from app.services.llm_router import llm_router, answer_user_query
+from app.services.llm_router import stream_user_query as stream_user_query_auto, stream_scheme_explanation as stream_scheme_explanation_auto
+from app.services.gemini_service import stream_scheme_explanation_gemini, stream_user_query_gemini
+from app.services.groq_service import stream_scheme_explanation as stream_scheme_explanation_groq, stream_user_query as stream_user_query_groq
+from app.core.database import schemes_collection
 from app.routes.auth_routes import get_current_user
-from app.services.cache_service import scheme_cache
+from app.models.user_model import Language
+from app.services.cache_service import scheme_cache, answer_cache
+from app.services.embedding_service import scheme_index, select_context_schemes
+from app.services.eligibility_service import eligibility_index
+from app.services.recommendation_service import scheme_recommendations
+from app.services import gemini_client
+from app.services.prompt_builder import prompt_stats
+from app.services.conversation_service import load_conversation, retrieval_query
+from app.services.chat_history_buffer import chat_history_buffer
+from app.services.explanation_service import (
+    get_or_create_explanation, get_stored_explanation, explanation_input_hash,
+    is_valid_explanation, save_explanation_in_background
+)
 from bson import ObjectId
-from datetime import datetime
-from typing import Optional
+from typing import Optional, Literal
 import asyncio
+import json
 
 router = APIRouter()
 
+# "auto" lets the LLM router pick the fastest healthy provider
+StreamProvider = Literal["auto", "gemini", "groq"]
+
+# Streaming generators per provider: (answer a query, explain a scheme)
+STREAM_PROVIDERS = {
+    "auto": (stream_user_query_auto, stream_scheme_explanation_auto),
+    "gemini": (stream_user_query_gemini, stream_scheme_explanation_gemini),
+    "groq": (stream_user_query_groq, stream_scheme_explanation_groq),
+}
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Disable proxy buffering so tokens are flushed immediately
+}
+
 class ChatRequest(BaseModel):
     message: str
 
+def open_stream(provider: str, kind: int, *args, meta: dict):
+    """
+    Start a provider's stream (kind 0: query, 1: explanation). With "auto",
+    meta["provider"] is set to the provider the router picked. meta["failed"]
+    is set if the stream ended in the fallback apology.
+    """
+    generator = STREAM_PROVIDERS[provider][kind]
+    if provider != "auto":
+        meta["provider"] = provider
+    return generator(*args, meta=meta)
+
+def format_sse(data: dict, event: Optional[str] = None) -> str:
+    """Format a Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def is_cacheable_answer(response: str) -> bool:
+    """Only real answers are cached, not error or apology fallbacks"""
+    return bool(response) and not response.startswith(("Error:", "I apologize"))
+
 async def get_schemes_from_cache():
     """
-    Get schemes from cache or database.
-    Uses in-memory cache to avoid repeated DB queries.
-    Cache expires after 30 minutes.
+    Get schemes from the in-memory cache.
+    Returns (schemes, served_from_cache). Stale data is served while a single
+    background refresh runs; only a cold cache waits for the database.
     """
-    # Try to get from cache first
-    cached_schemes = await scheme_cache.get()
+    return await scheme_cache.get_schemes()
 
-    if cached_schemes is not None:
-        return cached_schemes
+# Only the fields an explanation depends on (plus the stored explanation itself)
+EXPLANATION_PROJECTION = {
+    "name": 1,
+    "shortDescription": 1,
+    "processed_data.shortDescription": 1,
+    "raw_data.description": 1,
+    "explanation": 1
+}
 
-    # Cache miss or expired - fetch from database
-    schemes = await schemes_collection.find().to_list(1000)
-    print(schemes)
-    
-    # Convert ObjectId to string for processing
-    for scheme in schemes:
-        scheme["id"] = str(scheme["_id"])
-        if "_id" in scheme:
-            del scheme["_id"]
-    
-    # Update cache
-    await scheme_cache.set(schemes)
-    
-    return schemes
+def explanation_projection(lang: str) -> dict:
+    """EXPLANATION_PROJECTION plus what a non-English explanation needs"""
+    if lang == "en":
+        return EXPLANATION_PROJECTION
+    return {
+        **EXPLANATION_PROJECTION,
+        f"translations.{lang}": 1,
+        "content_hash": 1,
+        f"explanations.{lang}": 1
+    }
 
 @router.post("/scheme-info/{scheme_id}")
-async def scheme_info(scheme_id: str):
-    """Get detailed explanation of a specific scheme"""
-    scheme = await schemes_collection.find_one({"_id": ObjectId(scheme_id)})
+async def scheme_info(scheme_id: str, lang: Language = "en"):
+    """
+    Get detailed explanation of a specific scheme, in the language given by ?lang=.
+    Explanations are generated once per language and stored with a hash of
+    their inputs, so repeat requests are a single read.
+    """
+    scheme = await schemes_collection.find_one({"_id": ObjectId(scheme_id)}, explanation_projection(lang))
+    if not scheme:
+        raise HTTPException(status_code=404, detail="Scheme not found")
+
+    explanation, precomputed = await get_or_create_explanation(scheme_id, scheme, lang)
+    return {"explanation": explanation, "precomputed": precomputed}
+
+@router.post("/scheme-info/{scheme_id}/stream")
+async def scheme_info_stream(scheme_id: str, provider: StreamProvider = "auto", lang: Language = "en"):
+    """
+    Streaming variant of /scheme-info: tokens are sent as Server-Sent Events
+    as soon as the model produces them, followed by a final "done" event.
+    """
+    scheme = await schemes_collection.find_one({"_id": ObjectId(scheme_id)}, explanation_projection(lang))
     if not scheme:
         raise HTTPException(status_code=404, detail="Scheme not found")
 
-    explanation = await get_scheme_explanation(scheme)
-    return {"explanation": explanation}
+    stored = get_stored_explanation(scheme, lang)
+    input_hash = explanation_input_hash(scheme, lang)
+
+    async def event_stream():
+        if stored:
+            yield format_sse({"token": stored})
+            yield format_sse({"provider": provider, "precomputed": True}, event="done")
+            return
+
+        parts = []
+        meta = {}
+        async for chunk in open_stream(provider, 1, scheme, lang, meta=meta):
+            parts.append(chunk)
+            yield format_sse({"token": chunk})
+
+        # Only a stream that finished cleanly is stored, never a partial one plus an apology
+        explanation = "".join(parts)
+        if not meta.get("failed") and is_valid_explanation(explanation):
+            save_explanation_in_background(scheme_id, input_hash, explanation, lang)
+        yield format_sse({"provider": meta.get("provider"), "precomputed": False}, event="done")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 @router.post("/chat")
 async def chat_with_ai(
@@ -63,14 +152,18 @@ async def chat_with_ai(
     Workflow:
     1. Authenticate user via JWT token
     2. Get schemes from cache (or DB if cache expired)
-    3. Send schemes data + user query to Groq
-    4. Save chat history for the authenticated user
-    5. Return AI response
+    3. Load the conversation so far (recent turns + rolling summary)
+    4. Send schemes data + conversation + user query to the model
+    5. Save chat history for the authenticated user
+    6. Return AI response
     """
     user_id = str(current_user["_id"])
     
-    # Get schemes from cache (much faster!)
-    schemes = await get_schemes_from_cache()
+    # Get schemes from cache (much faster!) and the conversation so far
+    (schemes, cached), conversation = await asyncio.gather(
+        get_schemes_from_cache(),
+        load_conversation(user_id)
+    )
     
     if not schemes:
         return {
@@ -78,35 +171,67 @@ async def chat_with_ai(
             "schemes_count": 0
         }
     
-    # Use the dedicated answer_user_query function from groq_service
-    # This function uses the processed scheme data to provide accurate answers
-    response = await answer_user_query(request.message, schemes)
+    # The top-k schemes are picked once; the LLM router sends the query to the
+    # fastest healthy provider, hedging to a second one if the first is unusually slow
+    context = await select_context_schemes(retrieval_query(request.message, conversation), schemes)
+    response = await answer_user_query(request.message, context, conversation, current_user.get("language") or "en")
     
-    # Save chat history for authenticated user (async, don't wait)
-    async def save_chat_history():
-        try:
-            await chat_history_collection.insert_one({
-                "user_id": user_id,
-                "message": request.message,
-                "response": response,
-                "timestamp": datetime.utcnow()
-            })
-        except Exception as e:
-            print(f"Error saving chat history: {str(e)}")
-
-    asyncio.create_task(save_chat_history())
+    # Save chat history for authenticated user (buffered, written in batches)
+    await chat_history_buffer.add(user_id, request.message, response)
     
     return {
         "response": response,
         "schemes_count": len(schemes),
         "data_source": "processed_schemes_database",
-        "cached": await scheme_cache.get() is not None,
+        "cached": cached,
+        "context_turns": len(conversation.turns),
         "user": {
             "name": current_user.get("name"),
             "role": current_user.get("role")
         }
     }
 
+@router.post("/chat/stream")
+async def chat_with_ai_stream(
+    request: ChatRequest,
+    provider: StreamProvider = "auto",
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Streaming variant of /chat using Server-Sent Events.
+    Each "data:" message carries a {"token": ...} chunk; a final "done" event
+    carries the metadata. The full response is saved to chat history once
+    the stream completes.
+    """
+    user_id = str(current_user["_id"])
+    language = current_user.get("language") or "en"
+    (schemes, _), conversation = await asyncio.gather(
+        get_schemes_from_cache(),
+        load_conversation(user_id)
+    )
+
+    async def event_stream():
+        if not schemes:
+            yield format_sse({"token": "I apologize, but no schemes are currently available. Please try again later."})
+            yield format_sse({"schemes_count": 0}, event="done")
+            return
+
+        parts = []
+        meta = {}
+        context = await select_context_schemes(retrieval_query(request.message, conversation), schemes)
+        async for chunk in open_stream(provider, 0, request.message, context, conversation, language, meta=meta):
+            parts.append(chunk)
+            yield format_sse({"token": chunk})
+
+        await chat_history_buffer.add(user_id, request.message, "".join(parts))
+        yield format_sse({
+            "schemes_count": len(schemes),
+            "data_source": "processed_schemes_database",
+            "provider": meta.get("provider")
+        }, event="done")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.post("/chat/public")
 async def chat_public(request: ChatRequest):
     """
@@ -115,7 +240,7 @@ async def chat_public(request: ChatRequest):
     Use this for testing or public-facing chatbot.
     """
     # Get schemes from cache (much faster!)
-    schemes = await get_schemes_from_cache()
+    schemes, cached = await get_schemes_from_cache()
     
     if not schemes:
         return {
@@ -123,23 +248,51 @@ async def chat_public(request: ChatRequest):
             "schemes_count": 0
         }
     
-    # Get AI response
-    response = await answer_user_query(request.message, schemes)
+    # Repeated questions are answered from the answer cache; the key includes
+    # the scheme set fingerprint so answers are dropped when schemes change
+    response = answer_cache.get(request.message, scheme_cache.fingerprint)
+    answer_cached = response is not None
+
+    if response is None:
+        # Get AI response
+        context = await select_context_schemes(request.message, schemes)
+        response = await answer_user_query(request.message, context)
+        if is_cacheable_answer(response):
+            answer_cache.set(request.message, scheme_cache.fingerprint, response)
     
     return {
         "response": response,
         "schemes_count": len(schemes),
         "data_source": "processed_schemes_database",
-        "cached": await scheme_cache.get() is not None
+        "cached": cached,
+        "answer_cached": answer_cached
     }
 
 @router.get("/cache/stats")
 async def get_cache_stats():
     """Get cache statistics"""
-    return scheme_cache.get_stats()
+    stats = scheme_cache.get_stats()
+    stats["vector_index"] = scheme_index.get_stats()
+    stats["eligibility_index"] = eligibility_index.get_stats()
+    stats["recommendations"] = scheme_recommendations.get_stats()
+    stats["gemini_client"] = gemini_client.get_stats()
+    stats["answer_cache"] = answer_cache.get_stats()
+    stats["prompts"] = prompt_stats.get_stats()
+    return stats
+
+@router.get("/providers/stats")
+async def get_provider_stats():
+    """Get LLM provider latency, error rate and circuit breaker statistics"""
+    return llm_router.get_stats()
+
+@router.get("/chat/history/stats")
+async def get_chat_history_stats():
+    """Get chat history write buffer statistics"""
+    return chat_history_buffer.get_stats()
 
 @router.post("/cache/clear")
 async def clear_cache():
-    """Clear the scheme cache (requires new fetch from DB)"""
-    await scheme_cache.clear()
+    """Clear the scheme cache (requires new fetch from DB) and the answer cache"""
+    scheme_cache.clear()
+    answer_cache.clear()
     return {"message": "Cache cleared successfully"}
@@ -2,10 +2,20 @@ from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
 from app.models.user_model import User, Language, Role
 from app.core.database import users_collection
-from app.core.security import get_password_hash, verify_password, create_access_token, verify_token
+from app.core.security import (
+    get_password_hash_async, verify_password_async, needs_rehash, create_access_token, verify_token
+)
+from app.core.config import settings
+from app.services.cache_service import principal_cache
 from pydantic import BaseModel
 from datetime import timedelta
+from typing import Dict, Optional
+import logging
+import asyncio
 from bson import ObjectId
+from bson.errors import InvalidId
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -21,27 +31,92 @@ class UserLogin(BaseModel):
     email: str
     password: str
 
+class UserUpdate(BaseModel):
+    name: Optional[str] = None
+    mobileno: Optional[str] = None
+    role: Optional[Role] = None
+    language: Optional[Language] = None
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+# Profile fields loaded for an authenticated user (never the password hash)
+PRINCIPAL_FIELDS = ["name", "email", "mobileno", "role", "language", "created_at"]
+# Fields also carried as signed token claims, so a claims-only principal has
+# what request handlers use (mobileno for notifications); tokens missing any
+# of them (issued before a field was added) fall back to the database
+TOKEN_CLAIM_FIELDS = ["name", "mobileno", "role", "language"]
+
+def create_user_token(user: dict) -> str:
+    claims = {"sub": str(user["_id"])}
+    claims.update({field: user.get(field) for field in TOKEN_CLAIM_FIELDS})
+    return create_access_token(data=claims, expires_delta=timedelta(hours=1))
+
+async def resolve_principal(token: str, allow_claims: bool):
     payload = verify_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = await users_collection.find_one({"_id": ObjectId(user_id)})
+    # A malformed subject is an invalid token on every path, not a server error
+    try:
+        object_id = ObjectId(user_id)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    user = principal_cache.get(user_id)
+    if user is not None:
+        return user
+
+    if allow_claims and settings.token_claims_enabled and all(field in payload for field in TOKEN_CLAIM_FIELDS):
+        user = {field: payload[field] for field in TOKEN_CLAIM_FIELDS}
+        user["_id"] = object_id
+        return user
+
+    user = await users_collection.find_one({"_id": object_id}, {field: 1 for field in PRINCIPAL_FIELDS})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    principal_cache.set(user_id, user)
     return user
 
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    """
+    Resolve the authenticated user.
+    Served from the principal cache when possible; on a miss, optionally from
+    signed token claims, otherwise from the database.
+    """
+    return await resolve_principal(token, allow_claims=True)
+
+async def get_current_user_profile(token: str = Depends(oauth2_scheme)):
+    """Like get_current_user, but always with the full profile (never claims only)"""
+    return await resolve_principal(token, allow_claims=False)
+
+# Rehashes running off the request path, one per user; referenced until they finish
+_rehash_tasks: Dict[str, asyncio.Task] = {}
+
+def schedule_password_rehash(user_id: ObjectId, password: str):
+    """Upgrade a user's hash in the background unless an upgrade is already running"""
+    key = str(user_id)
+    if key in _rehash_tasks:
+        return
+    task = asyncio.create_task(upgrade_password_hash(user_id, password))
+    _rehash_tasks[key] = task
+    task.add_done_callback(lambda _: _rehash_tasks.pop(key, None))
+
+async def upgrade_password_hash(user_id: ObjectId, password: str):
+    try:
+        hashed_password = await get_password_hash_async(password)
+        await users_collection.update_one({"_id": user_id}, {"$set": {"password": hashed_password}})
+    except Exception as e:
+        logger.error("Error upgrading password hash: %s", e)
+
 @router.post("/register")
 async def register(user: UserCreate):
     existing_user = await users_collection.find_one({"email": user.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     user_dict = user.dict()
     user_dict["password"] = hashed_password
     result = await users_collection.insert_one(user_dict)
@@ -50,16 +125,42 @@ async def register(user: UserCreate):
 @router.post("/login")
 async def login(user: UserLogin):
     db_user = await users_collection.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password, db_user["password"]):
+    if not db_user or not await verify_password_async(user.password, db_user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    access_token = create_access_token(data={"sub": str(db_user["_id"])}, expires_delta=timedelta(hours=1))
+    if needs_rehash(db_user["password"]):
+        # Work factor changed: re-hash with the current one, off the request path
+        schedule_password_rehash(db_user["_id"], user.password)
+
+    access_token = create_user_token(db_user)
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me")
-async def get_current_user_info(current_user: dict = Depends(get_current_user)):
+async def get_current_user_info(current_user: dict = Depends(get_current_user_profile)):
     # Remove password from response
     user_info = {k: v for k, v in current_user.items() if k != "password"}
     user_info["id"] = str(user_info["_id"])
     del user_info["_id"]
-    return user_info
\ No newline at end of file
+    return user_info
+
+@router.patch("/me")
+async def update_current_user(update: UserUpdate, current_user: dict = Depends(get_current_user_profile)):
+    """
+    Update the profile. The cached principal is invalidated and a new token
+    with the updated claims is returned.
+    """
+    changes = {k: v for k, v in update.dict().items() if v is not None}
+    if changes:
+        await users_collection.update_one({"_id": current_user["_id"]}, {"$set": changes})
+        principal_cache.invalidate(str(current_user["_id"]))
+    user = {**current_user, **changes}
+    return {
+        "message": "Profile updated successfully",
+        "access_token": create_user_token(user),
+        "token_type": "bearer"
+    }
+
+@router.get("/cache/stats")
+async def get_principal_cache_stats():
+    """Get principal cache statistics"""
+    return principal_cache.get_stats()
@@ -1,8 +1,14 @@
 from fastapi import APIRouter
 from app.core.database import notifications_collection
+from app.services.notification_queue import delivery_queue
 
 router = APIRouter()
 
+@router.get("/notifications/queue/stats")
+async def get_queue_stats():
+    """Get WhatsApp delivery queue statistics"""
+    return await delivery_queue.get_stats()
+
 @router.get("/notifications/{user_id}")
 async def get_notifications(user_id: str):
     notifications = await notifications_collection.find({"user_id": user_id}).to_list(100)
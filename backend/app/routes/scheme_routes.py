@@ -1,29 +1,207 @@
-from fastapi import APIRouter, HTTPException
-from app.models.scheme_model import Scheme
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.models.scheme_model import Scheme, SchemeCategory, Role
+from app.models.user_model import Language
 from app.core.database import schemes_collection
 from app.services.exa_service import fetch_and_store_schemes
+from app.services.search_service import scheme_search_index
+from app.services.eligibility_service import eligibility_index, normalize_state
+from app.services.recommendation_service import scheme_recommendations
+from app.services.localization import localize_scheme, TRANSLATION_LANGUAGES
+from app.routes.auth_routes import get_current_user
 from bson import ObjectId
+from bson.errors import InvalidId
+from typing import Optional
+import hashlib
+import json
 
 router = APIRouter()
 
+# Large or internal fields left out unless explicitly requested with ?fields=
+SLIM_EXCLUDED_FIELDS = ["raw_data", "processed_data", "embedding", "explanation", "explanations", "translations"]
+SELECTABLE_FIELDS = set(Scheme.model_fields) - {"id"} | {"explanation", "explanations"}
+
+def build_projection(fields: Optional[str]) -> dict:
+    """Projection for ?fields=name,category,... (default: everything except large fields)"""
+    if not fields:
+        return {field: 0 for field in SLIM_EXCLUDED_FIELDS}
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in SELECTABLE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return {field: 1 for field in requested}
+
+def localized_projection(projection: dict, lang: Optional[str]) -> dict:
+    """Extend a projection with what ?lang= needs: that language's translation and the content hash"""
+    if not lang or lang == "en":
+        return projection
+    projection = dict(projection)
+    if projection and next(iter(projection.values())) == 0:
+        # Exclusion projection: load only this language's translation
+        if projection.pop("translations", None) is not None:
+            projection.update({f"translations.{other}": 0 for other in TRANSLATION_LANGUAGES if other != lang})
+    else:
+        projection.update({f"translations.{lang}": 1, "content_hash": 1})
+    return projection
+
+def localize_document(scheme: dict, lang: Optional[str], fields: Optional[str]) -> dict:
+    """Swap in the stored translation, dropping the helper fields the client did not ask for"""
+    if not lang or lang == "en":
+        return scheme
+    scheme = localize_scheme(scheme, lang)
+    # Without ?fields= only translations is extra; content_hash is a default field
+    requested = {f.strip() for f in fields.split(",")} if fields else {"content_hash"}
+    for helper in ("translations", "content_hash"):
+        if helper not in requested:
+            scheme.pop(helper, None)
+    return scheme
+
+def parse_object_id(value: str, detail: str) -> ObjectId:
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail=detail)
+
+def etag_response(request: Request, content, headers: Optional[dict] = None) -> Response:
+    """
+    JSON response with an ETag over the serialized body.
+    Returns 304 Not Modified when it matches If-None-Match.
+    """
+    body = jsonable_encoder(content)
+    payload = json.dumps(body, separators=(",", ":"), sort_keys=True, ensure_ascii=False).encode("utf-8")
+    etag = f'W/"{hashlib.sha1(payload).hexdigest()}"'
+    headers = {**(headers or {}), "ETag": etag}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=body, headers=headers)
+
 @router.get("/schemes")
-async def get_schemes():
-    schemes = await schemes_collection.find().to_list(100)
+async def get_schemes(
+    request: Request,
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
+    category: Optional[SchemeCategory] = None,
+    role: Optional[Role] = None,
+    fields: Optional[str] = None,
+    lang: Optional[Language] = None
+):
+    """
+    List schemes, newest first, with keyset pagination on _id.
+    Pass the X-Next-Cursor header of a page as ?cursor= to get the next one.
+    Category and role filters run in the database; ?fields= selects a
+    projection (by default raw_data/processed_data are left out).
+    ?lang=hi|mr serves the translations stored at ingest where current.
+    """
+    query = {}
+    if category:
+        query["category"] = category
+    if role:
+        query["eligibleRoles"] = role
+    if cursor:
+        query["_id"] = {"$lt": parse_object_id(cursor, "Invalid cursor")}
+
+    projection = localized_projection(build_projection(fields), lang)
+    schemes = await schemes_collection.find(query, projection).sort("_id", -1).to_list(limit)
     # Convert ObjectId to string for JSON serialization
     for scheme in schemes:
         scheme["id"] = str(scheme["_id"])
         del scheme["_id"]
-    return schemes
+    schemes = [localize_document(scheme, lang, fields) for scheme in schemes]
+
+    headers = {}
+    if len(schemes) == limit:
+        headers["X-Next-Cursor"] = schemes[-1]["id"]
+    return etag_response(request, schemes, headers)
+
+@router.get("/schemes/search")
+async def search_schemes(
+    q: str = Query(..., min_length=1),
+    category: Optional[SchemeCategory] = None,
+    role: Optional[Role] = None,
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Keyword search over name, description, tags, eligibility and benefits.
+    Ranked with BM25; Hindi/Marathi (Devanagari or romanized) queries are normalized
+    to the English catalogue terms, so no LLM call is needed.
+    """
+    await scheme_search_index.ensure_loaded()
+    hits = scheme_search_index.search(q, limit=limit, category=category, role=role)
+    results = []
+    for scheme_id, score in hits:
+        result = dict(scheme_search_index.summaries[scheme_id])
+        result["score"] = round(score, 4)
+        results.append(result)
+    return {
+        "query": q,
+        "count": len(results),
+        "results": results
+    }
+
+@router.get("/schemes/eligible")
+async def get_eligible_schemes(
+    age: Optional[int] = Query(None, ge=0, le=120),
+    income: Optional[float] = Query(None, ge=0, description="Annual income in rupees"),
+    role: Optional[Role] = None,
+    state: Optional[str] = None,
+    category: Optional[SchemeCategory] = None,
+    limit: int = Query(100, ge=1, le=500)
+):
+    """
+    Schemes a profile is eligible for, matched against the age/income bounds,
+    roles and states parsed at ingest. Bounds a scheme does not state are not
+    applied, and schemes that name no state are nationwide. No LLM call.
+    """
+    state_name = normalize_state(state)
+    if state and not state_name:
+        raise HTTPException(status_code=400, detail=f"Unknown state: {state}")
+
+    await eligibility_index.ensure_loaded()
+    scheme_ids = eligibility_index.match(age=age, income=income, role=role, state=state_name)
+    results = []
+    for scheme_id in scheme_ids:
+        summary = eligibility_index.summaries[scheme_id]
+        if category and summary.get("category") != category:
+            continue
+        results.append(summary)
+    return {
+        "profile": {"age": age, "income": income, "role": role, "state": state_name},
+        "count": len(results),
+        "results": results[:limit]
+    }
+
+@router.get("/schemes/recommended")
+async def get_recommended_schemes(request: Request, current_user: dict = Depends(get_current_user)):
+    """
+    Recommended schemes for the user's role and language, served from
+    precomputed lists (schemes naming the role first, then ones open to all).
+    """
+    await scheme_recommendations.ensure_loaded()
+    recommendations = scheme_recommendations.get(current_user.get("role"), current_user.get("language"))
+    if recommendations is None:
+        recommendations = scheme_recommendations.get("other", "en")
+
+    headers = {"ETag": recommendations.etag}
+    if_none_match = request.headers.get("if-none-match", "")
+    if recommendations.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=recommendations.body, media_type="application/json", headers=headers)
 
 @router.get("/schemes/{scheme_id}")
-async def get_scheme(scheme_id: str):
-    scheme = await schemes_collection.find_one({"_id": ObjectId(scheme_id)})
+async def get_scheme(request: Request, scheme_id: str, fields: Optional[str] = None, lang: Optional[Language] = None):
+    scheme = await schemes_collection.find_one(
+        {"_id": parse_object_id(scheme_id, "Invalid scheme id")},
+        localized_projection(build_projection(fields), lang)
+    )
     if not scheme:
         raise HTTPException(status_code=404, detail="Scheme not found")
     # Convert ObjectId to string for JSON serialization
     scheme["id"] = str(scheme["_id"])
     del scheme["_id"]
-    return scheme
+    return etag_response(request, localize_document(scheme, lang, fields))
 
 @router.post("/schemes/fetch")
 async def fetch_schemes():
@@ -4,54 +4,343 @@ This prevents repeated database queries and speeds up the chat.
 """
 
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple, NamedTuple
+from collections import OrderedDict
+import logging
 import asyncio
+import hashlib
+import re
+import time
+import unicodedata
+from app.core.config import settings
+from app.core.database import schemes_collection
+
+logger = logging.getLogger(__name__)
+
+# Fields the chat path reads: prompts (with translations), retrieval text and
+# the cache fingerprint. raw_data, processed_data and embeddings stay in the
+# database; the vector index loads embeddings on its own (see sync_index)
+CACHED_SCHEME_FIELDS = [
+    "name", "shortDescription", "category", "eligibleRoles", "tags", "eligibility",
+    "benefits", "content_hash", "translations", "processed_at"
+]
+
+async def load_schemes_from_db() -> List[Dict]:
+    """Load every scheme from the database (cached fields only), with string ids"""
+    schemes = await schemes_collection.find({}, {field: 1 for field in CACHED_SCHEME_FIELDS}).to_list(None)
+    # Convert ObjectId to string for processing
+    for scheme in schemes:
+        scheme["id"] = str(scheme.pop("_id"))
+    return schemes
+
+class SchemeSnapshot(NamedTuple):
+    """Immutable cache contents; replaced as a whole so readers never need a lock"""
+    schemes: List[Dict]
+    loaded_at: datetime
+    version: int
+    fingerprint: str
 
 class SchemeCache:
-    def __init__(self, ttl_minutes: int = 30):
+    """
+    Stale-while-revalidate scheme cache.
+    Reads are lock-free: they return the current snapshot. When it has expired
+    or the scheme set version has moved on, the stale snapshot is still served
+    and exactly one background refresh is started. Only a cold cache makes
+    callers wait, and then they all share the same load.
+    """
+
+    def __init__(self, ttl_minutes: int = 30, loader=load_schemes_from_db, refresh_backoff_seconds: float = 30.0):
         """
         Initialize cache with time-to-live in minutes.
-        Default: 30 minutes
+        Default: 30 minutes. After a failed refresh, stale reads wait
+        refresh_backoff_seconds before starting another one.
         """
-        self.cache: Optional[List[Dict]] = None
-        self.last_updated: Optional[datetime] = None
         self.ttl = timedelta(minutes=ttl_minutes)
-        self._lock = asyncio.Lock()
-    
+        self.loader = loader
+        self.refresh_backoff_seconds = refresh_backoff_seconds
+        self._last_refresh_error: Optional[float] = None
+        self.snapshot: Optional[SchemeSnapshot] = None
+        # Monotonically increasing; bumped whenever schemes are inserted or updated
+        self.version = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        snapshot = self.snapshot
+        return snapshot.fingerprint if snapshot else None
+
     def is_expired(self) -> bool:
         """Check if cache has expired"""
-        if self.last_updated is None:
+        snapshot = self.snapshot
+        if snapshot is None:
             return True
-        return datetime.utcnow() - self.last_updated > self.ttl
-    
-    async def get(self) -> Optional[List[Dict]]:
-        """Get cached schemes if not expired"""
-        async with self._lock:
-            if self.cache is None or self.is_expired():
-                return None
-            return self.cache
-    
-    async def set(self, schemes: List[Dict]):
+        return datetime.utcnow() - snapshot.loaded_at > self.ttl
+
+    def is_stale(self) -> bool:
+        """Expired, or loaded before the latest version bump"""
+        snapshot = self.snapshot
+        return snapshot is None or snapshot.version != self.version or self.is_expired()
+
+    def get(self) -> Optional[List[Dict]]:
+        """Get cached schemes (possibly stale) without triggering a load"""
+        snapshot = self.snapshot
+        return snapshot.schemes if snapshot else None
+
+    async def get_schemes(self) -> Tuple[List[Dict], bool]:
+        """
+        Get schemes, loading them only if the cache is cold.
+        Returns (schemes, served_from_cache).
+        """
+        snapshot = self.snapshot
+        if snapshot is None:
+            self.misses += 1
+            await self._refresh()
+            return self.snapshot.schemes, False
+
+        if self.is_stale():
+            self.stale_hits += 1
+            self.refresh_in_background()
+        else:
+            self.hits += 1
+        return snapshot.schemes, True
+
+    def set(self, schemes: List[Dict]):
         """Set cache with new schemes data"""
-        async with self._lock:
-            self.cache = schemes
-            self.last_updated = datetime.utcnow()
-    
-    async def clear(self):
+        self.snapshot = SchemeSnapshot(
+            schemes=schemes,
+            loaded_at=datetime.utcnow(),
+            version=self.version,
+            fingerprint=self.compute_fingerprint(schemes)
+        )
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._load())
+            self._refresh_task.add_done_callback(self._on_refresh_done)
+        return self._refresh_task
+
+    async def _load(self):
+        version = self.version
+        schemes = await self.loader()
+        self.refreshes += 1
+        self.snapshot = SchemeSnapshot(
+            schemes=schemes,
+            loaded_at=datetime.utcnow(),
+            version=version,
+            fingerprint=self.compute_fingerprint(schemes)
+        )
+
+    async def _refresh(self):
+        """Load (or join the load already in flight) and wait for it"""
+        await asyncio.shield(self._start_refresh())
+
+    def refresh_in_background(self):
+        """
+        Start a refresh unless one is already running or the last one failed
+        less than refresh_backoff_seconds ago; errors keep the stale data.
+        """
+        last_error = self._last_refresh_error
+        if last_error is not None and time.monotonic() - last_error < self.refresh_backoff_seconds:
+            return
+        self._start_refresh()
+
+    def _on_refresh_done(self, task: asyncio.Task):
+        """Runs once per load, however many readers joined it"""
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.refresh_errors += 1
+            self._last_refresh_error = time.monotonic()
+            logger.error("Error refreshing scheme cache: %s", task.exception())
+        else:
+            self._last_refresh_error = None
+
+    def bump_version(self) -> int:
+        """Mark the cached scheme set as outdated (called after ingest writes)"""
+        self.version += 1
+        return self.version
+
+    def clear(self):
         """Clear the cache"""
-        async with self._lock:
-            self.cache = None
-            self.last_updated = None
+        self.snapshot = None
+
+    @staticmethod
+    def compute_fingerprint(schemes: List[Dict]) -> str:
+        """Fingerprint of the scheme set: changes whenever schemes are added or updated"""
+        digest = hashlib.sha1()
+        for scheme_id, processed_at in sorted((str(s.get("id")), str(s.get("processed_at"))) for s in schemes):
+            digest.update(f"{scheme_id}:{processed_at};".encode("utf-8"))
+        return digest.hexdigest()[:16]
     
     def get_stats(self) -> Dict:
         """Get cache statistics"""
+        snapshot = self.snapshot
         return {
-            "cached": self.cache is not None,
-            "scheme_count": len(self.cache) if self.cache else 0,
-            "last_updated": self.last_updated.isoformat() if self.last_updated else None,
+            "cached": snapshot is not None,
+            "scheme_count": len(snapshot.schemes) if snapshot else 0,
+            "last_updated": snapshot.loaded_at.isoformat() if snapshot else None,
             "is_expired": self.is_expired(),
-            "ttl_minutes": self.ttl.total_seconds() / 60
+            "is_stale": self.is_stale(),
+            "ttl_minutes": self.ttl.total_seconds() / 60,
+            "version": self.version,
+            "loaded_version": snapshot.version if snapshot else None,
+            "fingerprint": snapshot.fingerprint if snapshot else None,
+            "refreshing": self._refresh_task is not None and not self._refresh_task.done(),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors
+        }
+
+_QUESTION_TOKEN_RE = re.compile(r"[\wऀ-ॿ]+", re.UNICODE)
+
+def normalize_question(message: str) -> str:
+    """Normalize a chat message so trivially different phrasings share a cache entry"""
+    text = unicodedata.normalize("NFKC", message or "").lower()
+    return " ".join(_QUESTION_TOKEN_RE.findall(text))
+
+class AnswerCache:
+    """
+    LRU cache of chat answers with TTL and a memory cap.
+    Entries are keyed by the normalized question plus the scheme set
+    fingerprint, so answers computed against an older scheme set never match.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_minutes: int = 60, max_bytes: int = 8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_minutes * 60
+        self.max_bytes = max_bytes
+        # key -> (answer, expires_at, size_bytes)
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[str, float, int]]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(message: str, fingerprint: Optional[str]) -> Tuple[str, str]:
+        return (normalize_question(message), fingerprint or "")
+
+    def get(self, message: str, fingerprint: Optional[str]) -> Optional[str]:
+        """Get a cached answer, or None on a miss"""
+        key = self.make_key(message, fingerprint)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        answer, expires_at, _ = entry
+        if time.monotonic() > expires_at:
+            self._remove(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return answer
+
+    def set(self, message: str, fingerprint: Optional[str], answer: str):
+        """Cache an answer, evicting least recently used entries over the limits"""
+        key = self.make_key(message, fingerprint)
+        size = len(key[0].encode("utf-8")) + len(answer.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (answer, time.monotonic() + self.ttl_seconds, size)
+        self.total_bytes += size
+        while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Tuple[str, str]):
+        _, _, size = self.entries.pop(key)
+        self.total_bytes -= size
+
+    def clear(self):
+        """Drop all cached answers"""
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_minutes": self.ttl_seconds / 60,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+class PrincipalCache:
+    """
+    Short-lived LRU cache of authenticated users, keyed by user id.
+    Holds only the profile fields routes use (never the password hash), so most
+    authenticated requests skip the users_collection lookup.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # user_id -> (principal, expires_at)
+        self.entries: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        entry = self.entries.get(user_id)
+        if entry is None or time.monotonic() > entry[1]:
+            if entry is not None:
+                del self.entries[user_id]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, user_id: str, principal: Dict):
+        self.entries[user_id] = (principal, time.monotonic() + self.ttl_seconds)
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        """Drop a user's entry (call whenever the profile changes)"""
+        if self.entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
         }
 
-# Global cache instance
+# Global cache instances
 scheme_cache = SchemeCache(ttl_minutes=30)
+answer_cache = AnswerCache(
+    max_entries=settings.answer_cache_max_entries,
+    ttl_minutes=settings.answer_cache_ttl_minutes,
+    max_bytes=settings.answer_cache_max_bytes
+)
+principal_cache = PrincipalCache(
+    max_entries=settings.principal_cache_max_entries,
+    ttl_seconds=settings.principal_cache_ttl_seconds
+)
@@ -0,0 +1,186 @@
+"""
+Write-behind buffer for chat history.
+Chat handlers add records to an in-memory buffer and return; a background
+flusher writes them with insert_many once a batch fills up or the flush
+interval passes. The buffer is bounded: when it is full, add() waits for a
+flush (back-pressure) instead of growing without limit. Shutdown drains it.
+"""
+
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from datetime import datetime
+import logging
+import asyncio
+import time
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from app.core.config import settings
+from app.core.database import chat_history_collection
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class ChatHistoryBuffer:
+    """Batches chat history inserts"""
+
+    def __init__(self):
+        self._buffer: List[Dict] = []
+        self._in_flight: List[Dict] = []
+        self._space = asyncio.Condition()
+        self._batch_ready = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._listeners: List[Callable[[List[str]], Awaitable]] = []
+        # Listener runs still in progress; stop() waits for them
+        self._listener_tasks: Set[asyncio.Task] = set()
+        self.flushed = 0
+        self.batches = 0
+        self.failed = 0
+        self.waits = 0
+        self.max_batch = 0
+        self.total_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def add_flush_listener(self, listener: Callable[[List[str]], Awaitable]):
+        """Call listener(user_ids) in the background with the users in each flushed batch"""
+        self._listeners.append(listener)
+
+    def _on_listener_done(self, task: asyncio.Task):
+        self._listener_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Error in chat history flush listener: %s", task.exception())
+
+    def _size(self) -> int:
+        return len(self._buffer) + len(self._in_flight)
+
+    async def add(self, user_id: str, message: str, response: str):
+        """Queue one chat exchange, waiting for a flush if the buffer is full"""
+        record = {
+            "_id": ObjectId(),
+            "user_id": user_id,
+            "message": message,
+            "response": response,
+            "timestamp": datetime.utcnow()
+        }
+        async with self._space:
+            if self._size() >= settings.chat_history_buffer_max:
+                self.waits += 1
+                self._batch_ready.set()
+                await self._space.wait_for(lambda: self._size() < settings.chat_history_buffer_max)
+            self._buffer.append(record)
+        if len(self._buffer) >= settings.chat_history_batch_size:
+            self._batch_ready.set()
+
+    def pending_for(self, user_id: str) -> List[Dict]:
+        """Records for a user that may not be in the database yet"""
+        return [r for r in self._in_flight + self._buffer if r["user_id"] == user_id]
+
+    async def _insert(self, batch: List[Dict]):
+        """
+        Insert a batch, retrying with backoff. Records carry their own _id, so a
+        retry after a partial write only reports duplicates for what already landed.
+        """
+        for attempt in range(1, settings.chat_history_flush_retries + 1):
+            try:
+                await chat_history_collection.insert_many(batch, ordered=False)
+                return True
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if errors and all(err.get("code") == DUPLICATE_KEY_ERROR for err in errors):
+                    return True
+                error = e
+            except Exception as e:
+                error = e
+            logger.error("Error flushing chat history (attempt %s): %s", attempt, error)
+            if attempt < settings.chat_history_flush_retries:
+                await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+        return False
+
+    async def flush(self):
+        """Write out one batch (at most chat_history_batch_size records)"""
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            batch = self._buffer[:settings.chat_history_batch_size]
+            del self._buffer[:len(batch)]
+            self._in_flight = batch
+
+            start = time.perf_counter()
+            ok = await self._insert(batch)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            self._in_flight = []
+            async with self._space:
+                self._space.notify_all()
+
+        if not ok:
+            self.failed += len(batch)
+            return
+        self.flushed += len(batch)
+        self.batches += 1
+        self.max_batch = max(self.max_batch, len(batch))
+        self.total_flush_ms += elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        user_ids = sorted({r["user_id"] for r in batch})
+        for listener in self._listeners:
+            task = asyncio.create_task(listener(user_ids))
+            self._listener_tasks.add(task)
+            task.add_done_callback(self._on_listener_done)
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=settings.chat_history_flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            try:
+                await self.flush()
+                # A burst may have filled more than one batch
+                while len(self._buffer) >= settings.chat_history_batch_size:
+                    await self.flush()
+            except Exception as e:
+                logger.error("Error in chat history flusher: %s", e)
+
+    def start(self):
+        """Start the background flusher (called from the startup event)"""
+        self._flusher = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop the flusher, write out everything still buffered and wait for the listeners"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        # A batch interrupted mid-write goes back to the front (re-inserting is safe)
+        if self._in_flight:
+            self._buffer[:0] = self._in_flight
+            self._in_flight = []
+        while self._buffer:
+            await self.flush()
+        if self._listener_tasks:
+            await asyncio.gather(*self._listener_tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict:
+        """Get buffer and flush statistics"""
+        return {
+            "buffered": len(self._buffer),
+            "in_flight": len(self._in_flight),
+            "max_buffered": settings.chat_history_buffer_max,
+            "batch_size": settings.chat_history_batch_size,
+            "flush_interval_seconds": settings.chat_history_flush_interval_seconds,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failed": self.failed,
+            "listeners_running": len(self._listener_tasks),
+            "backpressure_waits": self.waits,
+            "avg_batch_size": round(self.flushed / self.batches, 1) if self.batches else 0,
+            "max_batch_size": self.max_batch,
+            "avg_flush_ms": round(self.total_flush_ms / self.batches, 1) if self.batches else 0,
+            "max_flush_ms": round(self.max_flush_ms, 1)
+        }
+
+
+# Global chat history buffer
+chat_history_buffer = ChatHistoryBuffer()
@@ -0,0 +1,241 @@
+"""
+Multi-turn conversation memory for the authenticated chat.
+The most recent turns are loaded from chat_history; older turns are folded
+into a rolling summary stored in chat_summaries. The context handed to the
+model (summary + recent turns) is kept under a fixed token budget, so prompt
+size stays flat however long the conversation gets.
+"""
+
+from typing import Dict, List, NamedTuple, Optional
+from datetime import datetime
+import logging
+import asyncio
+from app.core.config import settings
+from app.core.database import chat_history_collection, chat_summaries_collection
+from app.services.llm_provider import ANSWER, require_text
+from app.services.chat_history_buffer import chat_history_buffer
+from app.services.prompt_builder import Section, estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Schemes outrank the conversation history when the chat prompt must be cut
+SCHEME_PRIORITY = 100
+
+# Summary updates for the same user are not run concurrently
+_summarizing: Dict[str, asyncio.Task] = {}
+
+
+class Conversation(NamedTuple):
+    """Context for the next answer: a summary of older turns plus the recent ones"""
+    summary: str
+    turns: List[Dict]  # oldest first, each {"message", "response"}
+
+    def is_empty(self) -> bool:
+        return not self.summary and not self.turns
+
+    def last_user_message(self) -> Optional[str]:
+        return self.turns[-1]["message"] if self.turns else None
+
+
+EMPTY_CONVERSATION = Conversation("", [])
+
+
+def max_unsummarized_turns() -> int:
+    """Turns are folded in batches, so up to this many are not yet in the summary"""
+    return settings.chat_history_max_turns + settings.chat_summary_batch_turns
+
+
+def turn_tokens(turn: Dict) -> int:
+    return estimate_tokens(turn["message"]) + estimate_tokens(turn["response"])
+
+
+def fit_to_budget(summary: str, turns: List[Dict], budget: int) -> Conversation:
+    """
+    Keep the newest turns that fit in the budget after the summary.
+    The summary gets at most settings.chat_summary_max_tokens; a single turn
+    that is too large on its own has its response truncated.
+    """
+    summary = truncate_to_tokens(summary, min(settings.chat_summary_max_tokens, budget))
+    remaining = budget - estimate_tokens(summary)
+
+    kept = []
+    for turn in reversed(turns):
+        cost = turn_tokens(turn)
+        if cost > remaining:
+            if not kept and remaining > estimate_tokens(turn["message"]):
+                response_budget = remaining - estimate_tokens(turn["message"])
+                kept.append({**turn, "response": truncate_to_tokens(turn["response"], response_budget)})
+            break
+        kept.append(turn)
+        remaining -= cost
+    kept.reverse()
+    return Conversation(summary, kept)
+
+
+async def load_conversation(user_id: str) -> Conversation:
+    """
+    Load the summary and the recent, not yet summarized turns for a user,
+    fitted to settings.chat_context_token_budget. Turns still in the chat
+    history write buffer are included, so a quick follow-up sees them.
+    """
+    try:
+        summary_doc = await chat_summaries_collection.find_one({"user_id": user_id}) or {}
+        query = {"user_id": user_id}
+        if summary_doc.get("summarized_until"):
+            query["timestamp"] = {"$gt": summary_doc["summarized_until"]}
+        recent = await chat_history_collection.find(
+            query, {"message": 1, "response": 1, "timestamp": 1}
+        ).sort("timestamp", -1).limit(max_unsummarized_turns()).to_list(None)
+    except Exception as e:
+        logger.error("Error loading conversation for %s: %s", user_id, e)
+        return EMPTY_CONVERSATION
+
+    stored_ids = {t["_id"] for t in recent}
+    recent.extend(r for r in chat_history_buffer.pending_for(user_id) if r["_id"] not in stored_ids)
+    recent.sort(key=lambda t: t["timestamp"])
+    recent = recent[-max_unsummarized_turns():]
+    turns = [{"message": t.get("message", ""), "response": t.get("response", "")} for t in recent]
+    return fit_to_budget(summary_doc.get("summary", ""), turns, settings.chat_context_token_budget)
+
+
+def format_turns(turns: List[Dict]) -> str:
+    return "\n".join(f"User: {t['message']}\nAssistant: {t['response']}" for t in turns)
+
+
+def format_conversation(conversation: Conversation) -> str:
+    """Render the conversation as a prompt section ("" if there is none)"""
+    if conversation.is_empty():
+        return ""
+    parts = []
+    if conversation.summary:
+        parts.append(f"Summary of earlier conversation: {conversation.summary}")
+    if conversation.turns:
+        parts.append(format_turns(conversation.turns))
+    return "\n\n".join(parts)
+
+
+def conversation_sections(conversation: Optional[Conversation]) -> List[Section]:
+    """
+    Chat prompt sections for the conversation so far. Older context is cut
+    before newer: the summary first, then the oldest turns. The last turn
+    outranks the schemes, since follow-ups refer to it.
+    """
+    if not conversation or conversation.is_empty():
+        return []
+    sections = [Section("history_header", "Conversation so far:", required=True)]
+    if conversation.summary:
+        sections.append(Section("summary", format_conversation(conversation._replace(turns=[]))))
+    last = len(conversation.turns) - 1
+    sections.extend(
+        Section(f"turn_{idx+1}", format_turns([turn]), priority=SCHEME_PRIORITY + 1 if idx == last else idx + 1)
+        for idx, turn in enumerate(conversation.turns)
+    )
+    sections.append(Section("history_end", "", required=True))
+    return sections
+
+
+def retrieval_query(user_message: str, conversation: Optional[Conversation]) -> str:
+    """
+    Query used to pick relevant schemes. Follow-ups ("what documents does it
+    need?") name nothing, so the previous question is included.
+    """
+    previous = conversation.last_user_message() if conversation else None
+    return f"{previous}\n{user_message}" if previous else user_message
+
+
+async def summarize_turns(previous_summary: str, turns: List[Dict]) -> str:
+    """Fold turns into the running summary with the best available provider"""
+    # llm_router imports the providers, which import this module for the prompt helpers
+    from app.services.llm_router import llm_router
+
+    prompt = f"""Update the summary of a conversation between a user and Sahayak AI, an assistant for Indian government schemes.
+Keep the schemes discussed, the user's situation (role, location, income, age) and any open questions.
+Write at most {settings.chat_summary_max_tokens * 3 // 4} words. Return only the summary.
+
+Current summary: {previous_summary or "(none)"}
+
+New messages:
+{format_turns(turns)}"""
+    return require_text(await llm_router.call(ANSWER, "complete", prompt), "llm_router").strip()
+
+
+async def _update_summary(user_id: str):
+    summary_doc = await chat_summaries_collection.find_one({"user_id": user_id}) or {}
+    query = {"user_id": user_id}
+    if summary_doc.get("summarized_until"):
+        query["timestamp"] = {"$gt": summary_doc["summarized_until"]}
+
+    # Fold a batch of the oldest turns once a full batch has piled up beyond the
+    # recent window, so the summary is rewritten every few messages, not on each one
+    pending = await chat_history_collection.find(
+        query, {"message": 1, "response": 1, "timestamp": 1}
+    ).sort("timestamp", 1).limit(max_unsummarized_turns()).to_list(None)
+    if len(pending) < max_unsummarized_turns():
+        return
+
+    to_fold = pending[:settings.chat_summary_batch_turns]
+    summary = await summarize_turns(summary_doc.get("summary", ""), to_fold)
+    if not summary:
+        return
+    await chat_summaries_collection.update_one(
+        {"user_id": user_id},
+        {
+            "$set": {
+                "summary": summary,
+                "summarized_until": to_fold[-1]["timestamp"],
+                "updated_at": datetime.utcnow()
+            },
+            "$inc": {"turns_summarized": len(to_fold)}
+        },
+        upsert=True
+    )
+
+
+async def update_summary(user_id: str):
+    """Fold old turns into the user's rolling summary if enough have accumulated"""
+    task = _summarizing.get(user_id)
+    if task is not None:
+        return
+    task = asyncio.create_task(_update_summary(user_id))
+    _summarizing[user_id] = task
+    task.add_done_callback(lambda _: _summarizing.pop(user_id, None))
+    try:
+        await task
+    except Exception as e:
+        logger.error("Error updating conversation summary for %s: %s", user_id, e)
+
+
+async def users_due_for_summary(user_ids: List[str]) -> List[str]:
+    """
+    Users with a full batch of turns beyond the recent window, i.e. the ones
+    _update_summary would fold. Two queries for a whole flushed batch.
+    """
+    summaries = await chat_summaries_collection.find(
+        {"user_id": {"$in": user_ids}}, {"user_id": 1, "summarized_until": 1}
+    ).to_list(None)
+    summarized_until = {doc["user_id"]: doc.get("summarized_until") for doc in summaries}
+    unsummarized = [
+        {"user_id": user_id, "timestamp": {"$gt": summarized_until[user_id]}} if summarized_until.get(user_id)
+        else {"user_id": user_id}
+        for user_id in user_ids
+    ]
+    counts = await chat_history_collection.aggregate([
+        {"$match": {"$or": unsummarized}},
+        {"$group": {"_id": "$user_id", "turns": {"$sum": 1}}},
+        {"$match": {"turns": {"$gte": max_unsummarized_turns()}}},
+    ]).to_list(None)
+    return [doc["_id"] for doc in counts]
+
+
+async def update_summaries(user_ids: List[str]):
+    """Flush listener: update the summaries of the users in a batch that need it"""
+    try:
+        due = await users_due_for_summary(user_ids)
+    except Exception as e:
+        logger.error("Error checking conversation summaries: %s", e)
+        return
+    await asyncio.gather(*(update_summary(user_id) for user_id in due))
+
+
+# Summaries are updated once a user's turns have been written
+chat_history_buffer.add_flush_listener(update_summaries)
@@ -0,0 +1,286 @@
+"""
+Eligibility matching without an LLM.
+At ingest the free-text ageRange / incomeLimit fields are parsed into numeric
+bounds, eligibleRoles into a bitmask and any state names into a state bitmask.
+The index keeps these in columnar NumPy arrays, so filtering the whole
+catalogue for a profile is a handful of vectorized comparisons.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import re
+import numpy as np
+from app.core.database import schemes_collection
+from app.services.search_service import SUMMARY_FIELDS
+
+ROLES = ["farmer", "student", "self_employed", "salaried", "unemployed", "other"]
+ROLE_BITS = {role: 1 << index for index, role in enumerate(ROLES)}
+# Schemes listing only "other" (or nothing) are treated as open to every role
+SPECIFIC_ROLES_MASK = sum(bit for role, bit in ROLE_BITS.items() if role != "other")
+
+# States and union territories (one bit each); aliases map to the canonical name
+STATES = [
+    "andhra pradesh", "arunachal pradesh", "assam", "bihar", "chhattisgarh", "goa", "gujarat",
+    "haryana", "himachal pradesh", "jharkhand", "karnataka", "kerala", "madhya pradesh",
+    "maharashtra", "manipur", "meghalaya", "mizoram", "nagaland", "odisha", "punjab",
+    "rajasthan", "sikkim", "tamil nadu", "telangana", "tripura", "uttar pradesh",
+    "uttarakhand", "west bengal", "andaman and nicobar islands", "chandigarh",
+    "dadra and nagar haveli and daman and diu", "delhi", "jammu and kashmir", "ladakh",
+    "lakshadweep", "puducherry",
+]
+STATE_BITS = {state: 1 << index for index, state in enumerate(STATES)}
+STATE_ALIASES = {
+    "orissa": "odisha", "pondicherry": "puducherry", "uttaranchal": "uttarakhand",
+    "new delhi": "delhi", "nct of delhi": "delhi", "j&k": "jammu and kashmir",
+    "andaman": "andaman and nicobar islands", "daman": "dadra and nagar haveli and daman and diu",
+    "महाराष्ट्र": "maharashtra", "उत्तर प्रदेश": "uttar pradesh", "बिहार": "bihar",
+    "राजस्थान": "rajasthan", "मध्य प्रदेश": "madhya pradesh", "दिल्ली": "delhi",
+    "AP": "andhra pradesh", "AR": "arunachal pradesh", "AS": "assam", "BR": "bihar",
+    "CG": "chhattisgarh", "GA": "goa", "GJ": "gujarat", "HR": "haryana", "HP": "himachal pradesh",
+    "JH": "jharkhand", "KA": "karnataka", "KL": "kerala", "MP": "madhya pradesh",
+    "MH": "maharashtra", "MN": "manipur", "ML": "meghalaya", "MZ": "mizoram", "NL": "nagaland",
+    "OD": "odisha", "PB": "punjab", "RJ": "rajasthan", "SK": "sikkim", "TN": "tamil nadu",
+    "TS": "telangana", "TR": "tripura", "UP": "uttar pradesh", "UK": "uttarakhand",
+    "WB": "west bengal", "CH": "chandigarh", "DL": "delhi", "JK": "jammu and kashmir",
+    "LA": "ladakh", "LD": "lakshadweep", "PY": "puducherry",
+}
+# Only full names are searched for in scheme text; two-letter codes are too ambiguous
+_STATE_NAME_RE = re.compile(
+    r"(?<!\w)(" + "|".join(
+        re.escape(name) for name in sorted(
+            STATES + [alias for alias in STATE_ALIASES if not alias.isupper()], key=len, reverse=True
+        )
+    ) + r")(?!\w)",
+    re.IGNORECASE
+)
+
+# Fields searched for state names (raw page text mentions states too loosely)
+STATE_FIELDS = ["name", "shortDescription", "eligibility"]
+
+_NUMBER = r"(\d{1,3})"
+AGE_BETWEEN_RE = re.compile(_NUMBER + r"\s*(?:-|–|to|and)\s*" + _NUMBER + r"\s*(?:years|yrs)?", re.IGNORECASE)
+AGE_MIN_RE = re.compile(
+    r"(?:above|over|at least|minimum(?: age)?(?: of)?|min\.?|more than|≥|>=?)\s*" + _NUMBER
+    + r"|" + _NUMBER + r"\s*(?:years|yrs)?(?: of age)?\s*(?:and|or)\s*(?:above|older|more)"
+    + r"|" + _NUMBER + r"\s*\+",
+    re.IGNORECASE
+)
+AGE_MAX_RE = re.compile(
+    r"(?:below|under|up ?to|not more than|not exceeding|maximum(?: age)?(?: of)?|max\.?|less than|≤|<=?)\s*" + _NUMBER
+    + r"|" + _NUMBER + r"\s*(?:years|yrs)?(?: of age)?\s*(?:and|or)\s*(?:below|less|younger)",
+    re.IGNORECASE
+)
+
+INCOME_AMOUNT_RE = re.compile(
+    r"(rs\.?|inr|₹)?\s*(\d[\d,]*(?:\.\d+)?)\s*(lakhs?|lacs?|lpa|crores?|cr|thousand|k)?\b",
+    re.IGNORECASE
+)
+INCOME_MULTIPLIERS = {
+    "lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "lacs": 1e5, "lpa": 1e5,
+    "crore": 1e7, "crores": 1e7, "cr": 1e7, "thousand": 1e3, "k": 1e3,
+}
+MONTHLY_RE = re.compile(r"per month|monthly|/\s*month|p\.m\.", re.IGNORECASE)
+NO_INCOME_LIMIT_RE = re.compile(r"\bno (?:income )?(?:limit|ceiling|bar)\b", re.IGNORECASE)
+
+
+def parse_age_range(text: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """'18-40 years' -> (18, 40), 'above 60 years' -> (60, None); unknown -> (None, None)"""
+    if not text:
+        return None, None
+    match = AGE_BETWEEN_RE.search(text)
+    if match:
+        low, high = int(match.group(1)), int(match.group(2))
+        if low <= high <= 120:
+            return low, high
+    minimum = AGE_MIN_RE.search(text)
+    maximum = AGE_MAX_RE.search(text)
+    low = int(next(g for g in minimum.groups() if g)) if minimum else None
+    high = int(next(g for g in maximum.groups() if g)) if maximum else None
+    if low is not None and high is not None and low > high:
+        return None, None
+    return low, high
+
+
+def parse_income_limit(text: Optional[str]) -> Optional[float]:
+    """
+    Annual income ceiling in rupees: 'below ₹2.5 lakh per annum' -> 250000.0.
+    Monthly limits are annualized; no recognizable amount -> None (no limit).
+    """
+    if not text or NO_INCOME_LIMIT_RE.search(text):
+        return None
+    for match in INCOME_AMOUNT_RE.finditer(text):
+        currency, digits, unit = match.group(1), match.group(2).replace(",", ""), (match.group(3) or "").lower()
+        try:
+            amount = float(digits)
+        except ValueError:
+            continue
+        # Bare numbers without a currency or unit are usually years or counts
+        if not currency and not unit and amount < 10000:
+            continue
+        amount *= INCOME_MULTIPLIERS.get(unit, 1)
+        if MONTHLY_RE.search(text):
+            amount *= 12
+        return amount
+    return None
+
+
+def role_mask(roles) -> int:
+    return sum(ROLE_BITS.get(role, 0) for role in set(roles or []))
+
+
+def normalize_state(state: Optional[str]) -> Optional[str]:
+    """Canonical state name for a name, alias or two-letter code; None if unknown"""
+    if not state:
+        return None
+    state = state.strip()
+    if state.upper() in STATE_ALIASES and len(state) == 2:
+        return STATE_ALIASES[state.upper()]
+    lowered = " ".join(state.lower().split())
+    if lowered in STATE_ALIASES:
+        return STATE_ALIASES[lowered]
+    lowered = lowered.replace("&", "and")
+    return lowered if lowered in STATE_BITS else None
+
+
+def detect_states(scheme: Dict) -> List[str]:
+    """States named in the scheme's name, description or eligibility (empty = nationwide)"""
+    text = " ".join(
+        " ".join(value) if isinstance(value, list) else str(value or "")
+        for value in (scheme.get(field) for field in STATE_FIELDS)
+    )
+    states = [normalize_state(match.group(1)) for match in _STATE_NAME_RE.finditer(text)]
+    return sorted(set(state for state in states if state))
+
+
+def eligibility_bounds(scheme: Dict) -> Dict:
+    """Numeric eligibility bounds stored with the scheme at ingest"""
+    age_min, age_max = parse_age_range(scheme.get("ageRange"))
+    return {
+        "age_min": age_min,
+        "age_max": age_max,
+        "income_max": parse_income_limit(scheme.get("incomeLimit")),
+        "role_mask": role_mask(scheme.get("eligibleRoles")),
+        "states": detect_states(scheme),
+    }
+
+
+class SchemeEligibilityIndex:
+    """
+    Columnar eligibility bounds for every scheme.
+    Each column is a NumPy array indexed by row; missing bounds are stored as
+    -inf/+inf (open) so one comparison per column covers every scheme.
+    Arrays grow by doubling like the vector index.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._allocate(capacity)
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self.summaries: Dict[str, Dict] = {}
+        self.loaded = False
+        self._load_lock = asyncio.Lock()
+
+    def _allocate(self, capacity: int):
+        self.age_min = np.full(capacity, -np.inf, dtype=np.float32)
+        self.age_max = np.full(capacity, np.inf, dtype=np.float32)
+        self.income_max = np.full(capacity, np.inf, dtype=np.float64)
+        self.role_mask = np.zeros(capacity, dtype=np.uint8)
+        self.state_mask = np.zeros(capacity, dtype=np.uint64)
+        # False for removed rows
+        self.active = np.zeros(capacity, dtype=bool)
+
+    def _grow(self):
+        size = len(self._ids)
+        old = (self.age_min, self.age_max, self.income_max, self.role_mask, self.state_mask, self.active)
+        self._allocate(self.age_min.shape[0] * 2)
+        for new, previous in zip(
+            (self.age_min, self.age_max, self.income_max, self.role_mask, self.state_mask, self.active), old
+        ):
+            new[:size] = previous[:size]
+
+    def __len__(self) -> int:
+        return len(self.summaries)
+
+    def upsert(self, scheme: Dict) -> None:
+        """Insert or replace a scheme's row (uses stored bounds when present)"""
+        scheme_id = str(scheme.get("id") or scheme.get("_id"))
+        bounds = scheme.get("eligibility_bounds") or eligibility_bounds(scheme)
+
+        position = self._positions.get(scheme_id)
+        if position is None:
+            position = len(self._ids)
+            if position == self.age_min.shape[0]:
+                self._grow()
+            self._ids.append(scheme_id)
+            self._positions[scheme_id] = position
+
+        self.age_min[position] = -np.inf if bounds.get("age_min") is None else bounds["age_min"]
+        self.age_max[position] = np.inf if bounds.get("age_max") is None else bounds["age_max"]
+        self.income_max[position] = np.inf if bounds.get("income_max") is None else bounds["income_max"]
+        self.role_mask[position] = bounds.get("role_mask") or 0
+        self.state_mask[position] = sum(STATE_BITS.get(state, 0) for state in bounds.get("states") or [])
+        self.active[position] = True
+
+        summary = {field: scheme.get(field) for field in SUMMARY_FIELDS}
+        summary["id"] = scheme_id
+        summary["ageRange"] = scheme.get("ageRange")
+        summary["incomeLimit"] = scheme.get("incomeLimit")
+        self.summaries[scheme_id] = summary
+
+    def remove(self, scheme_id: str) -> None:
+        position = self._positions.get(scheme_id)
+        if position is not None:
+            self.active[position] = False
+        self.summaries.pop(scheme_id, None)
+
+    def match(
+        self,
+        age: Optional[int] = None,
+        income: Optional[float] = None,
+        role: Optional[str] = None,
+        state: Optional[str] = None
+    ) -> List[str]:
+        """Ids of schemes whose bounds admit the profile; unspecified profile fields are not filtered on"""
+        n = len(self._ids)
+        if n == 0:
+            return []
+        mask = self.active[:n].copy()
+        if age is not None:
+            mask &= (self.age_min[:n] <= age) & (age <= self.age_max[:n])
+        if income is not None:
+            mask &= income <= self.income_max[:n]
+        if role is not None:
+            roles = self.role_mask[:n]
+            mask &= ((roles & SPECIFIC_ROLES_MASK) == 0) | ((roles & ROLE_BITS.get(role, 0)) != 0)
+        if state is not None:
+            states = self.state_mask[:n]
+            mask &= (states == 0) | ((states & np.uint64(STATE_BITS.get(state, 0))) != 0)
+        return [self._ids[i] for i in np.flatnonzero(mask)]
+
+    async def ensure_loaded(self) -> None:
+        """Build the index from the database on first use"""
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if self.loaded:
+                return
+            projection = {field: 1 for field in set(SUMMARY_FIELDS) | set(STATE_FIELDS)}
+            projection.update({"ageRange": 1, "incomeLimit": 1, "eligibility_bounds": 1})
+            async for scheme in schemes_collection.find({}, projection):
+                self.upsert(scheme)
+            self.loaded = True
+
+    def get_stats(self) -> Dict:
+        n = len(self._ids)
+        active = self.active[:n]
+        return {
+            "indexed_schemes": len(self.summaries),
+            "with_age_bounds": int(np.count_nonzero(active & (np.isfinite(self.age_min[:n]) | np.isfinite(self.age_max[:n])))),
+            "with_income_limit": int(np.count_nonzero(active & np.isfinite(self.income_max[:n]))),
+            "state_specific": int(np.count_nonzero(active & (self.state_mask[:n] != 0))),
+            "loaded": self.loaded,
+        }
+
+
+# Global eligibility index instance
+eligibility_index = SchemeEligibilityIndex()
@@ -0,0 +1,288 @@
+"""
+Embedding service for semantic scheme retrieval.
+Each scheme is embedded once at ingest and kept in a contiguous NumPy matrix,
+so the chat path only has to embed the user's question and run one
+matrix-vector product to pick the most relevant schemes.
+"""
+
+from typing import Optional, List, Dict, Tuple
+import logging
+import asyncio
+import hashlib
+import re
+import numpy as np
+import google.generativeai as genai
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.core.config import settings
+from app.core.database import schemes_collection
+
+logger = logging.getLogger(__name__)
+
+genai.configure(api_key=settings.gemini_api_key)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def scheme_to_text(scheme: Dict) -> str:
+    """Build the text that represents a scheme in the vector space"""
+    parts = [
+        scheme.get("name") or "",
+        scheme.get("category") or "",
+        scheme.get("shortDescription") or "",
+        " ".join(scheme.get("tags") or []),
+        " ".join(scheme.get("eligibility") or []),
+        " ".join(scheme.get("benefits") or []),
+        " ".join(scheme.get("eligibleRoles") or []),
+    ]
+    return "\n".join(p for p in parts if p)
+
+
+class GeminiEmbedder:
+    """Embeds text with the configured Gemini embedding model"""
+
+    def __init__(self, model: str, dimensions: Optional[int] = None):
+        self.model = model
+        self.dimensions = dimensions
+
+    # The embedding API accepts at most 100 texts per request
+    batch_size = 100
+
+    async def embed_documents(self, texts: List[str]) -> np.ndarray:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            result = await genai.embed_content_async(
+                model=self.model,
+                content=texts[start:start + self.batch_size],
+                task_type="retrieval_document",
+                output_dimensionality=self.dimensions
+            )
+            vectors.extend(result["embedding"])
+        return np.asarray(vectors, dtype=np.float32)
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        result = await genai.embed_content_async(
+            model=self.model,
+            content=text,
+            task_type="retrieval_query",
+            output_dimensionality=self.dimensions
+        )
+        return np.asarray(result["embedding"], dtype=np.float32)
+
+
+class HashingEmbedder:
+    """
+    Local, deterministic embedder based on the hashing trick.
+    Needs no network access, so it can be used offline and in tests.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            sign = 1.0 if value & 1 else -1.0
+            vector[(value >> 1) % self.dim] += sign
+        return vector
+
+    async def embed_documents(self, texts: List[str]) -> np.ndarray:
+        return np.stack([self._embed(t) for t in texts]) if texts else np.zeros((0, self.dim), dtype=np.float32)
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        return self._embed(text)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class SchemeVectorIndex:
+    """
+    In-memory cosine similarity index over scheme embeddings.
+    Vectors are L2-normalized on insert and stored row-wise in a single
+    float32 matrix that grows by doubling, so search is one BLAS call.
+    """
+
+    def __init__(self):
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        # The scheme list the index was last synced against, keyed by id
+        self._synced_source: Optional[List[Dict]] = None
+        self._lookup: Dict[str, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def dim(self) -> Optional[int]:
+        return None if self._matrix is None else self._matrix.shape[1]
+
+    def upsert(self, scheme_id: str, vector) -> None:
+        """Insert or replace the vector for a scheme"""
+        vector = _normalize(np.asarray(vector, dtype=np.float32).reshape(-1))
+        if self._matrix is None or vector.shape[0] != self._matrix.shape[1]:
+            # First vector, or the embedding model changed: start over
+            self._matrix = np.zeros((16, vector.shape[0]), dtype=np.float32)
+            self._ids = []
+            self._positions = {}
+
+        position = self._positions.get(scheme_id)
+        if position is None:
+            position = len(self._ids)
+            if position == self._matrix.shape[0]:
+                grown = np.zeros((self._matrix.shape[0] * 2, self._matrix.shape[1]), dtype=np.float32)
+                grown[:position] = self._matrix[:position]
+                self._matrix = grown
+            self._ids.append(scheme_id)
+            self._positions[scheme_id] = position
+        self._matrix[position] = vector
+
+    def search(self, query_vector, k: int = 10) -> List[Tuple[str, float]]:
+        """Return up to k (scheme_id, score) pairs, best first"""
+        n = len(self._ids)
+        if n == 0 or k <= 0:
+            return []
+        query = _normalize(np.asarray(query_vector, dtype=np.float32).reshape(-1))
+        if query.shape[0] != self._matrix.shape[1]:
+            return []
+        scores = self._matrix[:n] @ query
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[i], float(scores[i])) for i in top]
+
+    def clear(self) -> None:
+        self._matrix = None
+        self._ids = []
+        self._positions = {}
+        self._synced_source = None
+        self._lookup = {}
+
+    def get_stats(self) -> Dict:
+        return {
+            "indexed_schemes": len(self._ids),
+            "dimensions": self.dim,
+            "embedder": type(embedder).__name__,
+        }
+
+
+def create_embedder():
+    """Create the embedder selected by settings.embedding_backend"""
+    if settings.embedding_backend == "hashing":
+        return HashingEmbedder()
+    return GeminiEmbedder(settings.gemini_embed_model, settings.embedding_dimensions)
+
+
+embedder = create_embedder()
+scheme_index = SchemeVectorIndex()
+_sync_lock = asyncio.Lock()
+
+
+def set_embedder(new_embedder) -> None:
+    """Swap the embedder (e.g. a local one for offline tests) and reset the index"""
+    global embedder
+    embedder = new_embedder
+    scheme_index.clear()
+
+
+async def embed_scheme(scheme: Dict) -> List[float]:
+    """Embed a single scheme document; used once at ingest time"""
+    vectors = await embedder.embed_documents([scheme_to_text(scheme)])
+    return vectors[0].tolist()
+
+
+async def embed_schemes(schemes: List[Dict]) -> List[List[float]]:
+    """Embed a batch of scheme documents in as few requests as possible"""
+    if not schemes:
+        return []
+    vectors = await embedder.embed_documents([scheme_to_text(s) for s in schemes])
+    return [v.tolist() for v in vectors]
+
+
+async def load_stored_embeddings(scheme_ids: List[str]) -> Dict[str, List[float]]:
+    """Stored vectors for the given schemes (the scheme cache does not load them)"""
+    object_ids = [ObjectId(scheme_id) for scheme_id in scheme_ids if ObjectId.is_valid(scheme_id)]
+    if not object_ids:
+        return {}
+    cursor = schemes_collection.find({"_id": {"$in": object_ids}, "embedding": {"$exists": True}}, {"embedding": 1})
+    return {str(doc["_id"]): doc["embedding"] async for doc in cursor}
+
+
+async def sync_index(schemes: List[Dict]) -> None:
+    """
+    Make sure every scheme in the list is in the index.
+    Stored embeddings are reused (read from the database for schemes that do
+    not carry one); schemes ingested before embeddings existed are embedded
+    once and the vector is written back to the database.
+    """
+    if scheme_index._synced_source is schemes:
+        return
+
+    async with _sync_lock:
+        unindexed = [s for s in schemes if s.get("id") is not None and s["id"] not in scheme_index._positions]
+        stored = {s["id"]: s["embedding"] for s in unindexed if s.get("embedding")}
+        without_vector = [s["id"] for s in unindexed if s["id"] not in stored]
+        if without_vector:
+            stored.update(await load_stored_embeddings(without_vector))
+
+        missing = []
+        for scheme in unindexed:
+            vector = stored.get(scheme["id"])
+            if vector and (scheme_index.dim is None or len(vector) == scheme_index.dim):
+                scheme_index.upsert(scheme["id"], vector)
+            else:
+                missing.append(scheme)
+
+        if missing:
+            vectors = await embedder.embed_documents([scheme_to_text(s) for s in missing])
+            for scheme, vector in zip(missing, vectors):
+                scheme_index.upsert(scheme["id"], vector)
+            # One round trip for all the new vectors
+            try:
+                await schemes_collection.bulk_write([
+                    UpdateOne({"_id": ObjectId(scheme["id"])}, {"$set": {"embedding": vector.tolist()}})
+                    for scheme, vector in zip(missing, vectors)
+                ], ordered=False)
+            except Exception as e:
+                logger.error("Error storing %d embeddings: %s", len(missing), e)
+
+        scheme_index._lookup = {s["id"]: s for s in schemes if s.get("id") is not None}
+        scheme_index._synced_source = schemes
+
+
+async def select_relevant_schemes(query: str, schemes: List[Dict], k: Optional[int] = None) -> List[Dict]:
+    """
+    Pick the top-k schemes for a query by cosine similarity.
+    Falls back to the first k schemes if embedding fails.
+    """
+    k = k or settings.retrieval_top_k
+    if len(schemes) <= k:
+        return schemes
+
+    try:
+        await sync_index(schemes)
+        query_vector = await embedder.embed_query(query)
+    except Exception as e:
+        logger.error("Error in select_relevant_schemes: %s", e)
+        return schemes[:k]
+
+    by_id = scheme_index._lookup
+    # Over-fetch in case the index holds schemes that are no longer in the list
+    hits = scheme_index.search(query_vector, k * 2)
+    selected = [by_id[scheme_id] for scheme_id, _ in hits if scheme_id in by_id][:k]
+    return selected or schemes[:k]
+
+
+async def select_context_schemes(query: str, schemes: List[Dict]) -> List[Dict]:
+    """
+    The schemes sent to the model with a chat question. Selected once before
+    dispatch, so every provider (and a hedged second one) gets the same list.
+    The caller builds the query (see conversation_service.retrieval_query).
+    """
+    return await select_relevant_schemes(query, schemes)
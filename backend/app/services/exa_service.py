@@ -1,107 +1,366 @@
 from exa_py import Exa
+from pymongo import UpdateOne
 from app.core.config import settings
-from app.core.database import schemes_collection, users_collection, notifications_collection
-from app.services.whatsapp_service import send_whatsapp_notification
-from app.services.gemini_service import process_scheme_data_gemini as process_scheme_data
+from app.core.database import schemes_collection
+from app.core.metrics import INGEST_STAGE_SECONDS
+from app.services.notification_queue import enqueue_scheme_notifications
+from app.services.llm_router import process_scheme_data, process_scheme_batch
+from app.services.prompt_builder import plan_extraction_batches
+from app.services.heuristic_extractor import extract_heuristically
+from app.services.embedding_service import embed_schemes, scheme_index
+from app.services.search_service import scheme_search_index
+from app.services.eligibility_service import eligibility_index, eligibility_bounds
+from app.services.recommendation_service import scheme_recommendations
+from app.services.cache_service import scheme_cache, answer_cache
+from app.services.explanation_service import get_or_create_explanation
+from app.services.translation_service import translate_schemes, backfill_translations
+from contextlib import contextmanager
 from datetime import datetime
+import logging
+import asyncio
+import hashlib
+import time
+import unicodedata
 
-async def fetch_and_store_schemes():
-    """
-    Workflow:
-    1. Exa scrapes data once
-    2. Raw data is sent to Groq for processing
-    3. Groq returns structured JSON
-    4. Both raw and processed data are stored in schemas collection
-    5. Users are notified about new schemes
-    """
+logger = logging.getLogger(__name__)
+
+SEARCH_QUERY = "government financial schemes India eligibility benefits application"
+
+@contextmanager
+def timed_stage(timings: dict, stage: str):
+    """Record the wall time of a pipeline stage in milliseconds (and in /metrics)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings[stage] = round(elapsed * 1000, 1)
+        INGEST_STAGE_SECONDS.observe(elapsed, stage=stage)
+
+async def search_schemes(num_results: int):
+    """Run the (synchronous) Exa search in a worker thread so the event loop stays free"""
     exa = Exa(api_key=settings.exa_api_key)
-    
-    # Step 1: Exa scrapes government scheme data
-    print("Step 1: Scraping data with Exa...")
-    results = exa.search_and_contents(
-        "government financial schemes India eligibility benefits application",
-        num_results=10,
+    results = await asyncio.to_thread(
+        exa.search_and_contents,
+        SEARCH_QUERY,
+        num_results=num_results,
         text=True  # Get full text content
     )
+    return results.results
+
+def content_hash(text: str) -> str:
+    """Hash of the page text, insensitive to case and whitespace changes"""
+    normalized = " ".join(unicodedata.normalize("NFKC", text or "").lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+async def classify_results(raw_items):
+    """
+    Compare scraped pages with stored schemes by URL and content hash, in one query.
+    Returns a dict with:
+    - insert: pages never seen before (need extraction)
+    - update: (existing doc, page) pairs whose content changed (need re-extraction)
+    - link: (canonical source_url, url) pairs: same content under another URL
+    - backfill: (doc id, hash) for stored schemes that predate content hashes
+    - unchanged: count of pages that are already up to date
+    """
+    pages = {}
+    for raw_data in raw_items:
+        pages.setdefault(raw_data["url"], raw_data)
+    hashes = {url: content_hash(raw_data["description"]) for url, raw_data in pages.items()}
+
+    existing = await schemes_collection.find(
+        {"$or": [
+            {"source_url": {"$in": list(pages)}},
+            {"alternate_urls": {"$in": list(pages)}},
+            {"content_hash": {"$in": list(set(hashes.values()))}}
+        ]},
+        {"source_url": 1, "alternate_urls": 1, "content_hash": 1, "version": 1, "created_at": 1, "raw_data.description": 1}
+    ).to_list(None)
+
+    by_url = {}
+    by_hash = {}
+    for doc in existing:
+        by_url[doc["source_url"]] = doc
+        for url in doc.get("alternate_urls") or []:
+            by_url[url] = doc
+        if doc.get("content_hash"):
+            by_hash[doc["content_hash"]] = doc["source_url"]
+
+    plan = {"insert": [], "update": [], "link": [], "backfill": [], "unchanged": 0}
+    for url, raw_data in pages.items():
+        page_hash = hashes[url]
+        raw_data["content_hash"] = page_hash
+        doc = by_url.get(url)
+        if doc is not None:
+            stored_hash = doc.get("content_hash") or content_hash((doc.get("raw_data") or {}).get("description", ""))
+            if stored_hash == page_hash:
+                plan["unchanged"] += 1
+                if not doc.get("content_hash"):
+                    plan["backfill"].append((doc["_id"], page_hash))
+                logger.debug("Scheme unchanged: %s", raw_data['title'])
+            else:
+                plan["update"].append((doc, raw_data))
+                logger.debug("Scheme changed, re-extracting: %s", raw_data['title'])
+        elif page_hash in by_hash:
+            plan["link"].append((by_hash[page_hash], url))
+            logger.debug("Duplicate content, linking %s to %s", url, by_hash[page_hash])
+        else:
+            plan["insert"].append(raw_data)
+            # Later pages with the same content in this batch link to this one
+            by_hash[page_hash] = url
+    return plan
+
+def build_raw_data(item):
+    return {
+        "title": item.title,
+        "description": getattr(item, 'text', getattr(item, 'summary', '')) or "",
+        "url": item.url,
+        "scraped_at": datetime.utcnow().isoformat()
+    }
+
+def build_scheme(raw_data, structured_data, extraction=None):
+    """Combine raw and processed data into a scheme document"""
+    now = datetime.utcnow()
+    scheme = {
+        "name": structured_data.get("name", raw_data["title"]),
+        "category": structured_data.get("category", "general"),
+        "shortDescription": structured_data.get("shortDescription", ""),
+        "eligibility": structured_data.get("eligibility", []),
+        "benefits": structured_data.get("benefits", []),
+        "requiredDocuments": structured_data.get("requiredDocuments", []),
+        "eligibleRoles": structured_data.get("eligibleRoles", ["other"]),
+        "tags": structured_data.get("tags", []),
+        "ageRange": structured_data.get("ageRange"),
+        "incomeLimit": structured_data.get("incomeLimit"),
+        "applicationProcess": structured_data.get("applicationProcess", ""),
+        "officialWebsite": structured_data.get("officialWebsite", raw_data["url"]),
+        "source_url": raw_data["url"],
+        "content_hash": raw_data["content_hash"],
+        "version": 1,
+        "alternate_urls": [],
+        # Store raw scraped data for reference
+        "raw_data": raw_data,
+        # Store the processed JSON from the LLM
+        "processed_data": structured_data,
+        # How processed_data was produced: {"method": "heuristic" | "llm", "confidence"}
+        "extraction": extraction or {"method": "llm", "confidence": None},
+        "is_new": True,
+        "created_at": now,
+        "processed_at": now
+    }
+    # Numeric age/income bounds and role/state masks for /schemes/eligible
+    scheme["eligibility_bounds"] = eligibility_bounds(scheme)
+    return scheme
+
+async def extract_schemes(raw_items):
+    """
+    Extract structured data for all items, in input order.
+    Well-structured pages are parsed deterministically; only pages whose
+    heuristic confidence is below settings.heuristic_extraction_min_confidence
+    go to the LLM, at most settings.ingest_extraction_concurrency calls at a
+    time. Pages are packed several to a call (settings.extract_batch_size);
+    pages a batch gets wrong are retried one by one.
+    """
+    schemes = [None] * len(raw_items)
+    llm_items = []
+    for index, raw_data in enumerate(raw_items):
+        if settings.heuristic_extraction_enabled:
+            structured_data, confidence = extract_heuristically(raw_data)
+            if confidence >= settings.heuristic_extraction_min_confidence:
+                logger.debug("Extracted without LLM (confidence %s): %s", confidence, raw_data['title'])
+                schemes[index] = build_scheme(raw_data, structured_data, {"method": "heuristic", "confidence": confidence})
+                continue
+        llm_items.append((index, raw_data))
+
+    llm_schemes = await extract_schemes_llm([raw_data for _, raw_data in llm_items])
+    for (index, _), scheme in zip(llm_items, llm_schemes):
+        schemes[index] = scheme
+    return schemes
+
+async def extract_schemes_llm(raw_items):
+    """LLM extraction, batched and under a concurrency limit"""
+    if not raw_items:
+        return []
+    semaphore = asyncio.Semaphore(settings.ingest_extraction_concurrency)
+
+    async def extract(batch):
+        async with semaphore:
+            logger.debug("Processing %s scheme(s) with LLM: %s", len(batch), ', '.join(raw_data['title'] for raw_data in batch))
+            if len(batch) == 1:
+                return [await process_scheme_data(batch[0])]
+            return await process_scheme_batch(batch)
+
+    if settings.extract_batch_size > 1:
+        batches = plan_extraction_batches(raw_items)
+    else:
+        batches = [[raw_data] for raw_data in raw_items]
+    results = await asyncio.gather(*(extract(batch) for batch in batches))
+    return [
+        build_scheme(raw_data, structured_data)
+        for batch, batch_results in zip(batches, results)
+        for raw_data, structured_data in zip(batch, batch_results)
+    ]
+
+async def embed_all(schemes):
+    """Embed all new schemes in one batch so chat retrieval never re-embeds them"""
+    try:
+        vectors = await embed_schemes(schemes)
+    except Exception as e:
+        logger.error("Error embedding schemes: %s", e)
+        return
+    for scheme, vector in zip(schemes, vectors):
+        scheme["embedding"] = vector
+
+# Fields that are kept when a changed page is re-extracted
+PRESERVED_ON_UPDATE = {"created_at", "is_new", "version", "alternate_urls", "source_url"}
+
+async def store_schemes(inserts, updates, plan):
+    """
+    Write all changes in bulk:
+    - new schemes as $setOnInsert upserts keyed by source_url (a concurrent run
+      cannot overwrite or duplicate a scheme)
+    - changed schemes updated in place with the version bumped
+    - content hashes backfilled for older documents
+    Duplicate URLs are linked afterwards, once their canonical scheme exists.
+    Returns (inserted, updated) as lists of (scheme, id).
+    """
+    operations = [
+        UpdateOne({"source_url": scheme["source_url"]}, {"$setOnInsert": scheme}, upsert=True)
+        for scheme in inserts
+    ]
+    now = datetime.utcnow()
+    for doc, scheme in updates:
+        fields = {k: v for k, v in scheme.items() if k not in PRESERVED_ON_UPDATE}
+        fields["updated_at"] = now
+        fields["version"] = (doc.get("version") or 1) + 1
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+    for doc_id, page_hash in plan["backfill"]:
+        operations.append(UpdateOne({"_id": doc_id}, {"$set": {"content_hash": page_hash}}))
+
+    inserted = []
+    if operations:
+        result = await schemes_collection.bulk_write(operations, ordered=False)
+        inserted = [(inserts[index], str(_id)) for index, _id in result.upserted_ids.items()]
+
+    if plan["link"]:
+        await schemes_collection.bulk_write([
+            UpdateOne({"source_url": source_url}, {"$addToSet": {"alternate_urls": url}})
+            for source_url, url in plan["link"]
+        ], ordered=False)
+
+    updated = [(scheme, str(doc["_id"])) for doc, scheme in updates]
+    return inserted, updated
+
+async def fetch_and_store_schemes(num_results: int = None):
+    """
+    Staged, incremental ingestion pipeline:
+    1. Exa search (in a worker thread)
+    2. One query classifies each page by URL and content hash: new, changed,
+       unchanged, or duplicate content under another URL
+    3. Extraction, only for new and changed pages: deterministic parsing for
+       well-structured pages, batched LLM calls under a semaphore for the rest;
+       the extracted text is then translated into Hindi and Marathi
+    4. Batch embedding of the extracted schemes
+    5. One bulk write: inserts, in-place updates (version bumped), and links
+    6. In-memory indexes and caches are updated
+    7. Stored schemes still missing a current translation are translated
+       (a bounded batch per run)
+    8. In-app notifications are written and WhatsApp messages queued
+       (delivered in the background by the notification queue workers)
+    The result includes per-stage timings in milliseconds.
+    """
+    num_results = num_results or settings.exa_num_results
+    timings = {}
+    pipeline_start = time.perf_counter()
+    started_at = datetime.utcnow()
+
+    logger.info("Step 1: Scraping data with Exa...")
+    with timed_stage(timings, "search"):
+        results = await search_schemes(num_results)
+
+    with timed_stage(timings, "dedupe"):
+        plan = await classify_results([build_raw_data(item) for item in results])
+
+    to_extract = plan["insert"] + [raw_data for _, raw_data in plan["update"]]
+    logger.info("Step 2: Processing %s new or changed schemes with LLM...", len(to_extract))
+    with timed_stage(timings, "extract"):
+        schemes = await extract_schemes(to_extract)
+    heuristic_count = sum(1 for scheme in schemes if scheme["extraction"]["method"] == "heuristic")
+
+    translated = 0
+    if settings.precompute_translations and schemes:
+        with timed_stage(timings, "translate"):
+            translated = await translate_schemes(schemes)
+
+    with timed_stage(timings, "embed"):
+        await embed_all(schemes)
+
+    inserts = schemes[:len(plan["insert"])]
+    updates = [(doc, scheme) for (doc, _), scheme in zip(plan["update"], schemes[len(plan["insert"]):])]
+    logger.info("Step 3: Storing %s new and %s updated schemes in database...", len(inserts), len(updates))
+    with timed_stage(timings, "store"):
+        inserted, updated = await store_schemes(inserts, updates, plan)
 
     new_schemes = []
-    for item in results.results:
-        # Check if scheme already exists
-        existing = await schemes_collection.find_one({"source_url": item.url})
-        if existing:
-            print(f"Scheme already exists: {item.title}")
-            continue
-
-        # Step 2: Prepare raw scraped data
-        raw_data = {
-            "title": item.title,
-            "description": getattr(item, 'text', getattr(item, 'summary', '')),
-            "url": item.url,
-            "scraped_at": datetime.utcnow().isoformat()
-        }
-        
-        print(f"Step 2: Processing scheme with Groq: {item.title}")
-        # Step 3: Send to Groq for structured processing
-        structured_data = await process_scheme_data(raw_data)
-        
-        # Step 4: Store both raw and processed data in schema
-        scheme = {
-            "name": structured_data.get("name", item.title),
-            "category": structured_data.get("category", "general"),
-            "shortDescription": structured_data.get("shortDescription", ""),
-            "eligibility": structured_data.get("eligibility", []),
-            "benefits": structured_data.get("benefits", []),
-            "requiredDocuments": structured_data.get("requiredDocuments", []),
-            "eligibleRoles": structured_data.get("eligibleRoles", ["other"]),
-            "tags": structured_data.get("tags", []),
-            "ageRange": structured_data.get("ageRange"),
-            "incomeLimit": structured_data.get("incomeLimit"),
-            "applicationProcess": structured_data.get("applicationProcess", ""),
-            "officialWebsite": structured_data.get("officialWebsite", item.url),
-            "source_url": item.url,
-            # Store raw scraped data for reference
-            "raw_data": raw_data,
-            # Store the processed JSON from Groq
-            "processed_data": structured_data,
-            "is_new": True,
-            "created_at": datetime.utcnow(),
-            "processed_at": datetime.utcnow()
-        }
-        
-        print(f"Step 3: Storing scheme in database: {scheme['name']}")
-        result = await schemes_collection.insert_one(scheme)
-        new_schemes.append({
-            "id": str(result.inserted_id),
-            "title": scheme["name"],
-            "url": scheme["source_url"],
-            "category": scheme["category"]
-        })
-        
-        print(f"✓ Successfully processed and stored: {scheme['name']}")
-
-    # Step 5: Notify users about new schemes
+    with timed_stage(timings, "index"):
+        for scheme, scheme_id in inserted + updated:
+            if scheme.get("embedding"):
+                scheme_index.upsert(scheme_id, scheme["embedding"])
+            scheme_search_index.add({**scheme, "id": scheme_id})
+            eligibility_index.upsert({**scheme, "id": scheme_id})
+            logger.debug("✓ Successfully processed and stored: %s", scheme['name'])
+        # Only the role lists these schemes appear in are rebuilt
+        scheme_recommendations.upsert([{**scheme, "id": scheme_id} for scheme, scheme_id in inserted + updated])
+        for scheme, scheme_id in inserted:
+            new_schemes.append({
+                "id": scheme_id,
+                "title": scheme["name"],
+                "url": scheme["source_url"],
+                "category": scheme["category"]
+            })
+
+        # New or changed schemes change the scheme set: bump the cache version
+        # (readers get the old set until one background refresh completes)
+        # and drop cached answers
+        if inserted or updated:
+            scheme_cache.bump_version()
+            answer_cache.clear()
+
+    if settings.precompute_explanations and (inserted or updated):
+        with timed_stage(timings, "explain"):
+            await asyncio.gather(*(
+                get_or_create_explanation(scheme_id, scheme) for scheme, scheme_id in inserted + updated
+            ))
+
+    backfilled = []
+    if settings.precompute_translations:
+        with timed_stage(timings, "translate_backfill"):
+            try:
+                backfilled, _ = await backfill_translations(started_at)
+            except Exception as e:
+                logger.error("Error backfilling translations: %s", e)
+        if backfilled:
+            scheme_recommendations.upsert(backfilled)
+            scheme_cache.bump_version()
+
+    notified = {"users": 0, "whatsapp_queued": 0}
     if new_schemes:
-        print(f"\nStep 4: Notifying users about {len(new_schemes)} new schemes...")
-        users = await users_collection.find().to_list(100)
-        for user in users:
-            for scheme in new_schemes:
-                await notifications_collection.insert_one({
-                    "user_id": str(user["_id"]),
-                    "message": f"New {scheme['category']} scheme: {scheme['title']} - Learn more: {scheme['url']}",
-                    "type": "scheme_update",
-                    "scheme_id": scheme["id"],
-                    "created_at": datetime.utcnow(),
-                    "is_read": False
-                })
-                # Send WhatsApp notification
-                await send_whatsapp_notification(
-                    user["mobileno"],
-                    f"🎯 नई योजना: {scheme['title']}\nश्रेणी: {scheme['category']}\nविवरण देखें: {scheme['url']}"
-                )
-        print(f"✓ Notifications sent to {len(users)} users")
-    
+        logger.info("Step 4: Queueing notifications about %s new schemes...", len(new_schemes))
+        with timed_stage(timings, "notify"):
+            notified = await enqueue_scheme_notifications(new_schemes)
+        logger.info("✓ Notifications queued for %s users", notified['users'])
+
+    timings["total"] = round((time.perf_counter() - pipeline_start) * 1000, 1)
     return {
-        "total_scraped": len(results.results),
+        "total_scraped": len(results),
         "new_schemes_added": len(new_schemes),
-        "schemes": new_schemes
-    }
\ No newline at end of file
+        "schemes_updated": len(updated),
+        "unchanged": plan["unchanged"],
+        "duplicates_linked": len(plan["link"]),
+        "extracted_without_llm": heuristic_count,
+        "translated": translated,
+        "translations_backfilled": len(backfilled),
+        "schemes": new_schemes,
+        "notifications": notified,
+        "timings_ms": timings
+    }
@@ -0,0 +1,108 @@
+"""
+Precomputed scheme explanations.
+An explanation depends only on the scheme's name and description, so it is
+generated once and stored on the scheme document together with a hash of
+those inputs. It is regenerated only when the hash no longer matches.
+English explanations live in "explanation"; other languages are generated
+from the stored translation and kept under "explanations.<language>".
+"""
+
+from typing import Dict, Set, Tuple
+from datetime import datetime
+import logging
+import asyncio
+import hashlib
+from bson import ObjectId
+from app.core.database import schemes_collection
+from app.services.gemini_service import get_explanation_inputs
+from app.services.llm_router import get_scheme_explanation
+from app.services.localization import localize_scheme
+
+logger = logging.getLogger(__name__)
+
+# Concurrent requests for the same scheme and language share one generation
+_in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+# Saves started after a streamed explanation; referenced until they finish
+_pending_saves: Set[asyncio.Task] = set()
+
+
+def explanation_field(language: str = "en") -> str:
+    """Document field an explanation in the given language is stored under"""
+    return "explanation" if language == "en" else f"explanations.{language}"
+
+
+def explanation_input_hash(scheme: Dict, language: str = "en") -> str:
+    """Hash of the fields the explanation is generated from, in the given language"""
+    scheme_name, short_desc = get_explanation_inputs(localize_scheme(scheme, language))
+    key = f"{scheme_name}\n{short_desc}" if language == "en" else f"{language}\n{scheme_name}\n{short_desc}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def get_stored_explanation(scheme: Dict, language: str = "en"):
+    """Return the stored explanation if it was generated from the current inputs"""
+    if language == "en":
+        stored = scheme.get("explanation")
+    else:
+        stored = (scheme.get("explanations") or {}).get(language)
+    if stored and stored.get("input_hash") == explanation_input_hash(scheme, language):
+        return stored.get("text")
+    return None
+
+
+def is_valid_explanation(text: str) -> bool:
+    """Fallback apologies are never stored"""
+    return bool(text) and not text.startswith("I apologize")
+
+
+async def save_explanation(scheme_id: str, input_hash: str, text: str, language: str = "en"):
+    """Store an explanation on the scheme document"""
+    await schemes_collection.update_one(
+        {"_id": ObjectId(scheme_id)},
+        {"$set": {explanation_field(language): {
+            "text": text,
+            "input_hash": input_hash,
+            "generated_at": datetime.utcnow()
+        }}}
+    )
+
+
+def _on_save_done(task: asyncio.Task):
+    _pending_saves.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Error saving streamed explanation: %s", task.exception())
+
+
+def save_explanation_in_background(scheme_id: str, input_hash: str, text: str, language: str = "en"):
+    """Store an explanation without holding up the response; failures are logged"""
+    task = asyncio.create_task(save_explanation(scheme_id, input_hash, text, language))
+    _pending_saves.add(task)
+    task.add_done_callback(_on_save_done)
+
+
+async def _generate_and_store(scheme_id: str, scheme: Dict, language: str) -> str:
+    input_hash = explanation_input_hash(scheme, language)
+    text = await get_scheme_explanation(dict(scheme), language)
+    if is_valid_explanation(text):
+        try:
+            await save_explanation(scheme_id, input_hash, text, language)
+        except Exception as e:
+            logger.error("Error saving explanation for %s: %s", scheme_id, e)
+    return text
+
+
+async def get_or_create_explanation(scheme_id: str, scheme: Dict, language: str = "en") -> Tuple[str, bool]:
+    """
+    Get the explanation for a scheme in the given language, generating it on first access.
+    Returns (explanation, was_stored).
+    """
+    stored = get_stored_explanation(scheme, language)
+    if stored:
+        return stored, True
+
+    key = (scheme_id, language)
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.create_task(_generate_and_store(scheme_id, scheme, language))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    return await asyncio.shield(task), False
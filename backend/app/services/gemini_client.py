@@ -0,0 +1,104 @@
+"""
+Async client layer for Google Gemini.
+GenerativeModel instances are created once per (model name, generation config)
+and reused, and calls go through the async generation API under a concurrency
+limit, so an LLM round trip never blocks the event loop.
+"""
+
+from typing import Optional, Dict, Tuple
+import asyncio
+import json
+import google.generativeai as genai
+from app.core.config import settings
+
+genai.configure(api_key=settings.gemini_api_key)
+
+_models: Dict[Tuple[str, str], genai.GenerativeModel] = {}
+_semaphore = asyncio.Semaphore(settings.gemini_max_concurrency)
+_in_flight = 0
+
+
+def get_model(model_name: Optional[str] = None, generation_config: Optional[Dict] = None) -> genai.GenerativeModel:
+    """Return a cached GenerativeModel for this model name and generation config"""
+    model_name = model_name or settings.gemini_chat_model
+    key = (model_name, json.dumps(generation_config or {}, sort_keys=True))
+    model = _models.get(key)
+    if model is None:
+        model = genai.GenerativeModel(model_name, generation_config=generation_config)
+        _models[key] = model
+    return model
+
+
+async def generate_content(
+    prompt: str,
+    model_name: Optional[str] = None,
+    generation_config: Optional[Dict] = None
+):
+    """
+    Run one generation without blocking the event loop.
+    At most settings.gemini_max_concurrency calls are in flight per worker;
+    extra callers wait for a slot instead of piling onto the API.
+    """
+    global _in_flight
+    model = get_model(model_name, generation_config)
+    async with _semaphore:
+        _in_flight += 1
+        try:
+            return await asyncio.wait_for(
+                model.generate_content_async(prompt),
+                timeout=settings.gemini_timeout_seconds
+            )
+        finally:
+            _in_flight -= 1
+
+
+async def stream_text(
+    prompt: str,
+    model_name: Optional[str] = None,
+    generation_config: Optional[Dict] = None
+):
+    """
+    Stream a generation, yielding text chunks as they arrive.
+    The concurrency slot is held until the stream is fully consumed.
+    """
+    global _in_flight
+    model = get_model(model_name, generation_config)
+    async with _semaphore:
+        _in_flight += 1
+        try:
+            response = await asyncio.wait_for(
+                model.generate_content_async(prompt, stream=True),
+                timeout=settings.gemini_timeout_seconds
+            )
+            async for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunk without text parts (e.g. only safety metadata)
+                    continue
+                if text:
+                    yield text
+        finally:
+            _in_flight -= 1
+
+
+async def generate_text(
+    prompt: str,
+    model_name: Optional[str] = None,
+    generation_config: Optional[Dict] = None
+) -> Optional[str]:
+    """Generate and return the stripped response text (None if empty)"""
+    response = await generate_content(prompt, model_name, generation_config)
+    if response and response.text:
+        return response.text.strip()
+    return None
+
+
+def get_stats() -> Dict:
+    """Get client statistics"""
+    return {
+        "cached_models": len(_models),
+        "in_flight": _in_flight,
+        "max_concurrency": settings.gemini_max_concurrency,
+        "timeout_seconds": settings.gemini_timeout_seconds
+    }
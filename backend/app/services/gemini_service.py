@@ -1,209 +1,217 @@
-import google.generativeai as genai
+import logging
+from app.services.gemini_client import generate_text, stream_text
 from app.core.config import settings
+from app.services.conversation_service import SCHEME_PRIORITY, conversation_sections
+from app.services.prompt_builder import Section, build_prompt, build_extraction_prompt
+from app.services.localization import language_name, localize_scheme
+from app.services.llm_provider import (
+    LLMProvider, ANSWER, EXPLAIN, EXTRACT, EXTRACT_BATCH, STREAM, TRANSLATE,
+    require_text, parse_scheme_data, fallback_scheme_data
+)
 
-# Configure Gemini API
-genai.configure(api_key=settings.gemini_api_key)
+logger = logging.getLogger(__name__)
 
-async def get_scheme_explanation_gemini(scheme):
+def get_explanation_inputs(scheme):
     """
-    Generate a detailed explanation of a government scheme using its name and short description.
-    Uses Google Gemini AI instead of Groq.
+    Resolve the fields an explanation is generated from.
+    Returns (scheme_name, short_desc).
     """
-    # Clean the scheme data (remove MongoDB _id if present)
-    if "_id" in scheme:
-        del scheme["_id"]
-
     scheme_name = scheme.get('name', 'Unknown Scheme')
     short_desc = scheme.get('shortDescription', '')
 
     # If no short description, use the processed_data
-    if not short_desc and 'processed_data' in scheme:
+    if not short_desc and scheme.get('processed_data'):
         short_desc = scheme['processed_data'].get('shortDescription', '')
 
     # If still no description, use raw_data
-    if not short_desc and 'raw_data' in scheme:
+    if not short_desc and scheme.get('raw_data'):
         short_desc = scheme['raw_data'].get('description', '')
 
-    prompt = f"""You are Sahayak AI, an expert on Indian government schemes.
+    return scheme_name, short_desc
 
-Based on this scheme information, provide a clear and detailed explanation in English:
+def build_explanation_prompt(scheme, language: str = "en"):
+    """
+    Build the explanation prompt for a scheme, in the given language.
+    The stored translation of the name and description is used when current.
+    Returns (scheme_name, prompt).
+    """
+    # Clean the scheme data (remove MongoDB _id if present)
+    if "_id" in scheme:
+        del scheme["_id"]
+
+    scheme_name, short_desc = get_explanation_inputs(localize_scheme(scheme, language))
 
-Scheme Name: {scheme_name}
-Description: {short_desc}
+    prompt = build_prompt("explain", [
+        Section("instructions", f"""You are Sahayak AI, an expert on Indian government schemes.
 
+Based on this scheme information, provide a clear and detailed explanation in {language_name(language)}:
+""", required=True),
+        Section("name", f"Scheme Name: {scheme_name}", required=True),
+        Section("description", f"Description: {short_desc}"),
+        Section("questions", """
 Please explain:
 1. What this scheme is about
 2. Who can benefit from it
 3. How it helps people
 4. Any important details from the description
 
-Keep the explanation helpful, accurate, and easy to understand."""
+Keep the explanation helpful, accurate, and easy to understand.""", required=True),
+    ], settings.gemini_chat_model)
+
+    return scheme_name, prompt
+
+async def get_scheme_explanation_gemini(scheme, language: str = "en"):
+    """
+    Generate a detailed explanation of a government scheme using its name and short description.
+    Uses Google Gemini AI instead of Groq.
+    """
+    scheme_name, prompt = build_explanation_prompt(scheme, language)
 
     try:
-        model = genai.GenerativeModel(settings.gemini_chat_model)
-        response = model.generate_content(prompt)
+        text = await generate_text(prompt)
 
-        if response and response.text:
-            return response.text.strip()
+        if text:
+            return text
         else:
             return f"I apologize, but I'm unable to generate an explanation for the {scheme_name} scheme at the moment. Please try again later."
     except Exception as e:
-        print(f"Error in get_scheme_explanation_gemini: {str(e)}")
+        logger.error("Error in get_scheme_explanation_gemini: %s", e)
         return f"I apologize, but I'm unable to generate an explanation for the {scheme_name} scheme at the moment. Please try again later."
 
+async def stream_scheme_explanation_gemini(scheme, language: str = "en", meta=None):
+    """
+    Stream the scheme explanation token by token.
+    Yields text chunks as Gemini produces them; on failure meta["failed"] is set.
+    """
+    scheme_name, prompt = build_explanation_prompt(scheme, language)
+
+    try:
+        async for chunk in stream_text(prompt):
+            yield chunk
+    except Exception as e:
+        logger.error("Error in stream_scheme_explanation_gemini: %s", e)
+        if meta is not None:
+            meta["failed"] = True
+        yield f"I apologize, but I'm unable to generate an explanation for the {scheme_name} scheme at the moment. Please try again later."
+
+async def extract_scheme_data_gemini(raw_data):
+    """
+    Extract structured scheme information from raw scraped data with Gemini.
+    Raises on API errors and on output that is not a JSON object.
+    """
+    prompt = build_extraction_prompt(raw_data, settings.gemini_chat_model)
+    content = await generate_text(prompt)
+    return parse_scheme_data(content, raw_data)
+
 async def process_scheme_data_gemini(raw_data):
     """
     Process raw scraped data through Gemini to extract structured scheme information.
     This function analyzes the content and creates a proper JSON schema.
     Uses Google Gemini AI instead of Groq.
     """
-    prompt = f"""You are an AI assistant that extracts government financial scheme information from web content.
+    try:
+        return await extract_scheme_data_gemini(raw_data)
+    except Exception as e:
+        logger.error("Error in process_scheme_data_gemini: %s", e)
+        # Fallback structure
+        return fallback_scheme_data(raw_data)
 
-Analyze the following content and extract structured information about the government scheme.
+def build_query_prompt(user_message: str, schemes_data: list, conversation=None, language: str = "en"):
+    """
+    Build the chat prompt from the schemes selected for the question (see
+    select_context_schemes), plus the earlier conversation when there is one.
+    Schemes are given in the user's language when a stored translation exists.
+    """
+    limited_schemes = [localize_scheme(s, language) for s in schemes_data]
 
-Title: {raw_data.get('title', '')}
-Content: {raw_data.get('description', '')}
-URL: {raw_data.get('url', '')}
+    system_prompt = f"""You are Sahayak AI, a helpful assistant for Indian government schemes.
+Answer in {language_name(language)}. Be concise and helpful.
+Use the scheme database provided to give accurate information."""
 
-Extract and return ONLY a valid JSON object with these exact fields:
-{{
-  "name": "Full scheme name",
-  "category": "one of: agriculture, business, pension, education, housing, general",
-  "shortDescription": "Clear 2-3 sentence description in English",
-  "eligibility": ["list of eligibility criteria as separate items"],
-  "benefits": ["list of benefits as separate items"],
-  "requiredDocuments": ["list of required documents"],
-  "eligibleRoles": ["applicable roles from: farmer, student, self_employed, salaried, unemployed, other"],
-  "tags": ["relevant tags for searching"],
-  "ageRange": "age criteria if mentioned, else null",
-  "incomeLimit": "income limit if mentioned, else null",
-  "applicationProcess": "Brief description of how to apply",
-  "officialWebsite": "Official website URL if available"
-}}
+    sections = [
+        Section("system", f"{system_prompt}\n", required=True),
+        Section("database", f"Database ({len(limited_schemes)} schemes):", required=True),
+    ]
+    # Create concise context with only name and short description for accurate AI responses.
+    # Every scheme is its own section, so the lowest-ranked ones are cut first
+    sections.extend(
+        Section(f"scheme_{idx+1}", f"""Scheme {idx+1}: {s.get('name', 'N/A')}
+Description: {s.get('shortDescription', 'N/A')}
+---
+""", priority=SCHEME_PRIORITY, min_tokens=20)
+        for idx, s in enumerate(limited_schemes)
+    )
 
-IMPORTANT: Return ONLY the JSON object, no markdown code blocks, no additional text."""
+    sections.extend(conversation_sections(conversation))
+    sections.append(Section("question", f"""Question: {user_message}
 
-    try:
-        model = genai.GenerativeModel(settings.gemini_chat_model)
-        response = model.generate_content(prompt)
-
-        if response and response.text:
-            content = response.text.strip()
-
-            # Remove markdown code blocks if present
-            import re
-            content = re.sub(r'^```json\s*', '', content)
-            content = re.sub(r'^```\s*', '', content)
-            content = re.sub(r'\s*```$', '', content)
-            content = content.strip()
-
-            try:
-                structured_data = json.loads(content)
-                # Validate and set defaults
-                return {
-                    "name": structured_data.get("name", raw_data.get("title", "Unknown Scheme")),
-                    "category": structured_data.get("category", "general"),
-                    "shortDescription": structured_data.get("shortDescription", raw_data.get("description", "")[:200]),
-                    "eligibility": structured_data.get("eligibility", []),
-                    "benefits": structured_data.get("benefits", []),
-                    "requiredDocuments": structured_data.get("requiredDocuments", []),
-                    "eligibleRoles": structured_data.get("eligibleRoles", ["other"]),
-                    "tags": structured_data.get("tags", []),
-                    "ageRange": structured_data.get("ageRange"),
-                    "incomeLimit": structured_data.get("incomeLimit"),
-                    "applicationProcess": structured_data.get("applicationProcess", ""),
-                    "officialWebsite": structured_data.get("officialWebsite", raw_data.get("url", ""))
-                }
-            except json.JSONDecodeError as e:
-                print(f"JSON decode error: {e}")
-                print(f"Content received: {content}")
-                # Fallback to basic structure
-                return {
-                    "name": raw_data.get("title", "Unknown Scheme"),
-                    "category": "general",
-                    "shortDescription": raw_data.get("description", "")[:200],
-                    "eligibility": [],
-                    "benefits": [],
-                    "requiredDocuments": [],
-                    "eligibleRoles": ["other"],
-                    "tags": [],
-                    "ageRange": None,
-                    "incomeLimit": None,
-                    "applicationProcess": "",
-                    "officialWebsite": raw_data.get("url", "")
-                }
-        else:
-            # Fallback structure
-            return {
-                "name": raw_data.get("title", "Unknown Scheme"),
-                "category": "general",
-                "shortDescription": raw_data.get("description", "")[:200],
-                "eligibility": [],
-                "benefits": [],
-                "requiredDocuments": [],
-                "eligibleRoles": ["other"],
-                "tags": [],
-                "ageRange": None,
-                "incomeLimit": None,
-                "applicationProcess": "",
-                "officialWebsite": raw_data.get("url", "")
-            }
-    except Exception as e:
-        print(f"Error in process_scheme_data_gemini: {str(e)}")
-        # Fallback structure
-        return {
-            "name": raw_data.get("title", "Unknown Scheme"),
-            "category": "general",
-            "shortDescription": raw_data.get("description", "")[:200],
-            "eligibility": [],
-            "benefits": [],
-            "requiredDocuments": [],
-            "eligibleRoles": ["other"],
-            "tags": [],
-            "ageRange": None,
-            "incomeLimit": None,
-            "applicationProcess": "",
-            "officialWebsite": raw_data.get("url", "")
-        }
-
-async def answer_user_query_gemini(user_message: str, schemes_data: list):
+Answer based on the schemes above.""", required=True))
+
+    return build_prompt("chat", sections, settings.gemini_chat_model)
+
+async def answer_user_query_gemini(user_message: str, schemes_data: list, conversation=None, language: str = "en"):
     """
     Use processed scheme data to answer user queries accurately.
     Uses Google Gemini AI instead of Groq.
     The schemes_data contains properly structured JSON from the database.
     """
-    # Limit schemes context to avoid token limits (max 10 schemes at a time)
-    limited_schemes = schemes_data[:10] if len(schemes_data) > 10 else schemes_data
+    try:
+        user_prompt = build_query_prompt(user_message, schemes_data, conversation, language)
+        text = await generate_text(user_prompt)
 
-    # Create concise context with only name and short description for accurate AI responses
-    schemes_context = "\n\n".join([
-        f"""Scheme {idx+1}: {s.get('name', 'N/A')}
-Description: {s.get('shortDescription', 'N/A')}
----"""
-        for idx, s in enumerate(limited_schemes)
-    ])
+        if text:
+            return text
+        else:
+            return "I apologize, but I'm unable to process your question at the moment. Please try again later."
+    except Exception as e:
+        logger.error("Error in answer_user_query_gemini: %s", e)
+        return f"Error: {str(e)}"
 
-    system_prompt = """You are Sahayak AI, a helpful assistant for Indian government schemes.
-Answer in English. Be concise and helpful.
-Use the scheme database provided to give accurate information."""
+async def stream_user_query_gemini(user_message: str, schemes_data: list, conversation=None, language: str = "en", meta=None):
+    """
+    Stream the answer to a user query token by token.
+    Yields text chunks as Gemini produces them; on failure meta["failed"] is set.
+    """
+    try:
+        user_prompt = build_query_prompt(user_message, schemes_data, conversation, language)
+        async for chunk in stream_text(user_prompt):
+            yield chunk
+    except Exception as e:
+        logger.error("Error in stream_user_query_gemini: %s", e)
+        if meta is not None:
+            meta["failed"] = True
+        yield "I apologize, but I'm unable to process your question at the moment. Please try again later."
 
-    user_prompt = f"""{system_prompt}
+class GeminiProvider(LLMProvider):
+    """Gemini behind the common provider interface"""
 
-Database ({len(limited_schemes)} schemes):
-{schemes_context}
+    name = "gemini"
+    operations = frozenset({ANSWER, EXPLAIN, EXTRACT, EXTRACT_BATCH, STREAM, TRANSLATE})
 
-Question: {user_message}
+    @property
+    def model(self):
+        return settings.gemini_chat_model
 
-Answer based on the schemes above."""
+    async def answer_query(self, user_message, schemes_data, conversation=None, language="en"):
+        user_prompt = build_query_prompt(user_message, schemes_data, conversation, language)
+        return require_text(await generate_text(user_prompt), self.name)
 
-    try:
-        model = genai.GenerativeModel(settings.gemini_chat_model)
-        response = model.generate_content(user_prompt)
+    async def explain_scheme(self, scheme, language="en"):
+        _, prompt = build_explanation_prompt(dict(scheme), language)
+        return require_text(await generate_text(prompt), self.name)
 
-        if response and response.text:
-            return response.text.strip()
-        else:
-            return "I apologize, but I'm unable to process your question at the moment. Please try again later."
-    except Exception as e:
-        print(f"Error in answer_user_query_gemini: {str(e)}")
-        return f"Error: {str(e)}"
\ No newline at end of file
+    async def extract_scheme(self, raw_data):
+        return await extract_scheme_data_gemini(raw_data)
+
+    async def complete(self, prompt):
+        return require_text(await generate_text(prompt), self.name)
+
+    async def stream_query(self, user_message, schemes_data, conversation=None, language="en"):
+        user_prompt = build_query_prompt(user_message, schemes_data, conversation, language)
+        async for chunk in stream_text(user_prompt):
+            yield chunk
+
+    async def stream_explanation(self, scheme, language="en"):
+        _, prompt = build_explanation_prompt(dict(scheme), language)
+        async for chunk in stream_text(prompt):
+            yield chunk
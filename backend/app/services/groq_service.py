@@ -1,15 +1,30 @@
-import httpx
+import logging
 import json
-import re
 from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.services.conversation_service import SCHEME_PRIORITY, conversation_sections
+from app.services.prompt_builder import Section, build_prompt, build_extraction_prompt
+from app.services.localization import language_name, localize_scheme
+from app.services.llm_provider import (
+    LLMProvider, LLMProviderError, ANSWER, EXPLAIN, EXTRACT, EXTRACT_BATCH, STREAM, TRANSLATE,
+    require_text, parse_scheme_data, fallback_scheme_data
+)
 
-async def get_scheme_explanation(scheme):
+logger = logging.getLogger(__name__)
+
+GROQ_CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_MODEL = "mixtral-8x7b-32768"
+
+def build_explanation_request(scheme, language: str = "en"):
     """
-    Generate a detailed explanation of a government scheme using its name and short description.
+    Build the Groq request for a scheme explanation, in the given language.
+    The stored translation of the name and description is used when current.
+    Returns (scheme_name, headers, data).
     """
     # Clean the scheme data (remove MongoDB _id if present)
     if "_id" in scheme:
         del scheme["_id"]
+    scheme = localize_scheme(scheme, language)
 
     scheme_name = scheme.get('name', 'Unknown Scheme')
     short_desc = scheme.get('shortDescription', '')
@@ -22,190 +37,141 @@ async def get_scheme_explanation(scheme):
     if not short_desc and 'raw_data' in scheme:
         short_desc = scheme['raw_data'].get('description', '')
 
-    url = "https://api.groq.com/openai/v1/chat/completions"
     headers = {
         "Authorization": f"Bearer {settings.groq_api_key}",
         "Content-Type": "application/json"
     }
 
-    prompt = f"""You are Sahayak AI, an expert on Indian government schemes.
-
-Based on this scheme information, provide a clear and detailed explanation in English:
-
-Scheme Name: {scheme_name}
-Description: {short_desc}
+    prompt = build_prompt("explain", [
+        Section("instructions", f"""You are Sahayak AI, an expert on Indian government schemes.
 
+Based on this scheme information, provide a clear and detailed explanation in {language_name(language)}:
+""", required=True),
+        Section("name", f"Scheme Name: {scheme_name}", required=True),
+        Section("description", f"Description: {short_desc}"),
+        Section("questions", """
 Please explain:
 1. What this scheme is about
 2. Who can benefit from it
 3. How it helps people
 4. Any important details from the description
 
-Keep the explanation helpful, accurate, and easy to understand."""
+Keep the explanation helpful, accurate, and easy to understand.""", required=True),
+    ], GROQ_MODEL)
 
     data = {
-        "model": "mixtral-8x7b-32768",
+        "model": GROQ_MODEL,
         "messages": [{"role": "user", "content": prompt}],
         "temperature": 0.7,
         "max_tokens": 600
     }
 
+    return scheme_name, headers, data
+
+async def chat_completion(headers: dict, data: dict) -> str:
+    """
+    Call the Groq chat completions API and return the message content.
+    Raises LLMProviderError if the API returns an error or no choices.
+    """
+    client = get_http_client("groq")
+    response = await client.post(GROQ_CHAT_URL, headers=headers, json=data)
+    result = response.json()
+
+    if "choices" in result and result["choices"]:
+        return require_text(result["choices"][0]["message"]["content"], "groq")
+    error_message = result.get("error", {}).get("message", "Unknown error")
+    raise LLMProviderError(f"Groq API error ({response.status_code}): {error_message}")
+
+async def get_scheme_explanation(scheme, language: str = "en"):
+    """
+    Generate a detailed explanation of a government scheme using its name and short description.
+    """
+    scheme_name, headers, data = build_explanation_request(scheme, language)
+
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, headers=headers, json=data)
-            result = response.json()
-
-        if "choices" in result and result["choices"]:
-            return result["choices"][0]["message"]["content"]
-        else:
-            return f"I apologize, but I'm unable to generate an explanation for the {scheme_name} scheme at the moment. Please try again later."
+        return await chat_completion(headers, data)
     except Exception as e:
-        print(f"Error in get_scheme_explanation: {str(e)}")
+        logger.error("Error in get_scheme_explanation: %s", e)
         return f"I apologize, but I'm unable to generate an explanation for the {scheme_name} scheme at the moment. Please try again later."
 
-async def process_scheme_data(raw_data):
+def build_extraction_request(raw_data):
     """
-    Process raw scraped data through Groq to extract structured scheme information.
-    This function analyzes the content and creates a proper JSON schema.
+    Build the Groq request for structured extraction.
+    Returns (headers, data).
     """
-    url = "https://api.groq.com/openai/v1/chat/completions"
     headers = {
         "Authorization": f"Bearer {settings.groq_api_key}",
         "Content-Type": "application/json"
     }
     
-    prompt = f"""You are an AI assistant that extracts government financial scheme information from web content.
-
-Analyze the following content and extract structured information about the government scheme.
-
-Title: {raw_data.get('title', '')}
-Content: {raw_data.get('description', '')}
-URL: {raw_data.get('url', '')}
-
-Extract and return ONLY a valid JSON object with these exact fields:
-{{
-  "name": "Full scheme name",
-  "category": "one of: agriculture, business, pension, education, housing, general",
-  "shortDescription": "Clear 2-3 sentence description in English",
-  "eligibility": ["list of eligibility criteria as separate items"],
-  "benefits": ["list of benefits as separate items"],
-  "requiredDocuments": ["list of required documents"],
-  "eligibleRoles": ["applicable roles from: farmer, student, self_employed, salaried, unemployed, other"],
-  "tags": ["relevant tags for searching"],
-  "ageRange": "age criteria if mentioned, else null",
-  "incomeLimit": "income limit if mentioned, else null",
-  "applicationProcess": "Brief description of how to apply",
-  "officialWebsite": "Official website URL if available"
-}}
-
-IMPORTANT: Return ONLY the JSON object, no markdown code blocks, no additional text."""
+    prompt = build_extraction_prompt(raw_data, GROQ_MODEL)
     
     data = {
-        "model": "mixtral-8x7b-32768",
+        "model": GROQ_MODEL,
         "messages": [{"role": "user", "content": prompt}],
         "temperature": 0.3  # Lower temperature for more consistent structured output
     }
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(url, headers=headers, json=data)
-        result = response.json()
+    return headers, data
 
-    if "choices" in result and result["choices"]:
-        content = result["choices"][0]["message"]["content"].strip()
-        
-        # Remove markdown code blocks if present
-        content = re.sub(r'^```json\s*', '', content)
-        content = re.sub(r'^```\s*', '', content)
-        content = re.sub(r'\s*```$', '', content)
-        content = content.strip()
-        
-        try:
-            structured_data = json.loads(content)
-            # Validate and set defaults
-            return {
-                "name": structured_data.get("name", raw_data.get("title", "Unknown Scheme")),
-                "category": structured_data.get("category", "general"),
-                "shortDescription": structured_data.get("shortDescription", raw_data.get("description", "")[:200]),
-                "eligibility": structured_data.get("eligibility", []),
-                "benefits": structured_data.get("benefits", []),
-                "requiredDocuments": structured_data.get("requiredDocuments", []),
-                "eligibleRoles": structured_data.get("eligibleRoles", ["other"]),
-                "tags": structured_data.get("tags", []),
-                "ageRange": structured_data.get("ageRange"),
-                "incomeLimit": structured_data.get("incomeLimit"),
-                "applicationProcess": structured_data.get("applicationProcess", ""),
-                "officialWebsite": structured_data.get("officialWebsite", raw_data.get("url", ""))
-            }
-        except json.JSONDecodeError as e:
-            print(f"JSON decode error: {e}")
-            print(f"Content received: {content}")
-            # Fallback to basic structure
-            return {
-                "name": raw_data.get("title", "Unknown Scheme"),
-                "category": "general",
-                "shortDescription": raw_data.get("description", "")[:200],
-                "eligibility": [],
-                "benefits": [],
-                "requiredDocuments": [],
-                "eligibleRoles": ["other"],
-                "tags": [],
-                "ageRange": None,
-                "incomeLimit": None,
-                "applicationProcess": "",
-                "officialWebsite": raw_data.get("url", "")
-            }
-    else:
-        # Fallback structure
-        return {
-            "name": raw_data.get("title", "Unknown Scheme"),
-            "category": "general",
-            "shortDescription": raw_data.get("description", "")[:200],
-            "eligibility": [],
-            "benefits": [],
-            "requiredDocuments": [],
-            "eligibleRoles": ["other"],
-            "tags": [],
-            "ageRange": None,
-            "incomeLimit": None,
-            "applicationProcess": "",
-            "officialWebsite": raw_data.get("url", "")
-        }
+async def extract_scheme_data(raw_data):
+    """
+    Extract structured scheme information from raw scraped data with Groq.
+    Raises on API errors and on output that is not a JSON object.
+    """
+    headers, data = build_extraction_request(raw_data)
+    content = await chat_completion(headers, data)
+    return parse_scheme_data(content, raw_data)
 
-async def answer_user_query(user_message: str, schemes_data: list):
+async def process_scheme_data(raw_data):
     """
-    Use processed scheme data to answer user queries accurately.
-    The schemes_data contains properly structured JSON from the database.
+    Process raw scraped data through Groq to extract structured scheme information.
+    This function analyzes the content and creates a proper JSON schema.
+    """
+    try:
+        return await extract_scheme_data(raw_data)
+    except Exception as e:
+        logger.error("Error in process_scheme_data: %s", e)
+        # Fallback to basic structure
+        return fallback_scheme_data(raw_data)
+
+def build_query_request(user_message: str, schemes_data: list, conversation=None, language: str = "en"):
+    """
+    Build the Groq chat request for a user query, in the user's language.
+    The earlier conversation goes in the budgeted prompt, as for Gemini.
+    Returns (headers, data).
     """
-    url = "https://api.groq.com/openai/v1/chat/completions"
     headers = {
         "Authorization": f"Bearer {settings.groq_api_key}",
         "Content-Type": "application/json"
     }
     
-    # Limit schemes context to avoid token limits (max 10 schemes at a time)
-    limited_schemes = schemes_data[:10] if len(schemes_data) > 10 else schemes_data
+    # schemes_data is already the top-k selected for the question (see select_context_schemes)
+    limited_schemes = [localize_scheme(s, language) for s in schemes_data]
     
-    # Create concise context with only name and short description for accurate AI responses
-    schemes_context = "\n\n".join([
-        f"""Scheme {idx+1}: {s.get('name', 'N/A')}
+    # Create concise context with only name and short description for accurate AI responses.
+    # Every scheme is its own section, so the lowest-ranked ones are cut first
+    sections = [Section("database", f"Database ({len(limited_schemes)} schemes):", required=True)]
+    sections.extend(
+        Section(f"scheme_{idx+1}", f"""Scheme {idx+1}: {s.get('name', 'N/A')}
 Description: {s.get('shortDescription', 'N/A')}
----"""
+---
+""", priority=SCHEME_PRIORITY, min_tokens=20)
         for idx, s in enumerate(limited_schemes)
-    ])
+    )
+    sections.extend(conversation_sections(conversation))
+    sections.append(Section("question", f"""Question: {user_message}
+
+Answer based on the schemes above.""", required=True))
     
-    system_prompt = """You are Sahayak AI, a helpful assistant for Indian government schemes.
-Answer in English. Be concise and helpful.
+    system_prompt = f"""You are Sahayak AI, a helpful assistant for Indian government schemes.
+Answer in {language_name(language)}. Be concise and helpful.
 Use the scheme database provided to give accurate information."""
     
-    user_prompt = f"""Database ({len(limited_schemes)} schemes):
-{schemes_context}
-
-Question: {user_message}
-
-Answer based on the schemes above."""
+    user_prompt = build_prompt("chat", sections, GROQ_MODEL)
     
     data = {
-        "model": "mixtral-8x7b-32768",
+        "model": GROQ_MODEL,
         "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
@@ -214,19 +180,113 @@ Answer based on the schemes above."""
         "max_tokens": 800
     }
 
+    return headers, data
+
+async def answer_user_query(user_message: str, schemes_data: list, conversation=None, language: str = "en"):
+    """
+    Use processed scheme data to answer user queries accurately.
+    The schemes_data contains properly structured JSON from the database.
+    """
+    headers, data = build_query_request(user_message, schemes_data, conversation, language)
+
+    try:
+        return await chat_completion(headers, data)
+    except LLMProviderError as e:
+        logger.error("Groq API Error: %s", e)
+        return "I apologize, but I'm unable to process your question at the moment. Please try again later."
+    except Exception as e:
+        logger.error("Exception in answer_user_query (%s): %s", type(e).__name__, e)
+        return f"Error: {str(e)}"
+
+async def stream_chat_completion(headers: dict, data: dict):
+    """
+    Call the Groq chat completions API in streaming mode.
+    Yields content deltas parsed from the server-sent event stream.
+    """
+    client = get_http_client("groq")
+    async with client.stream("POST", GROQ_CHAT_URL, headers=headers, json={**data, "stream": True}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            payload = line[len("data: "):].strip()
+            if payload == "[DONE]":
+                break
+            try:
+                chunk = json.loads(payload)
+            except json.JSONDecodeError:
+                continue
+            choices = chunk.get("choices") or []
+            if choices:
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    yield content
+
+async def stream_scheme_explanation(scheme, language: str = "en", meta=None):
+    """Stream the scheme explanation token by token; on failure meta["failed"] is set"""
+    scheme_name, headers, data = build_explanation_request(scheme, language)
+
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, headers=headers, json=data)
-            result = response.json()
-
-        if "choices" in result and result["choices"]:
-            return result["choices"][0]["message"]["content"]
-        else:
-            print(f"Groq API Error Response: {result}")
-            error_message = result.get("error", {}).get("message", "Unknown error")
-            print(f"Error message: {error_message}")
-            return "I apologize, but I'm unable to process your question at the moment. Please try again later."
+        async for chunk in stream_chat_completion(headers, data):
+            yield chunk
     except Exception as e:
-        print(f"Exception in answer_user_query: {str(e)}")
-        print(f"Exception type: {type(e).__name__}")
-        return f"Error: {str(e)}"
\ No newline at end of file
+        logger.error("Error in stream_scheme_explanation: %s", e)
+        if meta is not None:
+            meta["failed"] = True
+        yield f"I apologize, but I'm unable to generate an explanation for the {scheme_name} scheme at the moment. Please try again later."
+
+async def stream_user_query(user_message: str, schemes_data: list, conversation=None, language: str = "en", meta=None):
+    """Stream the answer to a user query token by token; on failure meta["failed"] is set"""
+    headers, data = build_query_request(user_message, schemes_data, conversation, language)
+
+    try:
+        async for chunk in stream_chat_completion(headers, data):
+            yield chunk
+    except Exception as e:
+        logger.error("Exception in stream_user_query: %s", e)
+        if meta is not None:
+            meta["failed"] = True
+        yield "I apologize, but I'm unable to process your question at the moment. Please try again later."
+
+class GroqProvider(LLMProvider):
+    """Groq behind the common provider interface"""
+
+    name = "groq"
+    model = GROQ_MODEL
+    operations = frozenset({ANSWER, EXPLAIN, EXTRACT, EXTRACT_BATCH, STREAM, TRANSLATE})
+
+    def is_configured(self):
+        return bool(settings.groq_api_key)
+
+    async def answer_query(self, user_message, schemes_data, conversation=None, language="en"):
+        headers, data = build_query_request(user_message, schemes_data, conversation, language)
+        return await chat_completion(headers, data)
+
+    async def explain_scheme(self, scheme, language="en"):
+        _, headers, data = build_explanation_request(dict(scheme), language)
+        return await chat_completion(headers, data)
+
+    async def extract_scheme(self, raw_data):
+        return await extract_scheme_data(raw_data)
+
+    async def complete(self, prompt):
+        headers = {
+            "Authorization": f"Bearer {settings.groq_api_key}",
+            "Content-Type": "application/json"
+        }
+        data = {
+            "model": GROQ_MODEL,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.3
+        }
+        return await chat_completion(headers, data)
+
+    async def stream_query(self, user_message, schemes_data, conversation=None, language="en"):
+        headers, data = build_query_request(user_message, schemes_data, conversation, language)
+        async for chunk in stream_chat_completion(headers, data):
+            yield chunk
+
+    async def stream_explanation(self, scheme, language="en"):
+        _, headers, data = build_explanation_request(dict(scheme), language)
+        async for chunk in stream_chat_completion(headers, data):
+            yield chunk
@@ -0,0 +1,204 @@
+"""
+Deterministic extraction for well-structured scheme pages.
+Many government pages spell out "Eligibility:", "Benefits:", "Documents
+Required:" and "How to Apply:" sections in plain text. This extractor parses
+those sections (plus income limits, age ranges, category and roles) into the
+same dict shape the LLM extraction returns, with a confidence score; the
+ingest pipeline only calls the LLM when the confidence is low.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import re
+
+# Section headings per field (English and Hindi)
+SECTION_HEADINGS = {
+    "eligibility": [
+        r"eligibility(?: criteria| conditions)?", r"who (?:can|is eligible to) apply", r"who is eligible",
+        r"पात्रता(?: मानदंड)?",
+    ],
+    "benefits": [
+        r"(?:key |scheme )?benefits", r"financial assistance", r"assistance provided", r"लाभ",
+    ],
+    "requiredDocuments": [
+        r"(?:documents? required|required documents?|documents? needed|list of documents)", r"आवश्यक दस्तावेज़?",
+    ],
+    "applicationProcess": [
+        r"how to apply", r"application (?:process|procedure)", r"procedure to apply", r"आवेदन (?:प्रक्रिया|कैसे करें)",
+    ],
+}
+
+# Weight of each signal in the confidence score (sums to 1)
+CONFIDENCE_WEIGHTS = {
+    "eligibility": 0.25,
+    "benefits": 0.25,
+    "requiredDocuments": 0.2,
+    "applicationProcess": 0.15,
+    "shortDescription": 0.1,
+    "category": 0.05,
+}
+
+CATEGORY_KEYWORDS = {
+    "agriculture": ["farmer", "farming", "agricultur", "crop", "kisan", "krishi", "irrigation", "किसान", "कृषि"],
+    "pension": ["pension", "old age", "retirement", "senior citizen", "पेंशन"],
+    "education": ["scholarship", "student", "education", "school", "college", "tuition", "छात्रवृत्ति", "शिक्षा"],
+    "housing": ["housing", "awas", "house", "home loan", "shelter", "आवास"],
+    "business": ["business", "entrepreneur", "msme", "enterprise", "startup", "mudra", "self-employ", "व्यवसाय"],
+}
+
+ROLE_KEYWORDS = {
+    "farmer": ["farmer", "kisan", "cultivator", "किसान"],
+    "student": ["student", "scholarship", "छात्र"],
+    "self_employed": ["self-employed", "self employed", "entrepreneur", "street vendor", "artisan", "business owner"],
+    "salaried": ["salaried", "employee", "worker in organised", "epf"],
+    "unemployed": ["unemployed", "job seeker", "बेरोजगार"],
+}
+
+_AMOUNT = r"(?:rs\.?|inr|₹)\s*[\d,]+(?:\.\d+)?(?:\s*(?:lakh|lakhs|crore|thousand))?"
+INCOME_LIMIT_RE = re.compile(
+    r"(?:annual |family |household )*income[^.\n]{0,60}?"
+    r"(?:up ?to|below|not exceeding|less than|does not exceed|under|of)\s*" + _AMOUNT,
+    re.IGNORECASE
+)
+AGE_RANGE_RE = re.compile(
+    r"(?:between\s+)?(\d{1,2})\s*(?:-|–|to|and)\s*(\d{1,3})\s*years"
+    r"|(?:aged?|age of)\s*(?:above|over|at least|minimum|below|under|up ?to)\s*\d{1,3}\s*years"
+    r"|\d{1,2}\s*years(?: of age)? (?:or|and) (?:above|older|below)",
+    re.IGNORECASE
+)
+BULLET_RE = re.compile(r"^\s*(?:[-•*●▪]|\d+[.)]|\([a-z0-9]+\))\s+", re.MULTILINE)
+
+
+def _heading_pattern() -> re.Pattern:
+    alternatives = []
+    for field, headings in SECTION_HEADINGS.items():
+        alternatives.append(f"(?P<{field}>{'|'.join(headings)})")
+    # A heading starts a line (or follows a full stop) and ends with a colon or the line
+    return re.compile(
+        r"(?:^|(?<=[.!?] ))[ \t]*[#*]*[ \t]*(?:" + "|".join(alternatives) + r")[ \t]*[#*]*[ \t]*(?::|-\s|–|$)",
+        re.IGNORECASE | re.MULTILINE
+    )
+
+
+HEADING_RE = _heading_pattern()
+
+
+def split_sections(text: str) -> Tuple[str, Dict[str, str]]:
+    """Split page text into the part before the first heading and the text under each heading"""
+    matches = list(HEADING_RE.finditer(text))
+    intro = text[:matches[0].start()] if matches else text
+    sections = {}
+    for index, match in enumerate(matches):
+        field = match.lastgroup
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        body = text[match.end():end].strip()
+        if body and field not in sections:
+            sections[field] = body
+    return intro, sections
+
+
+def split_items(body: str, field: str) -> List[str]:
+    """Turn a section body into list items: bullets, then lines, then sentences"""
+    if BULLET_RE.search(body):
+        items = BULLET_RE.split(body)
+    elif "\n" in body.strip():
+        items = body.splitlines()
+    elif field == "requiredDocuments":
+        items = re.split(r"[;,]\s+|\s+and\s+", body)
+    else:
+        items = re.split(r";\s+|(?<=[.!?])\s+(?=[A-Z])", body)
+    cleaned = []
+    for item in items:
+        item = " ".join(item.split()).strip(" .;,")
+        if len(item) >= 3:
+            cleaned.append(item)
+    return cleaned
+
+
+def first_sentences(text: str, count: int = 2, max_chars: int = 300) -> str:
+    text = " ".join(text.split())
+    sentences = re.split(r"(?<=[.!?])\s+", text)
+    summary = " ".join(sentences[:count]).strip()
+    if len(summary) > max_chars:
+        summary = summary[:max_chars].rsplit(" ", 1)[0] + "…"
+    return summary
+
+
+def detect_category(text: str) -> str:
+    lowered = text.lower()
+    scores = {
+        category: sum(lowered.count(keyword) for keyword in keywords)
+        for category, keywords in CATEGORY_KEYWORDS.items()
+    }
+    best = max(scores, key=scores.get)
+    return best if scores[best] > 0 else "general"
+
+
+def detect_roles(text: str) -> List[str]:
+    lowered = text.lower()
+    roles = [role for role, keywords in ROLE_KEYWORDS.items() if any(k in lowered for k in keywords)]
+    return roles or ["other"]
+
+
+def find_income_limit(text: str) -> Optional[str]:
+    match = INCOME_LIMIT_RE.search(text)
+    return " ".join(match.group(0).split()) if match else None
+
+
+def find_age_range(text: str) -> Optional[str]:
+    match = AGE_RANGE_RE.search(text)
+    return " ".join(match.group(0).split()) if match else None
+
+
+def build_tags(title: str, category: str, roles: List[str]) -> List[str]:
+    tags = [category] if category != "general" else []
+    tags.extend(role.replace("_", " ") for role in roles if role != "other")
+    # Acronyms given in brackets, e.g. "(PM-KISAN)"
+    tags.extend(re.findall(r"\(([A-Z][A-Za-z0-9-]{1,20})\)", title))
+    return list(dict.fromkeys(tags))
+
+
+def extract_heuristically(raw_data: Dict) -> Tuple[Dict, float]:
+    """
+    Parse a scraped page without an LLM.
+    Returns (structured data in the LLM extraction shape, confidence 0..1).
+    """
+    title = (raw_data.get("title") or "").strip()
+    text = raw_data.get("description") or ""
+    intro, sections = split_sections(text)
+
+    fields = {
+        field: split_items(sections[field], field) if field in sections else []
+        for field in ("eligibility", "benefits", "requiredDocuments")
+    }
+    application = " ".join(sections.get("applicationProcess", "").split())
+    short_description = first_sentences(intro) or first_sentences(text)
+    category = detect_category(f"{title} {text}")
+    roles = detect_roles(f"{title} {text}")
+
+    data = {
+        "name": title or "Unknown Scheme",
+        "category": category,
+        "shortDescription": short_description,
+        "eligibility": fields["eligibility"],
+        "benefits": fields["benefits"],
+        "requiredDocuments": fields["requiredDocuments"],
+        "eligibleRoles": roles,
+        "tags": build_tags(title, category, roles),
+        "ageRange": find_age_range(text),
+        "incomeLimit": find_income_limit(text),
+        "applicationProcess": application,
+        "officialWebsite": raw_data.get("url", "")
+    }
+
+    found = {
+        "eligibility": bool(fields["eligibility"]),
+        "benefits": bool(fields["benefits"]),
+        "requiredDocuments": bool(fields["requiredDocuments"]),
+        "applicationProcess": len(application) >= 10,
+        "shortDescription": len(short_description) >= 40,
+        "category": category != "general",
+    }
+    confidence = sum(weight for signal, weight in CONFIDENCE_WEIGHTS.items() if found[signal])
+    if not title:
+        confidence *= 0.5
+    return data, round(confidence, 2)
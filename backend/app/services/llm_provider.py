@@ -0,0 +1,159 @@
+"""
+Common interface for the LLM provider modules (Gemini, Groq, OpenAI).
+Provider methods raise on failure instead of returning an apology string,
+so the router can tell a failed call from an answer and try another provider.
+"""
+
+from typing import AsyncIterator, Dict, FrozenSet, List, Optional
+import json
+import re
+from app.services.prompt_builder import build_batch_extraction_prompt
+
+# Operations a provider may support
+ANSWER = "answer"
+EXPLAIN = "explain"
+EXTRACT = "extract"
+EXTRACT_BATCH = "extract_batch"
+STREAM = "stream"
+TRANSLATE = "translate"
+
+
+class LLMProviderError(Exception):
+    """A provider call failed or returned no usable output"""
+
+
+class LLMProvider:
+    """Base class; subclasses implement the operations they list in `operations`"""
+
+    name: str = ""
+    model: Optional[str] = None
+    operations: FrozenSet[str] = frozenset()
+
+    def is_configured(self) -> bool:
+        return True
+
+    def supports(self, operation: str) -> bool:
+        return operation in self.operations and self.is_configured()
+
+    async def answer_query(self, user_message: str, schemes_data: List[Dict], conversation=None, language: str = "en") -> str:
+        raise NotImplementedError
+
+    async def explain_scheme(self, scheme: Dict, language: str = "en") -> str:
+        raise NotImplementedError
+
+    async def extract_scheme(self, raw_data: Dict) -> Dict:
+        raise NotImplementedError
+
+    async def complete(self, prompt: str) -> str:
+        """Plain single-prompt completion"""
+        raise NotImplementedError
+
+    async def extract_schemes(self, raw_items: List[Dict]) -> Dict[str, Dict]:
+        """
+        Extract several pages in one request.
+        Returns {url: scheme data} for the items that came back valid.
+        """
+        content = await self.complete(build_batch_extraction_prompt(raw_items, self.model))
+        return parse_scheme_batch(content, raw_items)
+
+    def stream_query(self, user_message: str, schemes_data: List[Dict], conversation=None, language: str = "en") -> AsyncIterator[str]:
+        raise NotImplementedError
+
+    def stream_explanation(self, scheme: Dict, language: str = "en") -> AsyncIterator[str]:
+        raise NotImplementedError
+
+
+def require_text(text: Optional[str], provider: str) -> str:
+    """Return the text, or raise if the provider returned nothing"""
+    if not text or not text.strip():
+        raise LLMProviderError(f"{provider} returned an empty response")
+    return text
+
+
+def strip_code_fences(content: str) -> str:
+    """Remove markdown code blocks if present"""
+    content = re.sub(r'^```json\s*', '', content.strip())
+    content = re.sub(r'^```\s*', '', content)
+    content = re.sub(r'\s*```$', '', content)
+    return content.strip()
+
+
+def normalize_scheme_data(structured_data: Dict, raw_data: Dict) -> Dict:
+    """Validate extracted fields and set defaults"""
+    return {
+        "name": structured_data.get("name", raw_data.get("title", "Unknown Scheme")),
+        "category": structured_data.get("category", "general"),
+        "shortDescription": structured_data.get("shortDescription", raw_data.get("description", "")[:200]),
+        "eligibility": structured_data.get("eligibility", []),
+        "benefits": structured_data.get("benefits", []),
+        "requiredDocuments": structured_data.get("requiredDocuments", []),
+        "eligibleRoles": structured_data.get("eligibleRoles", ["other"]),
+        "tags": structured_data.get("tags", []),
+        "ageRange": structured_data.get("ageRange"),
+        "incomeLimit": structured_data.get("incomeLimit"),
+        "applicationProcess": structured_data.get("applicationProcess", ""),
+        "officialWebsite": structured_data.get("officialWebsite", raw_data.get("url", ""))
+    }
+
+
+def parse_scheme_data(content: Optional[str], raw_data: Dict) -> Dict:
+    """
+    Parse an extraction response into the scheme dict.
+    Raises LLMProviderError if the response is empty or not a JSON object.
+    """
+    if not content:
+        raise LLMProviderError("Empty extraction response")
+    content = strip_code_fences(content)
+    try:
+        structured_data = json.loads(content)
+    except json.JSONDecodeError as e:
+        raise LLMProviderError(f"JSON decode error: {e}; content received: {content[:200]}")
+    if not isinstance(structured_data, dict):
+        raise LLMProviderError("Extraction response is not a JSON object")
+    return normalize_scheme_data(structured_data, raw_data)
+
+
+def parse_scheme_batch(content: Optional[str], raw_items: List[Dict]) -> Dict[str, Dict]:
+    """
+    Parse a batch extraction response (a JSON array of objects with "url").
+    Items that are missing, unknown or lack a name are left out; the whole
+    batch raises LLMProviderError if the response is not a JSON array.
+    """
+    if not content:
+        raise LLMProviderError("Empty batch extraction response")
+    content = strip_code_fences(content)
+    try:
+        items = json.loads(content)
+    except json.JSONDecodeError as e:
+        raise LLMProviderError(f"JSON decode error: {e}; content received: {content[:200]}")
+    if not isinstance(items, list):
+        raise LLMProviderError("Batch extraction response is not a JSON array")
+
+    by_url = {raw_data.get("url"): raw_data for raw_data in raw_items}
+    results = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        url = item.get("url")
+        name = item.get("name")
+        if url in by_url and url not in results and isinstance(name, str) and name.strip():
+            results[url] = normalize_scheme_data(item, by_url[url])
+    return results
+
+
+def fallback_scheme_data(raw_data: Dict) -> Dict:
+    """Basic structure used when extraction fails"""
+    return {
+        "name": raw_data.get("title", "Unknown Scheme"),
+        "category": "general",
+        "shortDescription": raw_data.get("description", "")[:200],
+        "eligibility": [],
+        "benefits": [],
+        "requiredDocuments": [],
+        "eligibleRoles": ["other"],
+        "tags": [],
+        "ageRange": None,
+        "incomeLimit": None,
+        "applicationProcess": "",
+        "officialWebsite": raw_data.get("url", "")
+    }
@@ -0,0 +1,378 @@
+"""
+Latency-aware routing across LLM providers.
+For each provider the router keeps a rolling window of call latencies (per
+operation) and outcomes. Calls go to the fastest healthy provider; when an
+interactive call runs past that provider's p95 latency, a hedged duplicate is
+sent to the next provider and the first good answer wins. A circuit breaker
+takes a provider out of rotation after repeated failures and lets a single
+trial call through once the cooldown has passed.
+"""
+
+from typing import Any, Dict, List, Optional
+from collections import deque
+import asyncio
+import time
+import logging
+from app.core.config import settings
+from app.core.metrics import LLM_CALL_SECONDS
+from app.services.llm_provider import LLMProvider, LLMProviderError, ANSWER, EXPLAIN, EXTRACT, EXTRACT_BATCH, STREAM, TRANSLATE
+from app.services.llm_provider import fallback_scheme_data
+from app.services.gemini_service import GeminiProvider
+from app.services.groq_service import GroqProvider
+from app.services.openai_service import OpenAIProvider
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def percentile(values, pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ProviderHealth:
+    """Rolling latency/error statistics and circuit breaker state for one provider"""
+
+    def __init__(self):
+        self.latencies: Dict[str, deque] = {}
+        self.outcomes = deque(maxlen=settings.llm_latency_window)
+        self.consecutive_failures = 0
+        self.opened_until = 0.0
+        self.trial_in_flight = False
+        self.calls = 0
+        self.failures = 0
+        self.hedge_wins = 0
+
+    def state(self) -> str:
+        if self.opened_until == 0.0:
+            return CLOSED
+        if time.monotonic() < self.opened_until:
+            return OPEN
+        return HALF_OPEN
+
+    def available(self) -> bool:
+        state = self.state()
+        return state == CLOSED or (state == HALF_OPEN and not self.trial_in_flight)
+
+    def begin(self):
+        self.calls += 1
+        if self.state() == HALF_OPEN:
+            self.trial_in_flight = True
+
+    def record_success(self, operation: str, latency: float):
+        self.latencies.setdefault(operation, deque(maxlen=settings.llm_latency_window)).append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.opened_until = 0.0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        if self.trial_in_flight or self.consecutive_failures >= settings.llm_breaker_failure_threshold:
+            self.opened_until = time.monotonic() + settings.llm_breaker_cooldown_seconds
+        self.trial_in_flight = False
+
+    def record_cancelled(self):
+        """A hedged call that lost the race says nothing about health"""
+        self.trial_in_flight = False
+
+    def latency(self, operation: str, pct: float) -> Optional[float]:
+        samples = self.latencies.get(operation)
+        if not samples or len(samples) < settings.llm_latency_min_samples:
+            return None
+        return percentile(samples, pct)
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def get_stats(self) -> Dict:
+        return {
+            "state": self.state(),
+            "calls": self.calls,
+            "failures": self.failures,
+            "error_rate": round(self.error_rate(), 3),
+            "hedge_wins": self.hedge_wins,
+            "latency_ms": {
+                operation: {
+                    "samples": len(samples),
+                    "p50": round(percentile(samples, 50) * 1000, 1),
+                    "p95": round(percentile(samples, 95) * 1000, 1)
+                }
+                for operation, samples in self.latencies.items() if samples
+            }
+        }
+
+
+class LLMRouter:
+    """Routes LLM operations to providers by health and latency"""
+
+    def __init__(self, providers: List[LLMProvider]):
+        self.providers = providers
+        self.health = {provider.name: ProviderHealth() for provider in providers}
+        self.hedges = 0
+        self.failovers = 0
+        self.batch_calls = 0
+        self.batched_items = 0
+        self.split_items = 0
+
+    def candidates(self, operation: str) -> List[LLMProvider]:
+        """
+        Providers that can take this operation now, best first: healthy
+        providers (error rate under the limit) by p50 latency, then the rest.
+        Providers without enough samples keep their configured order.
+        """
+        available = [
+            (order, provider) for order, provider in enumerate(self.providers)
+            if provider.supports(operation) and self.health[provider.name].available()
+        ]
+
+        def rank(item):
+            order, provider = item
+            health = self.health[provider.name]
+            p50 = health.latency(operation, 50)
+            return (
+                health.error_rate() > settings.llm_max_error_rate,
+                p50 if p50 is not None else float("inf"),
+                order
+            )
+
+        return [provider for _, provider in sorted(available, key=rank)]
+
+    def hedge_delay(self, provider: LLMProvider, operation: str) -> float:
+        """How long to wait on a provider before hedging: its p95 latency"""
+        p95 = self.health[provider.name].latency(operation, 95)
+        if p95 is None:
+            return settings.llm_hedge_default_delay_seconds
+        return max(p95, settings.llm_hedge_min_delay_seconds)
+
+    async def _timed_call(self, provider: LLMProvider, operation: str, method: str, args):
+        health = self.health[provider.name]
+        health.begin()
+        start = time.perf_counter()
+        try:
+            result = await getattr(provider, method)(*args)
+        except asyncio.CancelledError:
+            health.record_cancelled()
+            LLM_CALL_SECONDS.observe(time.perf_counter() - start, provider=provider.name, operation=operation, outcome="cancelled")
+            raise
+        except Exception:
+            health.record_failure()
+            LLM_CALL_SECONDS.observe(time.perf_counter() - start, provider=provider.name, operation=operation, outcome="error")
+            raise
+        latency = time.perf_counter() - start
+        health.record_success(operation, latency)
+        LLM_CALL_SECONDS.observe(latency, provider=provider.name, operation=operation, outcome="ok")
+        return result
+
+    async def call(self, operation: str, method: str, *args, hedge: bool = False) -> Any:
+        """
+        Run `method` on the best provider. If it fails, the next provider is
+        tried; with hedge=True a duplicate is also sent to the next provider
+        once the first has run past its p95 latency.
+        Raises LLMProviderError when every provider failed.
+        """
+        remaining = self.candidates(operation)
+        if not remaining:
+            raise LLMProviderError(f"No available provider for {operation}")
+
+        pending: Dict[asyncio.Task, LLMProvider] = {}
+        errors = []
+        primary = remaining[0]
+        hedged = False
+
+        def launch():
+            provider = remaining.pop(0)
+            task = asyncio.create_task(self._timed_call(provider, operation, method, args))
+            pending[task] = provider
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if hedge and not hedged and remaining and settings.llm_hedge_enabled:
+                    timeout = self.hedge_delay(primary, operation)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The primary is slower than its usual p95: hedge
+                    hedged = True
+                    self.hedges += 1
+                    launch()
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        errors.append(f"{provider.name}: {str(e)}")
+                        continue
+                    if hedged and provider is not primary:
+                        self.health[provider.name].hedge_wins += 1
+                    return result
+                if not pending and remaining:
+                    self.failovers += 1
+                    primary = remaining[0]
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise LLMProviderError(f"All providers failed for {operation}: {'; '.join(errors)}")
+
+    async def stream(self, method: str, *args, meta: Optional[Dict] = None):
+        """
+        Stream from the best provider. A provider that fails before sending
+        anything is skipped for the next one; the latency recorded is the
+        time to the first chunk.
+        """
+        candidates = self.candidates(STREAM)
+        errors = []
+        for provider in candidates:
+            health = self.health[provider.name]
+            health.begin()
+            start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in getattr(provider, method)(*args):
+                    if not started:
+                        started = True
+                        latency = time.perf_counter() - start
+                        health.record_success(STREAM, latency)
+                        LLM_CALL_SECONDS.observe(latency, provider=provider.name, operation=STREAM, outcome="ok")
+                        if meta is not None:
+                            meta["provider"] = provider.name
+                    yield chunk
+            except Exception as e:
+                if not started:
+                    health.record_failure()
+                    LLM_CALL_SECONDS.observe(time.perf_counter() - start, provider=provider.name, operation=STREAM, outcome="error")
+                    errors.append(f"{provider.name}: {str(e)}")
+                    self.failovers += 1
+                    continue
+                health.record_failure()
+                raise
+            if started:
+                return
+            health.record_failure()
+            errors.append(f"{provider.name}: empty response")
+        raise LLMProviderError(f"All providers failed to stream: {'; '.join(errors) or 'none available'}")
+
+    def get_stats(self) -> Dict:
+        """Get routing statistics"""
+        return {
+            "providers": {name: health.get_stats() for name, health in self.health.items()},
+            "order": {
+                operation: [p.name for p in self.candidates(operation)]
+                for operation in (ANSWER, EXPLAIN, EXTRACT, EXTRACT_BATCH, STREAM, TRANSLATE)
+            },
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+            "extraction_batches": {
+                "calls": self.batch_calls,
+                "items": self.batched_items,
+                "split_to_single": self.split_items
+            },
+            "hedging_enabled": settings.llm_hedge_enabled
+        }
+
+
+def build_providers() -> List[LLMProvider]:
+    """Providers in the configured preference order (settings.llm_providers)"""
+    available = {provider.name: provider for provider in (GeminiProvider(), GroqProvider(), OpenAIProvider())}
+    names = [name.strip() for name in settings.llm_providers.split(",") if name.strip()]
+    return [available[name] for name in names if name in available]
+
+
+# Global router
+llm_router = LLMRouter(build_providers())
+
+
+async def answer_user_query(user_message: str, schemes_data: list, conversation=None, language: str = "en") -> str:
+    """Answer a user query in the user's language with the best available provider (hedged)"""
+    try:
+        return await llm_router.call(ANSWER, "answer_query", user_message, schemes_data, conversation, language, hedge=True)
+    except Exception as e:
+        logger.error("Error in answer_user_query: %s", e)
+        return "I apologize, but I'm unable to process your question at the moment. Please try again later."
+
+
+async def get_scheme_explanation(scheme, language: str = "en") -> str:
+    """Explain a scheme in the given language with the best available provider (hedged)"""
+    try:
+        return await llm_router.call(EXPLAIN, "explain_scheme", scheme, language, hedge=True)
+    except Exception as e:
+        logger.error("Error in get_scheme_explanation: %s", e)
+        scheme_name = scheme.get('name', 'Unknown Scheme')
+        return f"I apologize, but I'm unable to generate an explanation for the {scheme_name} scheme at the moment. Please try again later."
+
+
+async def process_scheme_data(raw_data) -> Dict:
+    """Extract structured scheme data; ingest is not latency-sensitive, so no hedging"""
+    try:
+        return await llm_router.call(EXTRACT, "extract_scheme", raw_data)
+    except Exception as e:
+        logger.error("Error in process_scheme_data: %s", e)
+        return fallback_scheme_data(raw_data)
+
+
+async def process_scheme_batch(raw_items: List[Dict]) -> List[Dict]:
+    """
+    Extract several pages with one LLM call. Items the batch response leaves
+    out or gets wrong (or all of them, if the call fails) are retried as
+    single-page extractions. Results are in the order of raw_items.
+    """
+    if len(raw_items) == 1:
+        return [await process_scheme_data(raw_items[0])]
+
+    llm_router.batch_calls += 1
+    llm_router.batched_items += len(raw_items)
+    try:
+        results = await llm_router.call(EXTRACT_BATCH, "extract_schemes", raw_items)
+    except Exception as e:
+        logger.error("Error in batch extraction of %s pages: %s", len(raw_items), e)
+        results = {}
+
+    missing = [raw_data for raw_data in raw_items if raw_data["url"] not in results]
+    if missing:
+        logger.warning("Batch extraction: %s of %s pages retried individually", len(missing), len(raw_items))
+        llm_router.split_items += len(missing)
+        singles = await asyncio.gather(*(process_scheme_data(raw_data) for raw_data in missing))
+        results.update((raw_data["url"], data) for raw_data, data in zip(missing, singles))
+    return [results[raw_data["url"]] for raw_data in raw_items]
+
+
+async def stream_user_query(user_message: str, schemes_data: list, conversation=None, language: str = "en", meta: Optional[Dict] = None):
+    """
+    Stream an answer in the user's language from the best available provider.
+    If every provider fails, or one fails mid-stream, an apology is yielded and
+    meta["failed"] is set.
+    """
+    try:
+        async for chunk in llm_router.stream("stream_query", user_message, schemes_data, conversation, language, meta=meta):
+            yield chunk
+    except Exception as e:
+        logger.error("Error in stream_user_query: %s", e)
+        if meta is not None:
+            meta["failed"] = True
+        yield "I apologize, but I'm unable to process your question at the moment. Please try again later."
+
+
+async def stream_scheme_explanation(scheme, language: str = "en", meta: Optional[Dict] = None):
+    """Stream a scheme explanation from the best available provider; on failure meta["failed"] is set"""
+    try:
+        async for chunk in llm_router.stream("stream_explanation", scheme, language, meta=meta):
+            yield chunk
+    except Exception as e:
+        logger.error("Error in stream_scheme_explanation: %s", e)
+        if meta is not None:
+            meta["failed"] = True
+        scheme_name = scheme.get('name', 'Unknown Scheme')
+        yield f"I apologize, but I'm unable to generate an explanation for the {scheme_name} scheme at the moment. Please try again later."
@@ -0,0 +1,44 @@
+"""
+Serving-side helpers for translated scheme content.
+Translations are produced at ingest (see translation_service) and stored on
+the scheme as translations[language], tagged with the content_hash of the
+page they were made from. A translation whose hash no longer matches is
+ignored, so users get the current English text rather than an outdated one.
+"""
+
+from typing import Dict, Optional
+
+# Languages translations are produced for (English is the source)
+LANGUAGE_NAMES = {"en": "English", "hi": "Hindi", "mr": "Marathi"}
+TRANSLATION_LANGUAGES = [language for language in LANGUAGE_NAMES if language != "en"]
+TRANSLATED_FIELDS = ["name", "shortDescription", "eligibility", "benefits"]
+
+
+def language_name(language: Optional[str]) -> str:
+    return LANGUAGE_NAMES.get(language or "en", "English")
+
+
+def get_translation(scheme: Dict, language: Optional[str]) -> Optional[Dict]:
+    """The stored translation for a language, if it matches the scheme's current content"""
+    if not language or language == "en":
+        return None
+    translation = (scheme.get("translations") or {}).get(language)
+    if not translation or translation.get("source_hash") != scheme.get("content_hash"):
+        return None
+    return translation
+
+
+def localize_scheme(scheme: Dict, language: Optional[str]) -> Dict:
+    """
+    Copy of the scheme with the translated fields in the given language.
+    Fields without a current translation stay in English.
+    """
+    translation = get_translation(scheme, language)
+    if not translation:
+        return scheme
+    localized = dict(scheme)
+    for field in TRANSLATED_FIELDS:
+        if translation.get(field) and field in scheme:
+            localized[field] = translation[field]
+    localized["language"] = language
+    return localized
@@ -0,0 +1,239 @@
+"""
+Durable outbound WhatsApp queue.
+Ingestion only enqueues messages (stored in Mongo, so nothing is lost on a
+restart); a pool of workers drains the queue with token-bucket rate limiting
+and retries failed sends with exponential backoff.
+"""
+
+from typing import Optional, List, Dict
+from datetime import datetime, timedelta
+import logging
+import asyncio
+import random
+import time
+from pymongo import ReturnDocument
+from app.core.config import settings
+from app.core.database import users_collection, notifications_collection, whatsapp_queue_collection
+from app.core.metrics import WHATSAPP_SEND_SECONDS
+from app.services.whatsapp_service import send_whatsapp_notification
+
+logger = logging.getLogger(__name__)
+
+# Users are read and notifications written in batches of this size
+USER_BATCH_SIZE = 500
+
+
+class TokenBucket:
+    """Allows `rate` operations per second on average, with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def format_scheme_message(scheme: Dict) -> str:
+    return f"🎯 नई योजना: {scheme['title']}\nश्रेणी: {scheme['category']}\nविवरण देखें: {scheme['url']}"
+
+
+def format_digest_message(schemes: List[Dict]) -> str:
+    """One message listing every new scheme"""
+    if len(schemes) == 1:
+        return format_scheme_message(schemes[0])
+    lines = [f"🎯 {len(schemes)} नई योजनाएं:"]
+    for scheme in schemes:
+        lines.append(f"• {scheme['title']} ({scheme['category']}) - {scheme['url']}")
+    return "\n".join(lines)
+
+
+def build_messages(user: Dict, new_schemes: List[Dict], now: datetime) -> List[Dict]:
+    """Queue entries for one user: a single digest, or one message per scheme"""
+    if settings.whatsapp_digest_mode:
+        groups = [new_schemes]
+    else:
+        groups = [[scheme] for scheme in new_schemes]
+    return [
+        {
+            "user_id": str(user["_id"]),
+            "phone_number": user["mobileno"],
+            "message": format_digest_message(group),
+            "scheme_ids": [scheme["id"] for scheme in group],
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now
+        }
+        for group in groups
+    ]
+
+
+async def enqueue_scheme_notifications(new_schemes: List[Dict]) -> Dict:
+    """
+    Write in-app notifications and queue WhatsApp messages for every user.
+    Only database writes happen here, so ingestion returns quickly
+    regardless of the number of users.
+    """
+    user_count = 0
+    queued = 0
+    users = users_collection.find({}, {"mobileno": 1})
+    while True:
+        batch = await users.to_list(USER_BATCH_SIZE)
+        if not batch:
+            break
+        now = datetime.utcnow()
+        notifications = [
+            {
+                "user_id": str(user["_id"]),
+                "message": f"New {scheme['category']} scheme: {scheme['title']} - Learn more: {scheme['url']}",
+                "type": "scheme_update",
+                "scheme_id": scheme["id"],
+                "created_at": now,
+                "is_read": False
+            }
+            for user in batch
+            for scheme in new_schemes
+        ]
+        messages = [
+            message
+            for user in batch if user.get("mobileno")
+            for message in build_messages(user, new_schemes, now)
+        ]
+        if notifications:
+            await notifications_collection.insert_many(notifications, ordered=False)
+        if messages:
+            await whatsapp_queue_collection.insert_many(messages, ordered=False)
+        user_count += len(batch)
+        queued += len(messages)
+
+    if queued:
+        delivery_queue.wake()
+    return {"users": user_count, "whatsapp_queued": queued}
+
+
+class WhatsAppDeliveryQueue:
+    """Pool of workers draining the whatsapp_queue collection"""
+
+    def __init__(self):
+        self.bucket = TokenBucket(settings.whatsapp_rate_per_second, settings.whatsapp_burst)
+        self.workers: List[asyncio.Task] = []
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def wake(self):
+        """Signal idle workers that new messages were queued"""
+        self._wake.set()
+
+    async def claim(self) -> Optional[Dict]:
+        """
+        Atomically claim the next due message.
+        Messages stuck in "sending" (a worker died mid-send) are reclaimed after a timeout.
+        """
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=settings.whatsapp_lock_timeout_seconds)
+        return await whatsapp_queue_collection.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "locked_at": {"$lte": stale}}
+            ]},
+            {"$set": {"status": "sending", "locked_at": now}, "$inc": {"attempts": 1}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def deliver(self, job: Dict):
+        await self.bucket.acquire()
+        try:
+            with WHATSAPP_SEND_SECONDS.time(outcome="ok"):
+                await send_whatsapp_notification(job["phone_number"], job["message"])
+        except Exception as e:
+            if job["attempts"] >= settings.whatsapp_max_attempts:
+                self.failed += 1
+                update = {"status": "failed", "last_error": str(e), "completed_at": datetime.utcnow()}
+            else:
+                self.retried += 1
+                backoff = settings.whatsapp_retry_base_seconds * 2 ** (job["attempts"] - 1)
+                backoff *= random.uniform(0.8, 1.2)
+                update = {
+                    "status": "pending",
+                    "last_error": str(e),
+                    "next_attempt_at": datetime.utcnow() + timedelta(seconds=backoff)
+                }
+            await whatsapp_queue_collection.update_one({"_id": job["_id"]}, {"$set": update})
+            return
+
+        self.sent += 1
+        now = datetime.utcnow()
+        await whatsapp_queue_collection.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": "sent", "sent_at": now, "completed_at": now}}
+        )
+
+    async def run_worker(self):
+        while not self._stopping:
+            try:
+                job = await self.claim()
+            except Exception as e:
+                logger.error("Error claiming WhatsApp message: %s", e)
+                job = None
+
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=settings.whatsapp_poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self.deliver(job)
+            except Exception as e:
+                logger.error("Error delivering WhatsApp message %s: %s", job['_id'], e)
+
+    def start(self):
+        """Start the worker pool (called from the startup event)"""
+        self._stopping = False
+        self.workers = [asyncio.create_task(self.run_worker()) for _ in range(settings.whatsapp_workers)]
+
+    async def stop(self):
+        """Stop the workers; messages in flight are reclaimed on the next start"""
+        self._stopping = True
+        self.wake()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def get_stats(self) -> Dict:
+        """Get queue statistics"""
+        counts = {}
+        async for row in whatsapp_queue_collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        return {
+            "queue": counts,
+            "workers": len(self.workers),
+            "rate_per_second": self.bucket.rate,
+            "digest_mode": settings.whatsapp_digest_mode,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed
+        }
+
+
+# Global delivery queue
+delivery_queue = WhatsAppDeliveryQueue()
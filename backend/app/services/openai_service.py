@@ -1,14 +1,22 @@
-import httpx
-import json
+import logging
 from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.services.prompt_builder import Section, build_prompt
+from app.services.llm_provider import LLMProvider, LLMProviderError, EXTRACT, parse_scheme_data, fallback_scheme_data
 
-async def process_scheme_data(raw_data):
-    url = "https://api.openai.com/v1/chat/completions"
+logger = logging.getLogger(__name__)
+
+OPENAI_MODEL = "gpt-3.5-turbo"
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+
+def build_extraction_request(raw_data):
+    """Returns (headers, data) for a structured extraction request"""
     headers = {
         "Authorization": f"Bearer {settings.openai_api_key}",
         "Content-Type": "application/json"
     }
-    prompt = f"""Extract and structure the following government financial scheme information into JSON format with these exact fields:
+    prompt = build_prompt("extract", [
+        Section("instructions", """Extract and structure the following government financial scheme information into JSON format with these exact fields:
 - name: The scheme name
 - category: One of: "agriculture", "business", "pension", "education", "housing", "general"
 - shortDescription: Brief 1-2 sentence description
@@ -19,61 +27,82 @@ async def process_scheme_data(raw_data):
 - tags: Array of relevant tags
 - ageRange: Age range if specified (optional)
 - incomeLimit: Income limit if specified (optional)
-
-Raw data: {raw_data}
-
-Return only valid JSON, no additional text."""
+""", required=True),
+        Section("title", f"Title: {raw_data.get('title', '')}", required=True),
+        Section("url", f"URL: {raw_data.get('url', '')}", required=True),
+        Section("content", f"Content: {raw_data.get('description', '')}"),
+        Section("format", "\nReturn only valid JSON, no additional text.", required=True),
+    ], OPENAI_MODEL)
 
     data = {
-        "model": "gpt-3.5-turbo",
+        "model": OPENAI_MODEL,
         "messages": [{"role": "user", "content": prompt}],
         "temperature": 0.3
     }
+    return headers, data
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, headers=headers, json=data)
-        result = response.json()
+async def extract_scheme_data(raw_data):
+    """
+    Extract structured scheme information with OpenAI.
+    Raises on API errors and on output that is not a JSON object.
+    """
+    headers, data = build_extraction_request(raw_data)
+    client = get_http_client("openai")
+    response = await client.post(OPENAI_CHAT_URL, headers=headers, json=data)
+    result = response.json()
 
-    if "choices" in result and result["choices"]:
-        content = result["choices"][0]["message"]["content"]
-    else:
-        content = result.get("content", result.get("response", ""))
+    if not result.get("choices"):
+        error_message = result.get("error", {}).get("message", "Unknown error")
+        raise LLMProviderError(f"OpenAI API error ({response.status_code}): {error_message}")
+    return parse_scheme_data(result["choices"][0]["message"]["content"], raw_data)
 
+async def process_scheme_data(raw_data):
+    """Extract structured scheme data, falling back to the basic structure on any error"""
     try:
-        return json.loads(content)
-    except json.JSONDecodeError:
-        # Fallback to basic structure
-        return {
-            "name": raw_data.get("title", ""),
-            "category": "general",
-            "shortDescription": raw_data.get("description", ""),
-            "eligibility": [],
-            "benefits": [],
-            "requiredDocuments": [],
-            "eligibleRoles": [],
-            "tags": []
-        }
+        return await extract_scheme_data(raw_data)
+    except Exception as e:
+        logger.error("Error in process_scheme_data: %s", e)
+        return fallback_scheme_data(raw_data)
 
 async def get_scheme_explanation(scheme):
-    url = "https://api.openai.com/v1/chat/completions"
     headers = {
         "Authorization": f"Bearer {settings.openai_api_key}",
         "Content-Type": "application/json"
     }
-    prompt = f"Explain this government financial scheme in simple Hindi: {scheme['name']} - {scheme.get('shortDescription', '')}"
+    prompt = build_prompt("explain", [
+        Section("instructions", f"Explain this government financial scheme in simple Hindi: {scheme['name']} -", required=True),
+        Section("description", scheme.get('shortDescription', '')),
+    ], OPENAI_MODEL, separator=" ")
     data = {
-        "model": "gpt-3.5-turbo",
+        "model": OPENAI_MODEL,
         "messages": [{"role": "user", "content": prompt}],
         "temperature": 0.7
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, headers=headers, json=data)
-        result = response.json()
+    client = get_http_client("openai")
+    response = await client.post(OPENAI_CHAT_URL, headers=headers, json=data)
+    result = response.json()
 
     if "choices" in result and result["choices"]:
         content = result["choices"][0]["message"]["content"]
     else:
         content = result.get("content", result.get("response", "Sorry, I couldn't process your request."))
 
-    return content
\ No newline at end of file
+    return content
+
+
+class OpenAIProvider(LLMProvider):
+    """
+    OpenAI behind the common provider interface. Only extraction is routed
+    here: its explanations are written in Hindi, unlike the other providers'.
+    """
+
+    name = "openai"
+    model = OPENAI_MODEL
+    operations = frozenset({EXTRACT})
+
+    def is_configured(self):
+        return bool(settings.openai_api_key)
+
+    async def extract_scheme(self, raw_data):
+        return await extract_scheme_data(raw_data)
@@ -0,0 +1,262 @@
+"""
+Token-budgeted prompt assembly shared by the LLM services.
+A prompt is a list of sections. Each call type (extract, explain, chat) has a
+token budget; when the sections do not fit, the lowest-priority sections are
+truncated (or dropped) first, while required sections (instructions, the
+question) are always kept whole. Token counts are estimated per model family.
+"""
+
+from typing import Dict, List, NamedTuple, Optional
+from app.core.config import settings
+
+# Approximate characters per token for ASCII text, by model family.
+# Non-ASCII text (e.g. Devanagari) tokenizes far less efficiently.
+MODEL_CHARS_PER_TOKEN = {
+    "gemini": 4.0,
+    "mixtral": 3.5,
+    "gpt": 4.0,
+}
+DEFAULT_CHARS_PER_TOKEN = 4.0
+NON_ASCII_TOKENS_PER_CHAR = {
+    "gemini": 0.5,
+    "mixtral": 1.0,
+    "gpt": 1.0,
+}
+DEFAULT_NON_ASCII_TOKENS_PER_CHAR = 1.0
+
+TRUNCATION_MARK = "…"
+
+
+def _model_family(model: Optional[str]) -> Optional[str]:
+    name = (model or "").lower()
+    for family in MODEL_CHARS_PER_TOKEN:
+        if family in name:
+            return family
+    return None
+
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """Estimate the number of tokens `text` takes for `model`"""
+    if not text:
+        return 0
+    family = _model_family(model)
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    ascii_chars = len(text) - non_ascii
+    tokens = ascii_chars / MODEL_CHARS_PER_TOKEN.get(family, DEFAULT_CHARS_PER_TOKEN)
+    tokens += non_ascii * NON_ASCII_TOKENS_PER_CHAR.get(family, DEFAULT_NON_ASCII_TOKENS_PER_CHAR)
+    return int(tokens) + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Cut `text` (at a word boundary) so it fits in `max_tokens`"""
+    if estimate_tokens(text, model) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    # Scale by the text's own chars-per-token ratio, then trim to a word
+    max_chars = int(len(text) * max_tokens / estimate_tokens(text, model))
+    while True:
+        cut = text[:max_chars]
+        if " " in cut:
+            cut = cut.rsplit(" ", 1)[0]
+        cut += TRUNCATION_MARK
+        if max_chars <= 1 or estimate_tokens(cut, model) <= max_tokens:
+            return cut
+        max_chars = int(max_chars * 0.9)
+
+
+class Section(NamedTuple):
+    name: str
+    text: str
+    priority: int = 0  # lower priority is truncated first
+    required: bool = False
+    min_tokens: int = 0  # a section cut below this is dropped instead
+
+
+class PromptStats:
+    """Prompt sizes per call type"""
+
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+        self.total_tokens: Dict[str, int] = {}
+        self.max_tokens: Dict[str, int] = {}
+        self.truncated: Dict[str, int] = {}
+        self.dropped_sections: Dict[str, int] = {}
+        self.tokens_cut: Dict[str, int] = {}
+
+    def record(self, call_type: str, tokens: int, tokens_cut: int, dropped: int):
+        self.calls[call_type] = self.calls.get(call_type, 0) + 1
+        self.total_tokens[call_type] = self.total_tokens.get(call_type, 0) + tokens
+        self.max_tokens[call_type] = max(self.max_tokens.get(call_type, 0), tokens)
+        if tokens_cut:
+            self.truncated[call_type] = self.truncated.get(call_type, 0) + 1
+            self.tokens_cut[call_type] = self.tokens_cut.get(call_type, 0) + tokens_cut
+        self.dropped_sections[call_type] = self.dropped_sections.get(call_type, 0) + dropped
+
+    def get_stats(self) -> Dict:
+        return {
+            call_type: {
+                "budget_tokens": get_budget(call_type),
+                "calls": calls,
+                "avg_tokens": round(self.total_tokens[call_type] / calls, 1),
+                "max_tokens": self.max_tokens[call_type],
+                "truncated_calls": self.truncated.get(call_type, 0),
+                "tokens_cut": self.tokens_cut.get(call_type, 0),
+                "dropped_sections": self.dropped_sections.get(call_type, 0)
+            }
+            for call_type, calls in self.calls.items()
+        }
+
+
+# Global prompt statistics
+prompt_stats = PromptStats()
+
+
+def get_budget(call_type: str) -> int:
+    """Token budget for a call type (settings.prompt_budget_<call_type>)"""
+    return getattr(settings, f"prompt_budget_{call_type}")
+
+
+def fit_sections(sections: List[Section], budget: int, model: Optional[str] = None):
+    """
+    Truncate sections, lowest priority first, until they fit in `budget`.
+    Returns (sections, tokens_cut, dropped_count); order is preserved.
+    """
+    sizes = [estimate_tokens(s.text, model) for s in sections]
+    overflow = sum(sizes) - budget
+    if overflow <= 0:
+        return sections, 0, 0
+
+    fitted = list(sections)
+    tokens_cut = 0
+    dropped = 0
+    # Among equal priorities, later sections (e.g. lower-ranked schemes) go first
+    order = sorted(range(len(sections)), key=lambda i: (sections[i].priority, -i))
+    for i in order:
+        if overflow <= 0:
+            break
+        section = sections[i]
+        if section.required or not section.text:
+            continue
+        keep = sizes[i] - overflow
+        if keep < max(section.min_tokens, 1):
+            fitted[i] = None
+            dropped += 1
+            overflow -= sizes[i]
+            tokens_cut += sizes[i]
+        else:
+            text = truncate_to_tokens(section.text, keep, model)
+            fitted[i] = section._replace(text=text)
+            cut = sizes[i] - estimate_tokens(text, model)
+            overflow -= cut
+            tokens_cut += cut
+    return [s for s in fitted if s is not None], tokens_cut, dropped
+
+
+def build_prompt(call_type: str, sections: List[Section], model: Optional[str] = None, separator: str = "\n") -> str:
+    """Join sections into a prompt that fits the call type's budget, and record its size"""
+    fitted, tokens_cut, dropped = fit_sections(sections, get_budget(call_type), model)
+    prompt = separator.join(s.text for s in fitted)
+    prompt_stats.record(call_type, estimate_tokens(prompt, model), tokens_cut, dropped)
+    return prompt
+
+
+# Scraped pages are cut to fit the extraction budget; everything else is kept
+EXTRACTION_INSTRUCTIONS = """You are an AI assistant that extracts government financial scheme information from web content.
+
+Analyze the following content and extract structured information about the government scheme.
+"""
+
+EXTRACTION_FIELDS = """{
+  "name": "Full scheme name",
+  "category": "one of: agriculture, business, pension, education, housing, general",
+  "shortDescription": "Clear 2-3 sentence description in English",
+  "eligibility": ["list of eligibility criteria as separate items"],
+  "benefits": ["list of benefits as separate items"],
+  "requiredDocuments": ["list of required documents"],
+  "eligibleRoles": ["applicable roles from: farmer, student, self_employed, salaried, unemployed, other"],
+  "tags": ["relevant tags for searching"],
+  "ageRange": "age criteria if mentioned, else null",
+  "incomeLimit": "income limit if mentioned, else null",
+  "applicationProcess": "Brief description of how to apply",
+  "officialWebsite": "Official website URL if available"
+}"""
+
+EXTRACTION_SCHEMA = f"""
+Extract and return ONLY a valid JSON object with these exact fields:
+{EXTRACTION_FIELDS}
+
+IMPORTANT: Return ONLY the JSON object, no markdown code blocks, no additional text."""
+
+BATCH_EXTRACTION_INSTRUCTIONS = """You are an AI assistant that extracts government financial scheme information from web content.
+
+Analyze each of the following documents and extract structured information about the government scheme it describes.
+"""
+
+BATCH_EXTRACTION_SCHEMA = f"""
+Return ONLY a valid JSON array with one object per document, in the same order.
+Each object must have "url" set to the document's URL, plus these exact fields:
+{EXTRACTION_FIELDS}
+
+IMPORTANT: Return ONLY the JSON array, no markdown code blocks, no additional text."""
+
+
+def build_extraction_prompt(raw_data: Dict, model: Optional[str] = None) -> str:
+    """Extraction prompt for one scraped page; the page text is truncated to fit"""
+    return build_prompt("extract", [
+        Section("instructions", EXTRACTION_INSTRUCTIONS, required=True),
+        Section("title", f"Title: {raw_data.get('title', '')}", required=True),
+        Section("content", f"Content: {raw_data.get('description', '')}", priority=0),
+        Section("url", f"URL: {raw_data.get('url', '')}", required=True),
+        Section("schema", EXTRACTION_SCHEMA, required=True),
+    ], model)
+
+
+def _document_section(index: int, raw_data: Dict, content_tokens: int, model: Optional[str]) -> Section:
+    content = truncate_to_tokens(raw_data.get('description', ''), content_tokens, model)
+    return Section(f"document_{index}", f"""Document {index}
+Title: {raw_data.get('title', '')}
+URL: {raw_data.get('url', '')}
+Content: {content}
+""", required=True)
+
+
+def _document_content_tokens(model: Optional[str]) -> int:
+    """Per-document content cap: what a single-page extraction prompt would allow"""
+    overhead = estimate_tokens(EXTRACTION_INSTRUCTIONS + EXTRACTION_SCHEMA, model)
+    return max(get_budget("extract") - overhead, 0)
+
+
+def plan_extraction_batches(raw_items: List[Dict], model: Optional[str] = None) -> List[List[Dict]]:
+    """
+    Pack pages into batches for multi-document extraction. A batch holds at
+    most settings.extract_batch_size pages and its prompt stays within
+    settings.prompt_budget_extract_batch; each page's text is capped as in
+    single-page extraction.
+    """
+    overhead = estimate_tokens(BATCH_EXTRACTION_INSTRUCTIONS + BATCH_EXTRACTION_SCHEMA, model)
+    content_tokens = _document_content_tokens(model)
+    budget = get_budget("extract_batch")
+
+    batches = []
+    batch, used = [], overhead
+    for raw_data in raw_items:
+        size = estimate_tokens(_document_section(len(batch) + 1, raw_data, content_tokens, model).text, model)
+        if batch and (len(batch) >= settings.extract_batch_size or used + size > budget):
+            batches.append(batch)
+            batch, used = [], overhead
+        batch.append(raw_data)
+        used += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def build_batch_extraction_prompt(raw_items: List[Dict], model: Optional[str] = None) -> str:
+    """One extraction prompt for several pages, answered with a JSON array keyed by URL"""
+    content_tokens = _document_content_tokens(model)
+    return build_prompt("extract_batch", [
+        Section("instructions", BATCH_EXTRACTION_INSTRUCTIONS, required=True),
+        *(_document_section(idx + 1, raw_data, content_tokens, model) for idx, raw_data in enumerate(raw_items)),
+        Section("schema", BATCH_EXTRACTION_SCHEMA, required=True),
+    ], model)
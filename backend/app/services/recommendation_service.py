@@ -0,0 +1,156 @@
+"""
+Precomputed home-screen recommendations.
+For every (role, language) pair the recommended schemes are kept as a ready
+JSON body with its ETag: schemes that name the role first, then schemes open
+to every role, newest first within each group. Inserted or updated schemes
+only rebuild the lists of the roles they affect.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import bisect
+import hashlib
+import json
+from fastapi.encoders import jsonable_encoder
+from app.core.config import settings
+from app.core.database import schemes_collection
+from app.services.search_service import SUMMARY_FIELDS
+from app.services.eligibility_service import ROLES, ROLE_BITS, SPECIFIC_ROLES_MASK, role_mask
+from app.services.localization import LANGUAGE_NAMES, TRANSLATION_LANGUAGES, TRANSLATED_FIELDS, get_translation
+
+LANGUAGES = list(LANGUAGE_NAMES)
+# Summary fields that have translations
+LOCALIZED_FIELDS = [field for field in TRANSLATED_FIELDS if field in SUMMARY_FIELDS]
+
+# Group of a scheme in a role's list: 0 = names the role, 1 = open to every role
+ROLE_MATCH = 0
+OPEN_TO_ALL = 1
+
+
+def role_groups(mask: int) -> Dict[str, int]:
+    """Roles whose list includes a scheme with this role mask, and its group in each"""
+    if mask & SPECIFIC_ROLES_MASK == 0:
+        return {role: OPEN_TO_ALL for role in ROLES}
+    return {role: ROLE_MATCH for role in ROLES if mask & ROLE_BITS[role]}
+
+
+def recency_key(scheme_id: str) -> int:
+    """Newer ObjectIds sort first"""
+    try:
+        return -int(scheme_id, 16)
+    except ValueError:
+        return 0
+
+
+class MaterializedList:
+    """A serialized recommendation list and its ETag"""
+
+    __slots__ = ("body", "etag", "count")
+
+    def __init__(self, items: List[Dict]):
+        payload = json.dumps(
+            jsonable_encoder({"count": len(items), "results": items}),
+            separators=(",", ":"), ensure_ascii=False
+        ).encode("utf-8")
+        self.body = payload
+        self.etag = f'W/"{hashlib.sha1(payload).hexdigest()}"'
+        self.count = len(items)
+
+
+class SchemeRecommendations:
+    """Per-role ordered scheme ids, materialized per (role, language)"""
+
+    def __init__(self):
+        self.summaries: Dict[str, Dict] = {}
+        # scheme_id -> {language: localized summary} for current translations
+        self.localized_summaries: Dict[str, Dict[str, Dict]] = {}
+        self.masks: Dict[str, int] = {}
+        # role -> sorted [(group, recency, scheme_id)]
+        self.ranked: Dict[str, List[Tuple[int, int, str]]] = {role: [] for role in ROLES}
+        self.lists: Dict[Tuple[str, str], MaterializedList] = {}
+        self.rebuilds = 0
+        self.loaded = False
+        self._load_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.summaries)
+
+    def _set(self, scheme: Dict) -> set:
+        """Store a scheme and re-rank it; returns the roles whose lists changed"""
+        scheme_id = str(scheme.get("id") or scheme.get("_id"))
+        mask = role_mask(scheme.get("eligibleRoles"))
+        previous = self.masks.get(scheme_id)
+        affected = set()
+        if previous is not None:
+            for role, group in role_groups(previous).items():
+                entries = self.ranked[role]
+                entries.pop(bisect.bisect_left(entries, (group, recency_key(scheme_id), scheme_id)))
+                affected.add(role)
+        for role, group in role_groups(mask).items():
+            bisect.insort(self.ranked[role], (group, recency_key(scheme_id), scheme_id))
+            affected.add(role)
+
+        summary = {field: scheme.get(field) for field in SUMMARY_FIELDS}
+        summary["id"] = scheme_id
+        self.summaries[scheme_id] = summary
+        self.localized_summaries[scheme_id] = {}
+        for language in TRANSLATION_LANGUAGES:
+            translation = get_translation(scheme, language)
+            if translation:
+                localized = dict(summary, language=language)
+                localized.update({field: translation[field] for field in LOCALIZED_FIELDS if translation.get(field)})
+                self.localized_summaries[scheme_id][language] = localized
+        self.masks[scheme_id] = mask
+        return affected
+
+    def localized(self, scheme_id: str, language: str) -> Dict:
+        """A scheme's summary as shown to users of a language (English when not translated)"""
+        return self.localized_summaries[scheme_id].get(language) or self.summaries[scheme_id]
+
+    def _materialize(self, role: str):
+        top = self.ranked[role][:settings.recommendation_list_size]
+        for language in LANGUAGES:
+            self.lists[(role, language)] = MaterializedList(
+                [self.localized(scheme_id, language) for _, _, scheme_id in top]
+            )
+        self.rebuilds += 1
+
+    def upsert(self, schemes: List[Dict]) -> None:
+        """Add or update schemes and rebuild the lists they appear in"""
+        affected = set()
+        for scheme in schemes:
+            affected |= self._set(scheme)
+        for role in affected:
+            self._materialize(role)
+
+    def get(self, role: Optional[str], language: Optional[str]) -> Optional[MaterializedList]:
+        return self.lists.get((role or "other", language or "en"))
+
+    async def ensure_loaded(self) -> None:
+        """Build every list from the database on first use"""
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if self.loaded:
+                return
+            projection = {field: 1 for field in SUMMARY_FIELDS}
+            projection.update({"content_hash": 1, "translations": 1})
+            schemes = await schemes_collection.find({}, projection).to_list(None)
+            for scheme in schemes:
+                self._set(scheme)
+            for role in ROLES:
+                self._materialize(role)
+            self.loaded = True
+
+    def get_stats(self) -> Dict:
+        return {
+            "schemes": len(self.summaries),
+            "lists": len(self.lists),
+            "list_sizes": {role: len(self.ranked[role]) for role in ROLES},
+            "rebuilds": self.rebuilds,
+            "loaded": self.loaded,
+        }
+
+
+# Global recommendation lists
+scheme_recommendations = SchemeRecommendations()
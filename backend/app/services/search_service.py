@@ -0,0 +1,248 @@
+"""
+Keyword search over schemes using an in-process BM25 inverted index.
+Queries and documents go through the same normalization, so Devanagari
+(Hindi/Marathi) and romanized input ("kisaan", "किसान") match the
+English scheme text without an LLM call.
+"""
+
+from typing import Optional, List, Dict, Tuple
+from collections import defaultdict
+import asyncio
+import math
+import re
+import unicodedata
+from app.core.database import schemes_collection
+
+# Field weights (BM25F-style): a hit in the name counts more than one in the benefits
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "tags": 2.0,
+    "shortDescription": 1.5,
+    "eligibility": 1.0,
+    "benefits": 1.0,
+}
+
+# Fields kept in memory so search results need no database round trip
+SUMMARY_FIELDS = ["name", "category", "shortDescription", "tags", "eligibleRoles", "officialWebsite"]
+
+_TOKEN_RE = re.compile(r"[\wऀ-ॿ]+", re.UNICODE)
+
+# Devanagari -> Latin transliteration (simplified ITRANS)
+_DEVANAGARI_VOWELS = {
+    "अ": "a", "आ": "aa", "इ": "i", "ई": "ii", "उ": "u", "ऊ": "uu", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au", "ऑ": "o",
+}
+_DEVANAGARI_MATRAS = {
+    "ा": "aa", "ि": "i", "ी": "ii", "ु": "u", "ू": "uu", "ृ": "ri",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au", "ॉ": "o",
+}
+_DEVANAGARI_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "ळ": "l", "व": "v",
+    "श": "sh", "ष": "sh", "स": "s", "ह": "h",
+}
+_DEVANAGARI_SIGNS = {"ं": "n", "ँ": "n", "ः": "h"}
+_VIRAMA = "्"
+_NUKTA = "़"
+_DEVANAGARI_DIGITS = str.maketrans("०१२३४५६७८९", "0123456789")
+
+# Romanized spelling variants collapsed to one form
+_PHONETIC_RULES = [
+    (re.compile(r"(.)\1+"), r"\1"),  # kisaan -> kisan, yojanaa -> yojana
+    (re.compile(r"ee"), "i"),
+    (re.compile(r"oo"), "u"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"sh"), "s"),
+]
+
+# Common Hindi/Marathi words (already normalized) mapped to the English terms
+# used in the scheme catalogue
+SYNONYMS = {
+    "kisan": ["farmer"], "krisak": ["farmer"], "setkari": ["farmer"], "setakari": ["farmer"],
+    "kheti": ["agriculture"], "krisi": ["agriculture"], "seti": ["agriculture"],
+    "fasal": ["crop"], "pik": ["crop"], "bima": ["insurance"], "vima": ["insurance"],
+    "chatr": ["student"], "chatra": ["student"], "vidyarthi": ["student"],
+    "siksa": ["education"], "sikshan": ["education"], "sikshn": ["education"],
+    "chatravriti": ["scholarship"], "sisyavriti": ["scholarship"],
+    "pensan": ["pension"], "vridha": ["pension", "old"],
+    "avas": ["housing"], "ghar": ["housing", "house"], "makan": ["housing", "house"],
+    "rin": ["loan"], "karj": ["loan"], "karja": ["loan"], "lon": ["loan"],
+    "vyavasay": ["business"], "vyapar": ["business"], "udyog": ["business"],
+    "rojgar": ["employment"], "berojgar": ["unemployed"], "berojgari": ["unemployed"],
+    "naukri": ["salaried", "job"], "mahila": ["women"], "stri": ["women"],
+    "yojana": ["scheme"], "yojna": ["scheme"], "sarkar": ["government"],
+    "sarkari": ["government"], "labh": ["benefits"], "patrata": ["eligibility"],
+    "svasthya": ["health"], "arogya": ["health"],
+}
+
+
+def transliterate_devanagari(word: str) -> str:
+    """Romanize a Devanagari word, dropping the word-final inherent vowel"""
+    out = []
+    chars = [c for c in word if c != _NUKTA]
+    for i, ch in enumerate(chars):
+        if ch in _DEVANAGARI_CONSONANTS:
+            out.append(_DEVANAGARI_CONSONANTS[ch])
+            nxt = chars[i + 1] if i + 1 < len(chars) else None
+            # Inherent 'a' unless followed by a matra/virama or at the end of the word
+            if nxt is not None and nxt not in _DEVANAGARI_MATRAS and nxt != _VIRAMA and nxt not in _DEVANAGARI_SIGNS:
+                out.append("a")
+        elif ch in _DEVANAGARI_MATRAS:
+            out.append(_DEVANAGARI_MATRAS[ch])
+        elif ch in _DEVANAGARI_VOWELS:
+            out.append(_DEVANAGARI_VOWELS[ch])
+        elif ch in _DEVANAGARI_SIGNS:
+            out.append(_DEVANAGARI_SIGNS[ch])
+        elif ch == _VIRAMA:
+            continue
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def normalize_token(token: str) -> str:
+    """Normalize one token: transliterate Devanagari, then fold spelling variants"""
+    token = token.translate(_DEVANAGARI_DIGITS)
+    if any("ऀ" <= c <= "ॿ" for c in token):
+        token = transliterate_devanagari(token)
+    for pattern, replacement in _PHONETIC_RULES:
+        token = pattern.sub(replacement, token)
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized tokens, expanding Hindi/Marathi synonyms"""
+    text = unicodedata.normalize("NFC", text or "").lower()
+    tokens = []
+    for raw in _TOKEN_RE.findall(text):
+        token = normalize_token(raw)
+        if not token:
+            continue
+        tokens.append(token)
+        for synonym in SYNONYMS.get(token, []):
+            tokens.append(normalize_token(synonym))
+    return tokens
+
+
+def _field_text(value) -> str:
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value if v)
+    return str(value) if value else ""
+
+
+class SchemeSearchIndex:
+    """
+    Inverted index with BM25 ranking.
+    Postings map token -> {scheme_id: weighted term frequency}. Documents can be
+    added or replaced one at a time, so new schemes are indexed as they are inserted.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.doc_lengths: Dict[str, float] = {}
+        self.doc_tokens: Dict[str, List[str]] = {}
+        self.summaries: Dict[str, Dict] = {}
+        self.total_length = 0.0
+        self.loaded = False
+        self._load_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, scheme: Dict) -> None:
+        """Index a scheme (replacing any previous version with the same id)"""
+        scheme_id = str(scheme.get("id") or scheme.get("_id"))
+        if scheme_id in self.doc_lengths:
+            self.remove(scheme_id)
+
+        frequencies: Dict[str, float] = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(_field_text(scheme.get(field))):
+                frequencies[token] += weight
+
+        for token, tf in frequencies.items():
+            self.postings[token][scheme_id] = tf
+        length = sum(frequencies.values())
+        self.doc_lengths[scheme_id] = length
+        self.doc_tokens[scheme_id] = list(frequencies)
+        self.total_length += length
+
+        summary = {field: scheme.get(field) for field in SUMMARY_FIELDS}
+        summary["id"] = scheme_id
+        self.summaries[scheme_id] = summary
+
+    def remove(self, scheme_id: str) -> None:
+        """Drop a scheme from the index"""
+        for token in self.doc_tokens.pop(scheme_id, []):
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(scheme_id, None)
+                if not postings:
+                    del self.postings[token]
+        self.total_length -= self.doc_lengths.pop(scheme_id, 0.0)
+        self.summaries.pop(scheme_id, None)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        category: Optional[str] = None,
+        role: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """Return (scheme_id, score) pairs for the query, best first"""
+        n = len(self.doc_lengths)
+        if n == 0:
+            return []
+        avgdl = self.total_length / n or 1.0
+
+        scores: Dict[str, float] = defaultdict(float)
+        for token in set(tokenize(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for scheme_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[scheme_id] / avgdl)
+                scores[scheme_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        results = []
+        for scheme_id, score in scores.items():
+            summary = self.summaries[scheme_id]
+            if category and summary.get("category") != category:
+                continue
+            if role and role not in (summary.get("eligibleRoles") or []):
+                continue
+            results.append((scheme_id, score))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:limit]
+
+    async def ensure_loaded(self) -> None:
+        """Build the index from the database on first use"""
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if self.loaded:
+                return
+            projection = {field: 1 for field in set(FIELD_WEIGHTS) | set(SUMMARY_FIELDS)}
+            async for scheme in schemes_collection.find({}, projection):
+                self.add(scheme)
+            self.loaded = True
+
+    def get_stats(self) -> Dict:
+        return {
+            "indexed_schemes": len(self.doc_lengths),
+            "unique_terms": len(self.postings),
+            "loaded": self.loaded,
+        }
+
+
+# Global search index instance
+scheme_search_index = SchemeSearchIndex()
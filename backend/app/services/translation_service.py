@@ -0,0 +1,165 @@
+"""
+Ingest-time translation of scheme content.
+One LLM call per scheme returns name, shortDescription, eligibility and
+benefits in every supported language. The result is stored on the scheme as
+translations[language] with the content_hash it was made from, so requests
+only ever read translations; they are redone only when the page changes.
+Schemes stored before translations existed, or whose translation failed, are
+picked up by backfill_translations at the end of each ingest run.
+"""
+
+from typing import Dict, List, Tuple
+from datetime import datetime
+import logging
+import asyncio
+import json
+from pymongo import UpdateOne
+from app.core.config import settings
+from app.core.database import schemes_collection
+from app.services.llm_provider import LLMProviderError, TRANSLATE, strip_code_fences
+from app.services.llm_router import llm_router
+from app.services.localization import LANGUAGE_NAMES, TRANSLATION_LANGUAGES, TRANSLATED_FIELDS
+from app.services.prompt_builder import Section, build_prompt
+from app.services.search_service import SUMMARY_FIELDS
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_INSTRUCTIONS = """Translate this Indian government scheme information from English into {languages}.
+Use simple, everyday words that rural users understand. Keep scheme names, acronyms,
+amounts and document names recognizable (e.g. "PM-KISAN", "Aadhaar card", "₹6,000").
+Return a JSON object with one key per language code ({codes}); each value is an object
+with the same keys as the input: "name" and "shortDescription" as strings,
+"eligibility" and "benefits" as arrays of strings with the same number of items."""
+
+
+def build_translation_prompt(scheme: Dict) -> str:
+    source = {field: scheme.get(field) for field in TRANSLATED_FIELDS}
+    return build_prompt("translate", [
+        Section("instructions", TRANSLATION_INSTRUCTIONS.format(
+            languages=", ".join(LANGUAGE_NAMES[language] for language in TRANSLATION_LANGUAGES),
+            codes=", ".join(f'"{language}"' for language in TRANSLATION_LANGUAGES)
+        ), required=True),
+        Section("source", f"Input:\n{json.dumps(source, ensure_ascii=False, indent=2)}"),
+        Section("format", "Return only valid JSON, no additional text.", required=True),
+    ], separator="\n\n")
+
+
+def _valid_field(value, source) -> bool:
+    if isinstance(source, list):
+        return isinstance(value, list) and len(value) == len(source) and all(
+            isinstance(item, str) and item.strip() for item in value
+        )
+    return isinstance(value, str) and bool(value.strip())
+
+
+def parse_translations(content: str, scheme: Dict) -> Dict[str, Dict]:
+    """
+    Parse a translation response into {language: {field: value}}.
+    Fields with the wrong type or item count are left out (they fall back to
+    English when served); raises LLMProviderError if nothing usable came back.
+    """
+    try:
+        parsed = json.loads(strip_code_fences(content or ""))
+    except json.JSONDecodeError as e:
+        raise LLMProviderError(f"JSON decode error in translation: {e}")
+    if not isinstance(parsed, dict):
+        raise LLMProviderError("Translation response is not a JSON object")
+
+    translations = {}
+    for language in TRANSLATION_LANGUAGES:
+        fields = parsed.get(language)
+        if not isinstance(fields, dict):
+            continue
+        valid = {
+            field: fields[field] for field in TRANSLATED_FIELDS
+            if scheme.get(field) and _valid_field(fields.get(field), scheme[field])
+        }
+        if valid:
+            translations[language] = valid
+    if not translations:
+        raise LLMProviderError("Translation response has no usable languages")
+    return translations
+
+
+async def translate_scheme(scheme: Dict) -> Dict[str, Dict]:
+    """
+    Translations for a scheme, tagged with its content_hash.
+    Returns {} on failure (the scheme is then served in English).
+    """
+    try:
+        content = await llm_router.call(TRANSLATE, "complete", build_translation_prompt(scheme))
+        translations = parse_translations(content, scheme)
+    except Exception as e:
+        logger.error("Error translating %s: %s", scheme.get('name'), e)
+        return {}
+    now = datetime.utcnow()
+    for fields in translations.values():
+        fields["source_hash"] = scheme.get("content_hash")
+        fields["translated_at"] = now
+    return translations
+
+
+async def translate_schemes(schemes: List[Dict]) -> int:
+    """
+    Translate extracted schemes in place (sets scheme["translations"] and
+    scheme["translation_attempted_at"]), at most
+    settings.ingest_extraction_concurrency calls at a time.
+    Returns the number of schemes translated.
+    """
+    semaphore = asyncio.Semaphore(settings.ingest_extraction_concurrency)
+
+    async def translate(scheme):
+        async with semaphore:
+            return await translate_scheme(scheme)
+
+    results = await asyncio.gather(*(translate(scheme) for scheme in schemes))
+    now = datetime.utcnow()
+    translated = 0
+    for scheme, translations in zip(schemes, results):
+        scheme["translation_attempted_at"] = now
+        if translations:
+            scheme["translations"] = translations
+            translated += 1
+    return translated
+
+
+def missing_translation_query() -> Dict:
+    """Schemes with a language whose translation is absent or made from older content"""
+    return {"$or": [
+        {"$expr": {"$ne": [f"$translations.{language}.source_hash", "$content_hash"]}}
+        for language in TRANSLATION_LANGUAGES
+    ]}
+
+
+async def backfill_translations(attempted_before: datetime, limit: int = None) -> Tuple[List[Dict], int]:
+    """
+    Translate up to `limit` stored schemes that lack a current translation
+    (settings.translation_backfill_batch per run bounds the LLM calls).
+    Schemes never attempted go first, then the longest-failed ones; schemes
+    attempted at or after `attempted_before` (i.e. in this run) are skipped.
+    Returns (translated schemes with "id" set, number of failures).
+    """
+    limit = limit or settings.translation_backfill_batch
+    query = {"$and": [
+        missing_translation_query(),
+        {"translation_attempted_at": {"$not": {"$gte": attempted_before}}},
+    ]}
+    projection = {field: 1 for field in set(TRANSLATED_FIELDS) | set(SUMMARY_FIELDS)}
+    projection["content_hash"] = 1
+    schemes = await schemes_collection.find(query, projection).sort(
+        "translation_attempted_at", 1
+    ).limit(limit).to_list(None)
+    if not schemes:
+        return [], 0
+
+    await translate_schemes(schemes)
+    operations = []
+    translated = []
+    for scheme in schemes:
+        fields = {"translation_attempted_at": scheme["translation_attempted_at"]}
+        if scheme.get("translations"):
+            fields["translations"] = scheme["translations"]
+            translated.append({**scheme, "id": str(scheme["_id"])})
+        operations.append(UpdateOne({"_id": scheme["_id"]}, {"$set": fields}))
+    await schemes_collection.bulk_write(operations, ordered=False)
+    return translated, len(schemes) - len(translated)
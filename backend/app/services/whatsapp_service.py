@@ -1,5 +1,5 @@
-import httpx
 from app.core.config import settings
+from app.core.http_client import get_http_client
 
 async def send_whatsapp_notification(phone_number: str, message: str):
     url = "https://graph.facebook.com/v18.0/YOUR_PHONE_NUMBER_ID/messages"  # Replace with actual
@@ -14,6 +14,8 @@ async def send_whatsapp_notification(phone_number: str, message: str):
         "text": {"body": message}
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, headers=headers, json=data)
-        return response.json()
\ No newline at end of file
+    client = get_http_client("whatsapp")
+    response = await client.post(url, headers=headers, json=data)
+    # Raise on 4xx/5xx so the delivery queue can retry
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,78 @@
+"""
+Login throughput benchmark for bcrypt password verification.
+Runs a burst of concurrent verifications with 1..N hashing workers and
+reports logins per second, plus the worst event loop stall seen while the
+burst runs (the inline case shows what happened before hashing was offloaded).
+Only the bcrypt primitives are imported, so no .env or service settings are needed.
+
+    python benchmark_password_hashing.py [--logins 64] [--rounds 12]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.core.passwords import hash_password, verify_password
+
+PASSWORD = "correct horse battery staple"
+
+
+async def measure_loop_stall(stop: asyncio.Event) -> float:
+    """Largest delay between scheduled 10 ms ticks, in milliseconds"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, (time.perf_counter() - start - 0.01) * 1000)
+    return worst
+
+
+async def run_burst(hashed: str, logins: int, workers: int = None):
+    """Verify `logins` passwords at once; workers=None verifies inline on the loop"""
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_loop_stall(stop))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    if workers is None:
+        for _ in range(logins):
+            verify_password(PASSWORD, hashed)
+    else:
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            await asyncio.gather(*(
+                loop.run_in_executor(executor, verify_password, PASSWORD, hashed)
+                for _ in range(logins)
+            ))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    stall = await ticker
+    return logins / elapsed, stall
+
+
+async def main(logins: int, rounds: int):
+    cores = os.cpu_count() or 1
+    hashed = hash_password(PASSWORD, rounds)
+    print(f"bcrypt rounds={rounds}, {logins} concurrent logins, {cores} cores")
+    print(f"{'workers':>8} {'logins/s':>10} {'max loop stall (ms)':>20}")
+
+    throughput, stall = await run_burst(hashed, logins)
+    print(f"{'inline':>8} {throughput:>10.1f} {stall:>20.1f}")
+
+    workers = 1
+    while True:
+        throughput, stall = await run_burst(hashed, logins, workers)
+        print(f"{workers:>8} {throughput:>10.1f} {stall:>20.1f}")
+        if workers >= cores:
+            break
+        workers = min(workers * 2, cores)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.rounds))
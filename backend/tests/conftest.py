@@ -0,0 +1,16 @@
+import os
+
+# Settings requires these; the tests never reach the services behind them
+for name, value in {
+    "MONGO_URI": "mongodb://localhost:27017",
+    "EXA_API_KEY": "test",
+    "GROQ_API_KEY": "test",
+    "GEMINI_API_KEY": "test",
+    "GEMINI_CHAT_MODEL": "gemini-1.5-flash",
+    "GEMINI_EMBED_MODEL": "models/text-embedding-004",
+    "CHAT_ENCRYPTION_KEY": "test",
+    "WHATSAPP_TOKEN": "test",
+    "JWT_SECRET": "test",
+    "EMBEDDING_BACKEND": "hashing",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,56 @@
+from app.services import cache_service
+from app.services.cache_service import AnswerCache
+
+
+def test_normalized_question_and_fingerprint_form_the_key():
+    cache = AnswerCache()
+    cache.set("What is PM-KISAN?", "v1", "An income support scheme")
+    assert cache.get("what is pm kisan", "v1") == "An income support scheme"
+    assert cache.get("What is PM-KISAN?", "v2") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnswerCache(max_entries=2)
+    cache.set("a", "v1", "A")
+    cache.set("b", "v1", "B")
+    assert cache.get("a", "v1") == "A"
+    cache.set("c", "v1", "C")
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1") == "A"
+    assert cache.get("c", "v1") == "C"
+    assert cache.evictions == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_service.time, "monotonic", lambda: now[0])
+    cache = AnswerCache(ttl_minutes=1)
+    cache.set("a", "v1", "A")
+    now[0] += 59
+    assert cache.get("a", "v1") == "A"
+    now[0] += 2
+    assert cache.get("a", "v1") is None
+    assert len(cache.entries) == 0
+    assert cache.total_bytes == 0
+
+
+def test_byte_cap_evicts_and_skips_oversized_answers():
+    cache = AnswerCache(max_bytes=20)
+    cache.set("a", "v1", "x" * 10)
+    cache.set("b", "v1", "y" * 10)
+    assert cache.get("a", "v1") is None
+    assert cache.get("b", "v1") == "y" * 10
+    assert cache.total_bytes <= 20
+
+    cache.set("c", "v1", "z" * 100)
+    assert cache.get("c", "v1") is None
+    assert cache.get("b", "v1") == "y" * 10
+
+
+def test_replacing_an_entry_keeps_byte_count_exact():
+    cache = AnswerCache()
+    cache.set("a", "v1", "short")
+    cache.set("a", "v1", "a longer answer")
+    assert len(cache.entries) == 1
+    assert cache.total_bytes == len("a") + len("a longer answer")
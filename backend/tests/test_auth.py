@@ -0,0 +1,44 @@
+import asyncio
+from bson import ObjectId
+from app.core.config import settings
+from app.routes import auth_routes
+from app.core.security import create_access_token
+from app.routes.auth_routes import create_user_token, resolve_principal
+
+
+class FakeUsers:
+    def __init__(self, user):
+        self.user = user
+        self.reads = 0
+
+    async def find_one(self, query, projection=None):
+        self.reads += 1
+        return dict(self.user)
+
+
+USER = {"_id": ObjectId(), "name": "Asha", "email": "asha@example.com", "mobileno": "9999999999", "role": "farmer", "language": "hi"}
+
+
+def test_claims_principal_has_mobile_number(monkeypatch):
+    users = FakeUsers(USER)
+    monkeypatch.setattr(auth_routes, "users_collection", users)
+    monkeypatch.setattr(settings, "token_claims_enabled", True)
+    auth_routes.principal_cache.invalidate(str(USER["_id"]))
+
+    principal = asyncio.run(resolve_principal(create_user_token(USER), allow_claims=True))
+    assert principal["mobileno"] == USER["mobileno"]
+    assert users.reads == 0
+
+
+def test_token_without_a_claim_falls_back_to_database(monkeypatch):
+    users = FakeUsers(USER)
+    monkeypatch.setattr(auth_routes, "users_collection", users)
+    monkeypatch.setattr(settings, "token_claims_enabled", True)
+    auth_routes.principal_cache.invalidate(str(USER["_id"]))
+    # Issued before mobileno was a claim
+    old_token = create_access_token({"sub": str(USER["_id"]), "name": "Asha", "role": "farmer", "language": "hi"})
+
+    principal = asyncio.run(resolve_principal(old_token, allow_claims=True))
+    assert principal["mobileno"] == USER["mobileno"]
+    assert users.reads == 1
+    auth_routes.principal_cache.invalidate(str(USER["_id"]))
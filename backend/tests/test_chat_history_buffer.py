@@ -0,0 +1,41 @@
+import asyncio
+from app.services import chat_history_buffer as buffer_module
+from app.services.chat_history_buffer import ChatHistoryBuffer
+
+
+class FakeCollection:
+    def __init__(self):
+        self.inserted = []
+
+    async def insert_many(self, batch, ordered=False):
+        self.inserted.extend(batch)
+
+
+def test_stop_flushes_and_waits_for_listeners(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(buffer_module, "chat_history_collection", collection)
+    buffer = ChatHistoryBuffer()
+    notified = []
+
+    async def slow_listener(user_ids):
+        await asyncio.sleep(0.05)
+        notified.append(user_ids)
+
+    async def failing_listener(user_ids):
+        raise RuntimeError("summary failed")
+
+    buffer.add_flush_listener(slow_listener)
+    buffer.add_flush_listener(failing_listener)
+
+    async def run():
+        buffer.start()
+        await buffer.add("u1", "hello", "hi")
+        await buffer.add("u2", "hello", "hi")
+        await buffer.add("u1", "again", "hi")
+        await buffer.stop()
+
+    asyncio.run(run())
+    assert len(collection.inserted) == 3
+    # One listener call per batch, with each user once
+    assert notified == [["u1", "u2"]]
+    assert buffer.get_stats()["listeners_running"] == 0
@@ -0,0 +1,63 @@
+from app.services.eligibility_service import (
+    SchemeEligibilityIndex, detect_states, normalize_state, parse_age_range, parse_income_limit
+)
+
+
+def test_parse_age_range():
+    assert parse_age_range("18-40 years") == (18, 40)
+    assert parse_age_range("between 18 and 40 years") == (18, 40)
+    assert parse_age_range("above 60 years") == (60, None)
+    assert parse_age_range("up to 35 years") == (None, 35)
+    assert parse_age_range("Any age") == (None, None)
+    assert parse_age_range(None) == (None, None)
+
+
+def test_parse_income_limit():
+    assert parse_income_limit("below ₹2.5 lakh per annum") == 250000.0
+    assert parse_income_limit("Annual income below Rs 2 lakh") == 200000.0
+    assert parse_income_limit("Rs 10,000 per month") == 120000.0
+    assert parse_income_limit("No income limit") is None
+    # A year is not an amount
+    assert parse_income_limit("As per 2023 guidelines") is None
+
+
+def test_states():
+    assert normalize_state("MH") == "maharashtra"
+    assert normalize_state("J&K") == "jammu and kashmir"
+    assert normalize_state("Atlantis") is None
+    assert detect_states({"name": "Mukhyamantri Yojana", "eligibility": ["Resident of Maharashtra"]}) == ["maharashtra"]
+    assert detect_states({"name": "PM-KISAN"}) == []
+
+
+def build_index():
+    index = SchemeEligibilityIndex(capacity=2)
+    index.upsert({"id": "youth", "ageRange": "18-40 years", "eligibleRoles": ["student"]})
+    index.upsert({"id": "senior", "ageRange": "above 60 years", "incomeLimit": "below Rs 2 lakh per annum"})
+    index.upsert({"id": "farmer", "eligibleRoles": ["farmer"], "eligibility": ["Farmers of Maharashtra"]})
+    index.upsert({"id": "open", "name": "Open to all"})
+    return index
+
+
+def test_match_applies_only_stated_bounds():
+    index = build_index()
+    assert len(index) == 4
+    assert index.match() == ["youth", "senior", "farmer", "open"]
+    assert index.match(age=25) == ["youth", "farmer", "open"]
+    assert index.match(age=65, income=150000) == ["senior", "farmer", "open"]
+    assert index.match(age=65, income=300000) == ["farmer", "open"]
+
+
+def test_match_roles_and_states():
+    index = build_index()
+    assert index.match(role="farmer") == ["senior", "farmer", "open"]
+    assert index.match(role="farmer", state="maharashtra") == ["senior", "farmer", "open"]
+    assert index.match(role="farmer", state="kerala") == ["senior", "open"]
+
+
+def test_upsert_replaces_and_remove_hides():
+    index = build_index()
+    index.upsert({"id": "youth", "ageRange": "18-25 years", "eligibleRoles": ["student"]})
+    assert "youth" not in index.match(age=30)
+    index.remove("open")
+    assert "open" not in index.match()
+    assert len(index) == 3
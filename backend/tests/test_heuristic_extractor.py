@@ -0,0 +1,47 @@
+from app.core.config import settings
+from app.services.heuristic_extractor import extract_heuristically
+from workflow_demo import mock_exa_result
+
+
+def test_structured_page_is_extracted_without_llm():
+    data, confidence = extract_heuristically(mock_exa_result)
+    assert confidence >= settings.heuristic_extraction_min_confidence
+    assert data["name"] == "Pradhan Mantri Kisan Samman Nidhi (PM-KISAN)"
+    assert data["category"] == "agriculture"
+    assert data["eligibleRoles"] == ["farmer"]
+    assert data["eligibility"] == ["Small and marginal farmer families having combined land holding up to 2 hectares"]
+    assert data["benefits"] == ["Rs 6,000 per year in three installments of Rs 2,000 each"]
+    assert data["requiredDocuments"] == ["Aadhaar card", "Bank account details", "Land ownership documents"]
+    assert data["applicationProcess"].startswith("Farmers can register")
+    assert data["officialWebsite"] == "https://pmkisan.gov.in/"
+
+
+def test_age_and_income_are_picked_up():
+    data, _ = extract_heuristically({
+        "title": "Pension Yojana",
+        "description": "Eligibility: Age between 18 and 40 years. Annual income below Rs 2 lakh.\nBenefits: Rs 3,000 monthly pension after 60.",
+        "url": "https://example.gov.in/",
+    })
+    assert data["category"] == "pension"
+    assert data["ageRange"] == "between 18 and 40 years"
+    assert data["incomeLimit"] == "Annual income below Rs 2 lakh"
+
+
+def test_hindi_headings():
+    data, _ = extract_heuristically({
+        "title": "छात्रवृत्ति योजना",
+        "description": "पात्रता: छात्र जिनकी आयु 18 वर्ष है\nलाभ: 10000 रुपये\nआवश्यक दस्तावेज: आधार कार्ड",
+        "url": "https://example.gov.in/",
+    })
+    assert data["eligibility"] == ["छात्र जिनकी आयु 18 वर्ष है"]
+    assert data["benefits"] == ["10000 रुपये"]
+    assert data["requiredDocuments"] == ["आधार कार्ड"]
+
+
+def test_unstructured_page_falls_back_to_llm():
+    _, confidence = extract_heuristically({
+        "title": "Some Scheme",
+        "description": "A scheme for people. More details on the site.",
+        "url": "https://example.gov.in/",
+    })
+    assert confidence < settings.heuristic_extraction_min_confidence
@@ -0,0 +1,133 @@
+import asyncio
+import pytest
+from app.core.config import settings
+from app.services.llm_provider import ANSWER, STREAM, LLMProvider, LLMProviderError
+from app.services.llm_router import CLOSED, HALF_OPEN, OPEN, LLMRouter
+
+
+class FakeProvider(LLMProvider):
+    operations = frozenset({ANSWER, STREAM})
+
+    def __init__(self, name, answer="ok", delay=0.0, fail=False):
+        self.name = name
+        self.answer = answer
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def complete(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise LLMProviderError(f"{self.name} is down")
+        return self.answer
+
+    async def stream_explanation(self, scheme, language="en"):
+        self.calls += 1
+        if self.fail:
+            raise LLMProviderError(f"{self.name} is down")
+        for word in self.answer.split():
+            yield word
+
+
+def call(router, hedge=False):
+    return asyncio.run(router.call(ANSWER, "complete", "prompt", hedge=hedge))
+
+
+def test_failover_to_next_provider():
+    down, up = FakeProvider("down", fail=True), FakeProvider("up", answer="from up")
+    router = LLMRouter([down, up])
+    assert call(router) == "from up"
+    assert router.failovers == 1
+    assert router.health["down"].failures == 1
+
+
+def test_all_providers_failing_raises():
+    router = LLMRouter([FakeProvider("a", fail=True), FakeProvider("b", fail=True)])
+    with pytest.raises(LLMProviderError):
+        call(router)
+
+
+def test_unhealthy_provider_is_ranked_last():
+    flaky, steady = FakeProvider("flaky", fail=True), FakeProvider("steady")
+    router = LLMRouter([flaky, steady])
+    call(router)
+    assert [provider.name for provider in router.candidates(ANSWER)] == ["steady", "flaky"]
+    call(router)
+    assert flaky.calls == 1
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_cooldown(monkeypatch):
+    monkeypatch.setattr(settings, "llm_breaker_failure_threshold", 2)
+    down = FakeProvider("down", fail=True)
+    router = LLMRouter([down])
+    for _ in range(2):
+        with pytest.raises(LLMProviderError):
+            call(router)
+    assert router.health["down"].state() == OPEN
+
+    # Open: out of rotation, no call is made
+    with pytest.raises(LLMProviderError):
+        call(router)
+    assert down.calls == 2
+
+    # Cooldown over: a single trial call; success closes the breaker
+    router.health["down"].opened_until = 1.0
+    assert router.health["down"].state() == HALF_OPEN
+    down.fail = False
+    assert call(router) == "ok"
+    assert down.calls == 3
+    assert router.health["down"].state() == CLOSED
+
+
+def test_failed_trial_reopens_breaker(monkeypatch):
+    monkeypatch.setattr(settings, "llm_breaker_failure_threshold", 1)
+    down = FakeProvider("down", fail=True)
+    router = LLMRouter([down])
+    with pytest.raises(LLMProviderError):
+        call(router)
+    router.health["down"].opened_until = 1.0
+    with pytest.raises(LLMProviderError):
+        call(router)
+    assert router.health["down"].state() == OPEN
+
+
+def test_slow_primary_is_hedged(monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge_enabled", True)
+    monkeypatch.setattr(settings, "llm_hedge_default_delay_seconds", 0.05)
+    slow, fast = FakeProvider("slow", answer="slow", delay=1.0), FakeProvider("fast", answer="fast")
+    router = LLMRouter([slow, fast])
+    assert call(router, hedge=True) == "fast"
+    assert router.hedges == 1
+    assert router.health["fast"].hedge_wins == 1
+    # The losing call is cancelled, which does not count against the provider
+    assert router.health["slow"].failures == 0
+
+
+def test_no_hedge_without_flag(monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge_default_delay_seconds", 0.01)
+    slow, fast = FakeProvider("slow", answer="slow", delay=0.05), FakeProvider("fast")
+    router = LLMRouter([slow, fast])
+    assert call(router) == "slow"
+    assert fast.calls == 0
+
+
+def test_stream_fails_over_before_first_chunk():
+    down, up = FakeProvider("down", fail=True), FakeProvider("up", answer="hello there")
+
+    async def collect(router, meta):
+        return [chunk async for chunk in router.stream("stream_explanation", {}, meta=meta)]
+
+    router = LLMRouter([down, up])
+    meta = {}
+    assert asyncio.run(collect(router, meta)) == ["hello", "there"]
+    assert meta["provider"] == "up"
+    assert router.failovers == 1
+
+
+def test_summary_goes_through_router(monkeypatch):
+    from app.services import conversation_service, llm_router as router_module
+    router = LLMRouter([FakeProvider("down", fail=True), FakeProvider("up", answer="  summary  ")])
+    monkeypatch.setattr(router_module, "llm_router", router)
+    turns = [{"message": "hi", "response": "hello"}]
+    assert asyncio.run(conversation_service.summarize_turns("", turns)) == "summary"
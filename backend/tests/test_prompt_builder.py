@@ -0,0 +1,70 @@
+from app.services.prompt_builder import TRUNCATION_MARK, Section, estimate_tokens, fit_sections, truncate_to_tokens
+
+
+def words(count: int) -> str:
+    return " ".join(f"word{i}" for i in range(count))
+
+
+def total_tokens(sections):
+    return sum(estimate_tokens(s.text) for s in sections)
+
+
+def test_sections_within_budget_are_untouched():
+    sections = [Section("a", words(10)), Section("b", words(10))]
+    assert fit_sections(sections, 1000) == (sections, 0, 0)
+
+
+def test_lowest_priority_is_cut_first_and_required_is_kept():
+    question = Section("question", words(40), required=True)
+    schemes = Section("schemes", words(200), priority=100)
+    history = Section("history", words(200), priority=1)
+    budget = total_tokens([question, schemes, history]) - 50
+
+    fitted, tokens_cut, dropped = fit_sections([question, schemes, history], budget)
+    assert [s.name for s in fitted] == ["question", "schemes", "history"]
+    assert fitted[0] == question
+    assert fitted[1] == schemes
+    assert fitted[2].text.endswith(TRUNCATION_MARK)
+    assert dropped == 0
+    assert tokens_cut >= 50
+    assert total_tokens(fitted) <= budget
+
+
+def test_section_cut_below_min_tokens_is_dropped():
+    sections = [
+        Section("header", words(20), required=True),
+        Section("scheme_1", words(50), priority=100, min_tokens=20),
+        Section("scheme_2", words(50), priority=100, min_tokens=20),
+    ]
+    budget = total_tokens(sections) - estimate_tokens(words(50)) + 5
+
+    fitted, _, dropped = fit_sections(sections, budget)
+    # Equal priority: the later (lower-ranked) scheme goes first
+    assert [s.name for s in fitted] == ["header", "scheme_1"]
+    assert dropped == 1
+    assert total_tokens(fitted) <= budget
+
+
+def test_truncate_to_tokens_cuts_at_a_word_boundary():
+    text = words(100)
+    cut = truncate_to_tokens(text, 20)
+    assert estimate_tokens(cut) <= 20
+    assert cut.endswith(TRUNCATION_MARK)
+    assert text.startswith(cut[:-1] + " ")
+
+
+def test_groq_history_is_inside_the_chat_budget():
+    from app.services.conversation_service import Conversation
+    from app.services.groq_service import GROQ_MODEL, build_query_request
+    from app.services.prompt_builder import get_budget
+
+    turns = [{"message": words(300), "response": words(300)} for _ in range(6)]
+    conversation = Conversation(summary=words(200), turns=turns)
+    schemes = [{"name": f"Scheme {i}", "shortDescription": words(20)} for i in range(5)]
+
+    _, data = build_query_request("what about loans?", schemes, conversation)
+    assert [m["role"] for m in data["messages"]] == ["system", "user"]
+    prompt = data["messages"][1]["content"]
+    assert "Conversation so far:" in prompt
+    assert "Scheme 4" in prompt
+    assert estimate_tokens(prompt, GROQ_MODEL) <= get_budget("chat") + 5
@@ -0,0 +1,62 @@
+import asyncio
+from bson import ObjectId
+from app.services import embedding_service
+from app.services.embedding_service import HashingEmbedder, embed_schemes, select_relevant_schemes, set_embedder
+
+SCHEMES = [
+    {"id": "1", "name": "PM-KISAN", "category": "agriculture", "shortDescription": "Income support for farmers",
+     "benefits": ["Rs 6000 per year to farmer families"], "eligibleRoles": ["farmer"]},
+    {"id": "2", "name": "Post Matric Scholarship", "category": "education", "shortDescription": "Scholarship for students",
+     "benefits": ["Tuition fees for college students"], "eligibleRoles": ["student"]},
+    {"id": "3", "name": "Mudra Loan", "category": "business", "shortDescription": "Loans for small businesses",
+     "benefits": ["Collateral free business loans"], "eligibleRoles": ["entrepreneur"]},
+    {"id": "4", "name": "Ayushman Bharat", "category": "health", "shortDescription": "Health insurance for poor families",
+     "benefits": ["Hospital treatment cover of Rs 5 lakh"], "eligibleRoles": ["other"]},
+]
+
+
+def rank(query, k=2):
+    async def run():
+        set_embedder(HashingEmbedder())
+        schemes = [dict(scheme) for scheme in SCHEMES]
+        # Stored vectors, as written at ingest, so the index never reads the database
+        for scheme, vector in zip(schemes, await embed_schemes(schemes)):
+            scheme["embedding"] = vector
+        return await select_relevant_schemes(query, schemes, k=k)
+    return [scheme["name"] for scheme in asyncio.run(run())]
+
+
+def test_most_similar_scheme_ranks_first():
+    assert rank("scholarship for college students")[0] == "Post Matric Scholarship"
+    assert rank("business loans")[0] == "Mudra Loan"
+    assert rank("hospital health insurance")[0] == "Ayushman Bharat"
+
+
+def test_returns_top_k():
+    assert len(rank("farmers", k=3)) == 3
+    assert embedding_service.scheme_index.get_stats()["indexed_schemes"] == len(SCHEMES)
+
+
+class FakeSchemes:
+    def __init__(self):
+        self.writes = []
+
+    def find(self, query, projection=None):
+        async def empty():
+            return
+            yield
+        return empty()
+
+    async def bulk_write(self, operations, ordered=True):
+        self.writes.append(operations)
+
+
+def test_new_embeddings_are_written_back_in_one_batch(monkeypatch):
+    collection = FakeSchemes()
+    monkeypatch.setattr(embedding_service, "schemes_collection", collection)
+    set_embedder(HashingEmbedder())
+    schemes = [{**scheme, "id": str(ObjectId())} for scheme in SCHEMES]
+
+    asyncio.run(embedding_service.sync_index(schemes))
+    assert len(collection.writes) == 1
+    assert len(collection.writes[0]) == len(SCHEMES)
@@ -0,0 +1,48 @@
+import asyncio
+from app.services.cache_service import SchemeCache
+
+
+class FlakyLoader:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        return [{"id": str(self.calls), "processed_at": self.calls}]
+
+
+def test_stale_reads_share_one_refresh_and_back_off_after_failure():
+    loader = FlakyLoader()
+    cache = SchemeCache(loader=loader, refresh_backoff_seconds=0.2)
+
+    async def run():
+        schemes, cached = await cache.get_schemes()
+        assert (schemes[0]["id"], cached) == ("1", False)
+
+        loader.fail = True
+        cache.bump_version()
+        for _ in range(5):
+            schemes, cached = await cache.get_schemes()
+            assert (schemes[0]["id"], cached) == ("1", True)
+        await asyncio.sleep(0.01)
+        assert loader.calls == 2
+        assert cache.refresh_errors == 1
+
+        # Within the backoff window stale reads do not retry
+        await cache.get_schemes()
+        await asyncio.sleep(0.01)
+        assert loader.calls == 2
+
+        await asyncio.sleep(0.2)
+        loader.fail = False
+        await cache.get_schemes()
+        await asyncio.sleep(0.01)
+        assert loader.calls == 3
+        assert cache.get()[0]["id"] == "3"
+        assert not cache.is_stale()
+
+    asyncio.run(run())
@@ -0,0 +1,56 @@
+from app.services.search_service import SchemeSearchIndex, tokenize
+
+SCHEMES = [
+    {"id": "1", "name": "PM-KISAN", "category": "agriculture", "shortDescription": "Income support for farmer families",
+     "tags": ["farmer", "income"], "eligibleRoles": ["farmer"]},
+    {"id": "2", "name": "Mudra Yojana", "category": "business", "shortDescription": "Collateral free loan for small businesses",
+     "tags": ["loan", "business"], "eligibleRoles": ["self_employed"]},
+    {"id": "3", "name": "Post Matric Scholarship", "category": "education", "shortDescription": "Scholarship for students",
+     "tags": ["scholarship", "student"], "eligibleRoles": ["student"]},
+]
+
+
+def build_index():
+    index = SchemeSearchIndex()
+    for scheme in SCHEMES:
+        index.add(scheme)
+    return index
+
+
+def test_devanagari_and_romanized_words_map_to_catalogue_terms():
+    assert "farmer" in tokenize("किसान")
+    assert "farmer" in tokenize("kisaan")
+    assert "farmer" in tokenize("शेतकरी")
+    assert "loan" in tokenize("कर्ज")
+    assert "loan" in tokenize("ऋण")
+
+
+def test_hindi_and_marathi_queries_find_english_schemes():
+    index = build_index()
+    assert index.search("किसान योजना")[0][0] == "1"
+    assert index.search("शेतकरी")[0][0] == "1"
+    assert index.search("व्यापार के लिए कर्ज")[0][0] == "2"
+    assert index.search("ऋण")[0][0] == "2"
+
+
+def test_filters_apply_to_ranked_results():
+    index = build_index()
+    assert [scheme_id for scheme_id, _ in index.search("loan scholarship", category="education")] == ["3"]
+    assert index.search("loan", role="farmer") == []
+
+
+def test_add_replaces_previous_version():
+    index = build_index()
+    index.add(dict(SCHEMES[1], shortDescription="Credit for street vendors", tags=["credit"]))
+    assert len(index) == len(SCHEMES)
+    assert all(scheme_id != "2" for scheme_id, _ in index.search("collateral"))
+    assert index.search("street vendors")[0][0] == "2"
+    assert index.summaries["2"]["shortDescription"] == "Credit for street vendors"
+
+
+def test_remove_drops_postings():
+    index = build_index()
+    index.remove("3")
+    assert index.search("scholarship") == []
+    assert "scholarship" not in index.postings
+    assert len(index) == 2